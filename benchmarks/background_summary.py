@@ -0,0 +1,66 @@
+"""Turn latency of the summarizing chatbot with inline and background summaries.
+
+python -m benchmarks.background_summary --turns 20 --latency fixed:0.2
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from benchmarks.harness import percentile
+from src.background_summary import BackgroundSummarizer
+
+
+async def run(module, mode: str, turns: int, pause: float) -> tuple:
+    module.SUMMARY_MODE = mode
+    graph = module.workflow.compile(checkpointer=MemorySaver())
+    summarizer = BackgroundSummarizer(graph, module.summarize_conversation)
+    config = {"configurable": {"thread_id": mode}}
+    latencies = []
+    for turn in range(turns):
+        start = time.perf_counter()
+        await summarizer.ainvoke(
+            {"messages": [HumanMessage(f"Tell me about topic {turn}.")]}, config
+        )
+        latencies.append(time.perf_counter() - start)
+        # The user reading the reply; 0 sends the next turn mid-summarization
+        await asyncio.sleep(pause)
+    await summarizer.drain()
+    messages = len((await graph.aget_state(config)).values["messages"])
+    return latencies, summarizer.stats, messages
+
+
+async def main(module, turns: int, pause: float):
+    print(
+        f"{'mode':<12}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}"
+        f"{'summaries':>11}{'conflicts':>11}{'messages':>10}"
+    )
+    for mode in ("inline", "background"):
+        latencies, stats, messages = await run(module, mode, turns, pause)
+        summaries = stats["committed"] if mode == "background" else "-"
+        conflicts = stats["conflicts"] if mode == "background" else "-"
+        print(
+            f"{mode:<12}{percentile(latencies, 50) * 1000:>10.1f}"
+            f"{percentile(latencies, 95) * 1000:>10.1f}"
+            f"{max(latencies) * 1000:>10.1f}"
+            f"{summaries:>11}{conflicts:>11}{messages:>10}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--pause", type=float, default=0.0)
+    parser.add_argument("--latency", default="fixed:0.2", help="FAKE_LLM_LATENCY")
+    args = parser.parse_args()
+    # Read when src.model is first imported
+    os.environ.setdefault("LLM_BACKEND", "fake")
+    os.environ["FAKE_LLM_LATENCY"] = args.latency
+    from benchmarks.scenarios import quiet_import
+
+    module = quiet_import("src.state_memory.chatbot_summarization")
+    asyncio.run(main(module, args.turns, args.pause))
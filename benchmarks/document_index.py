@@ -0,0 +1,56 @@
+"""Indexing and lookup latency of the local document index.
+
+python -m benchmarks.document_index --documents 2000 --queries 200
+"""
+
+import argparse
+import random
+import tempfile
+import time
+
+from benchmarks import synthetic
+from benchmarks.harness import percentile
+from src.document_index import DocumentIndex
+
+
+def main(documents: int, queries: int):
+    rng = random.Random(0)
+    texts = [
+        " ".join(synthetic.sentence(rng, 20) for _ in range(30))
+        for _ in range(documents)
+    ]
+    with tempfile.TemporaryDirectory() as directory:
+        index = DocumentIndex(directory)
+        start = time.perf_counter()
+        for i, text in enumerate(texts):
+            index.add(text, f"docs/document_{i}.md")
+        print(
+            f"indexed {documents} documents ({len(index.chunks)} chunks) "
+            f"in {time.perf_counter() - start:.2f} s"
+        )
+        start = time.perf_counter()
+        index = DocumentIndex(directory)
+        print(f"reopened in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        print(f"{'alpha':<10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for alpha in (0.0, 0.5, 1.0):
+            index.alpha = alpha
+            latencies = []
+            for _ in range(queries):
+                query = " ".join(rng.choices(synthetic.WORDS, k=5))
+                start = time.perf_counter()
+                index.search(query)
+                latencies.append(time.perf_counter() - start)
+            print(
+                f"{alpha:<10}{percentile(latencies, 50) * 1000:>10.2f}"
+                f"{percentile(latencies, 95) * 1000:>10.2f}"
+                f"{percentile(latencies, 99) * 1000:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    main(args.documents, args.queries)
@@ -0,0 +1,67 @@
+"""Per-turn cost of building Trustcall extractors versus reusing them.
+
+python -m benchmarks.extractors --iterations 200
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from trustcall import create_extractor
+
+from benchmarks.harness import percentile
+from benchmarks.scenarios import quiet_import
+from src.extractors import get_extractor
+from src.fake_llm import FakeChatModel
+
+
+async def main(iterations: int):
+    memory_agent = quiet_import("src.long_term_memory.memory_agent")
+    llm = FakeChatModel()
+    inputs = {
+        "messages": [("user", "I need to book a dentist visit next week.")],
+        "existing": None,
+    }
+
+    def build_per_call(spy):
+        return create_extractor(
+            llm, tools=[memory_agent.ToDo], tool_choice="ToDo", enable_inserts=True
+        ).with_listeners(on_end=spy)
+
+    def reuse(spy):
+        return get_extractor(
+            llm,
+            tools=[memory_agent.ToDo],
+            tool_choice="ToDo",
+            enable_inserts=True,
+            on_end=spy,
+        )
+
+    print(
+        f"{'strategy':<16}{'build p50 ms':>14}{'build p95 ms':>14}{'turn p50 ms':>13}"
+    )
+    for name, factory in [
+        ("create_extractor", build_per_call),
+        ("get_extractor", reuse),
+    ]:
+        build, turn = [], []
+        for _ in range(iterations):
+            spy = memory_agent.Spy()
+            start = time.perf_counter()
+            extractor = factory(spy)
+            built = time.perf_counter()
+            await extractor.ainvoke(inputs)
+            build.append(built - start)
+            turn.append(time.perf_counter() - start)
+        print(
+            f"{name:<16}{percentile(build, 50) * 1000:>14.3f}"
+            f"{percentile(build, 95) * 1000:>14.3f}{percentile(turn, 50) * 1000:>13.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    os.environ.setdefault("LLM_BACKEND", "fake")
+    asyncio.run(main(parser.parse_args().iterations))
@@ -0,0 +1,178 @@
+import asyncio
+import gc
+import math
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from types import ModuleType
+from typing import Awaitable, Callable, Optional
+
+# An operation runs one graph invocation; its argument is a unique run index
+# (used for thread ids) so concurrent runs never share a checkpoint thread.
+Operation = Callable[[int], Awaitable]
+
+
+@dataclass
+class Scenario:
+    """A graph benchmarked at increasing input sizes.
+
+    `load()` imports the example module outside of any event loop (some run
+    their demo with `asyncio.run` at import time). `setup(module, size)` builds
+    the graph and its synthetic inputs (store contents, message history, ...)
+    for one size and returns the operation to time.
+    """
+
+    name: str
+    param: str
+    sizes: list[int]
+    load: Callable[[], ModuleType]
+    setup: Callable[[ModuleType, int], Awaitable[Operation]]
+    description: str = ""
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile of `values` (q in 0-100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of the process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def _timed_runs(
+    op: Operation, iterations: int, concurrency: int
+) -> tuple[list[float], float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def timed(index: int):
+        async with semaphore:
+            start = time.perf_counter()
+            await op(index)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(timed(i) for i in range(iterations)))
+    return latencies, time.perf_counter() - start
+
+
+async def _traced_run(op: Operation, index: int) -> tuple[float, int]:
+    """Run `op` once under tracemalloc: (peak KiB, blocks still allocated)."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    await op(index)
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(
+        stat.count_diff
+        for stat in after.compare_to(before, "filename")
+        if stat.count_diff > 0
+    )
+    return peak / 1024, blocks
+
+
+async def measure(
+    scenario: Scenario,
+    module: ModuleType,
+    size: int,
+    iterations: int = 20,
+    concurrency: int = 1,
+    warmup: int = 1,
+) -> dict:
+    """Benchmark one scenario at one size.
+
+    Latencies come from untraced runs (tracemalloc slows Python down several
+    times), allocations from one extra traced run.
+    """
+    op = await scenario.setup(module, size)
+    # Warm up lazy imports, compiled regexes and schema conversions
+    for i in range(warmup):
+        await op(-1 - i)
+    latencies, wall_time = await _timed_runs(op, iterations, concurrency)
+    alloc_peak_kb, alloc_blocks = await _traced_run(op, iterations)
+    return {
+        "scenario": scenario.name,
+        "param": scenario.param,
+        "size": size,
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "mean": sum(latencies) / len(latencies),
+        "throughput": iterations / wall_time if wall_time else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "alloc_peak_kb": alloc_peak_kb,
+        "alloc_blocks": alloc_blocks,
+    }
+
+
+def run_scenario(scenario: Scenario, size: int, **kwargs) -> dict:
+    """Import the scenario module and benchmark it at `size` in a fresh event loop."""
+    module = scenario.load()
+    return asyncio.run(measure(scenario, module, size, **kwargs))
+
+
+def environment() -> dict:
+    """Metadata stored next to the results to compare versions."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = "unknown"
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(
+    results: list[dict],
+    baseline: list[dict],
+    threshold: float = 0.2,
+    metrics: tuple[str, ...] = ("p95", "alloc_peak_kb"),
+    min_delta: Optional[dict] = None,
+) -> list[str]:
+    """List the metrics that grew more than `threshold` over the baseline.
+
+    `min_delta` ignores absolute changes below a floor per metric, so sub-
+    millisecond timings do not flag noise as regressions.
+    """
+    min_delta = min_delta or {"p95": 0.005, "alloc_peak_kb": 64}
+    previous = {(r["scenario"], r["size"], r["concurrency"]): r for r in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get((result["scenario"], result["size"], result["concurrency"]))
+        if old is None:
+            continue
+        for metric in metrics:
+            before, after = old[metric], result[metric]
+            if after - before < min_delta.get(metric, 0):
+                continue
+            if before and after > before * (1 + threshold):
+                regressions.append(
+                    f"{result['scenario']}[{result['param']}={result['size']}] "
+                    f"{metric}: {before:.4g} -> {after:.4g} "
+                    f"(+{(after / before - 1) * 100:.0f}%)"
+                )
+    return regressions
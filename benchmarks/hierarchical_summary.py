@@ -0,0 +1,104 @@
+"""Model input of the rolling and hierarchical conversation summaries.
+
+python -m benchmarks.hierarchical_summary --turns 60
+
+The fake model answers with a fixed number of words. Its summaries here follow
+the prompt literally: an extended summary keeps the previous one, and "at most
+N words" caps the reply.
+"""
+
+import argparse
+import os
+import re
+from collections import defaultdict
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import END, START, StateGraph
+
+from src.fake_llm import FakeChatModel
+from src.summary_tree import HierarchicalSummarizer
+
+_EXTEND = re.compile(r"summary of the conversation to date: (.*)\n\nExtend", re.S)
+_AT_MOST = re.compile(r"at most (\d+) words")
+
+
+class SummarizingFakeModel(FakeChatModel):
+    def _generate(self, messages, *args, **kwargs):
+        result = super()._generate(messages, *args, **kwargs)
+        message = result.generations[0].message
+        prompt = str(messages[-1].content)
+        if extend := _EXTEND.search(prompt):
+            message.content = f"{extend.group(1)} {message.content}"
+        elif limit := _AT_MOST.search(prompt):
+            message.content = " ".join(message.content.split()[: int(limit[1])])
+        return result
+
+
+class NodeUsage(BaseCallbackHandler):
+    """Input tokens of each model call, per graph node."""
+
+    def __init__(self):
+        self.nodes: dict[str, str] = {}
+        self.inputs: defaultdict[str, list[int]] = defaultdict(list)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        metadata = kwargs.get("metadata") or {}
+        self.nodes[run_id] = metadata.get("langgraph_node", "")
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        message = getattr(response.generations[0][0], "message", None)
+        if message is not None and message.usage_metadata:
+            node = self.nodes.pop(run_id, "")
+            self.inputs[node].append(message.usage_metadata["input_tokens"])
+
+
+def run(module, summarize, turns: int) -> tuple[NodeUsage, dict]:
+    workflow = StateGraph(module.State)
+    workflow.add_node("conversation", module.call_model)
+    workflow.add_node("summarize_conversation", summarize)
+    workflow.add_edge(START, "conversation")
+    workflow.add_conditional_edges("conversation", module.should_continue)
+    workflow.add_edge("summarize_conversation", END)
+    graph = workflow.compile(checkpointer=MemorySaver())
+    usage = NodeUsage()
+    config = {"configurable": {"thread_id": "bench"}, "callbacks": [usage]}
+    for turn in range(turns):
+        message = HumanMessage(f"Here is what I did on day {turn}.")
+        graph.invoke({"messages": [message]}, config)
+    return usage, graph.get_state(config).values
+
+
+def main(module, turns: int):
+    module.llm = SummarizingFakeModel(response_words=60)
+    print(
+        f"{'strategy':<14}{'calls':>7}{'mean in':>9}{'max in':>8}"
+        f"{'total in':>10}{'summary':>9}{'chat in':>9}"
+    )
+    strategies = {
+        "rolling": module.summarize_conversation,
+        "hierarchical": HierarchicalSummarizer(module.llm).summarize,
+    }
+    for name, summarize in strategies.items():
+        usage, state = run(module, summarize, turns)
+        inputs = usage.inputs["summarize_conversation"] or [0]
+        chat = usage.inputs["conversation"][-10:]
+        summary_tokens = module.llm.get_num_tokens(state.get("summary", ""))
+        print(
+            f"{name:<14}{len(inputs):>7}{sum(inputs) / len(inputs):>9.0f}"
+            f"{max(inputs):>8}{sum(inputs):>10}{summary_tokens:>9}"
+            f"{sum(chat) / len(chat):>9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=60)
+    args = parser.parse_args()
+    # Read when src.model is first imported
+    os.environ.setdefault("LLM_BACKEND", "fake")
+    from benchmarks.scenarios import quiet_import
+
+    module = quiet_import("src.state_memory.chatbot_summarization")
+    main(module, args.turns)
@@ -0,0 +1,76 @@
+"""Per-branch versus batched structured output in the map-reduce graph.
+
+python -m benchmarks.map_batching --subjects 3,10,30 --latency fixed:0.2
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from benchmarks.harness import percentile
+
+
+class Usage(BaseCallbackHandler):
+    """Model calls and tokens of a run."""
+
+    def __init__(self):
+        self.calls = 0
+        self.tokens = 0
+
+    def on_llm_end(self, response, **kwargs):
+        self.calls += 1
+        message = getattr(response.generations[0][0], "message", None)
+        if message is not None and message.usage_metadata:
+            self.tokens += message.usage_metadata["total_tokens"]
+
+
+async def run(module, size: int, batch_size: int, iterations: int) -> dict:
+    from benchmarks.scenarios import sized_llm
+
+    module.llm = sized_llm(size)
+    module.JOKE_BATCH_SIZE = batch_size
+    graph = module.graph.compile()
+    latencies, calls, tokens = [], 0, 0
+    for index in range(iterations):
+        usage = Usage()
+        start = time.perf_counter()
+        await graph.ainvoke({"topic": f"topic {index}"}, {"callbacks": [usage]})
+        latencies.append(time.perf_counter() - start)
+        calls += usage.calls
+        tokens += usage.tokens
+    return {
+        "p50": percentile(latencies, 50),
+        "calls": calls / iterations,
+        "tokens": tokens / iterations,
+    }
+
+
+async def main(module, sizes: list[int], iterations: int):
+    print(f"{'subjects':<10}{'mode':<12}{'p50 ms':>10}{'calls':>8}{'tokens':>10}")
+    for size in sizes:
+        for mode, batch_size in [("per-branch", 1), ("batched", size)]:
+            result = await run(module, size, batch_size, iterations)
+            print(
+                f"{size:<10}{mode:<12}{result['p50'] * 1000:>10.1f}"
+                f"{result['calls']:>8.1f}{result['tokens']:>10.0f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subjects", default="3,10,30")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--latency", default="fixed:0.2", help="FAKE_LLM_LATENCY")
+    args = parser.parse_args()
+    # Read when src.model is first imported
+    os.environ.setdefault("LLM_BACKEND", "fake")
+    os.environ["FAKE_LLM_LATENCY"] = args.latency
+    from benchmarks.scenarios import quiet_import
+
+    # Imported outside the event loop: the module runs its demo with asyncio.run
+    module = quiet_import("src.building_assistant.map_reduce")
+    sizes = [int(size) for size in args.subjects.split(",")]
+    asyncio.run(main(module, sizes, args.iterations))
@@ -0,0 +1,63 @@
+"""Cost of message updates on long histories with `add_messages` and the
+indexed reducer.
+
+python -m benchmarks.message_reducer --messages 1000,10000,50000 --iterations 20
+"""
+
+import argparse
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage
+from langgraph.graph.message import add_messages
+
+from benchmarks import synthetic
+from benchmarks.harness import percentile
+from src.indexed_messages import add_messages_indexed
+
+
+def measure(reducer, history: list, update, iterations: int) -> list[float]:
+    latencies = []
+    for _ in range(iterations):
+        right = update()
+        start = time.perf_counter()
+        reducer(history, right)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main(sizes: list[int], iterations: int):
+    print(f"{'messages':<10}{'update':<14}{'reducer':<10}{'p50 ms':>10}{'p95 ms':>10}")
+    for size in sizes:
+        messages = synthetic.conversation(size)
+        updates = {
+            "append": lambda: [HumanMessage("And orcas?")],
+            "replace": lambda: [AIMessage("Edited.", id=messages[size // 2].id)],
+            # summarize_conversation: delete all but the 2 most recent messages
+            "remove": lambda: [RemoveMessage(id=m.id) for m in messages[:-2]],
+        }
+        # A running graph holds the reducer output, already indexed
+        histories = {
+            "add": add_messages([], messages),
+            "indexed": add_messages_indexed([], messages),
+        }
+        for name, update in updates.items():
+            for reducer_name, reducer in [
+                ("add", add_messages),
+                ("indexed", add_messages_indexed),
+            ]:
+                latencies = measure(
+                    reducer, histories[reducer_name], update, iterations
+                )
+                print(
+                    f"{size:<10}{name:<14}{reducer_name:<10}"
+                    f"{percentile(latencies, 50) * 1000:>10.3f}"
+                    f"{percentile(latencies, 95) * 1000:>10.3f}"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", default="1000,10000,50000")
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+    main([int(size) for size in args.messages.split(",")], args.iterations)
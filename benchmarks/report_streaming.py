@@ -0,0 +1,57 @@
+"""Time to the first report output with and without streaming assembly.
+
+python -m benchmarks.report_streaming --analysts 6 --latency lognormal:-2.5,0.8
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.harness import percentile
+
+
+async def main(analysts: int, iterations: int):
+    from benchmarks.scenarios import quiet_import, setup_research_assistant
+
+    module = quiet_import("src.building_assistant.research_assistant_agent")
+    # Patches the searches and the model; the graph is compiled again below
+    await setup_research_assistant(module, analysts)
+    graph = module.builder.compile()
+
+    first, last, complete = [], [], []
+    for index in range(iterations):
+        inputs = {"topic": f"topic {index}", "max_analysts": analysts}
+        start = time.perf_counter()
+        outputs = []
+        async for _ in module.stream_report(graph, inputs):
+            outputs.append(time.perf_counter() - start)
+        # One output per section, then one per report part
+        first.append(outputs[0])
+        last.append(outputs[analysts - 1])
+        complete.append(outputs[-1])
+
+    print(f"{'output':<22}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, latencies in [
+        ("first section", first),
+        ("slowest section", last),
+        ("final report", complete),
+    ]:
+        print(
+            f"{name:<22}{percentile(latencies, 50) * 1000:>10.1f}"
+            f"{percentile(latencies, 95) * 1000:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--analysts", type=int, default=6)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument(
+        "--latency", default="lognormal:-2.5,0.8", help="FAKE_LLM_LATENCY"
+    )
+    args = parser.parse_args()
+    # Read when src.model is first imported
+    os.environ.setdefault("LLM_BACKEND", "fake")
+    os.environ["FAKE_LLM_LATENCY"] = args.latency
+    asyncio.run(main(args.analysts, args.iterations))
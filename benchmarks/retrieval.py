@@ -0,0 +1,109 @@
+"""Search latency with and without the retrieval cache, and of the fan-out.
+
+python -m benchmarks.retrieval --queries 50 --latency fixed:0.05
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.harness import percentile
+
+
+def offline_sources():
+    from src import retrievers
+    from src.fake_retrievers import FakeWebSearch, FakeWikipediaLoader
+
+    retrievers.TavilySearchResults = FakeWebSearch
+    retrievers.WikipediaLoader = FakeWikipediaLoader
+
+
+async def timed(cache, queries: list[str], search) -> list[float]:
+    from src.retrieval_cache import aretrieve
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        await aretrieve(cache, "web", query, search.ainvoke)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def main(count: int):
+    from src.fake_retrievers import FakeWebSearch
+    from src.retrieval_cache import RetrievalCache
+
+    offline_sources()
+    queries = [f"LangGraph agent benchmark {i}" for i in range(count)]
+    # The same queries as issued by other analysts
+    variants = [f"  langgraph AGENT, benchmark {i}?" for i in range(count)]
+
+    print(f"{'run':<18}{'p50 ms':>10}{'p95 ms':>10}{'searches':>10}")
+    search = FakeWebSearch()
+    latencies = await timed(None, queries + variants, search)
+    print(
+        f"{'uncached':<18}{percentile(latencies, 50) * 1000:>10.2f}"
+        f"{percentile(latencies, 95) * 1000:>10.2f}{search.calls:>10}"
+    )
+
+    cache = RetrievalCache(default_ttl=2, stale_ttl=60)
+    search = FakeWebSearch()
+    for name, batch in [("cold", queries), ("normalized hits", variants)]:
+        latencies = await timed(cache, batch, search)
+        print(
+            f"{name:<18}{percentile(latencies, 50) * 1000:>10.2f}"
+            f"{percentile(latencies, 95) * 1000:>10.2f}{search.calls:>10}"
+        )
+    # Past the TTL the stale results are served while they are refetched
+    await asyncio.sleep(2)
+    latencies = await timed(cache, queries, search)
+    print(
+        f"{'stale':<18}{percentile(latencies, 50) * 1000:>10.2f}"
+        f"{percentile(latencies, 95) * 1000:>10.2f}{search.calls:>10}"
+    )
+    await asyncio.sleep(0.2)
+    print(f"cache stats: {cache.stats}")
+
+    await fan_out(queries)
+
+
+async def fan_out(queries: list[str]):
+    """Registered sources queried together, one of them past its deadline."""
+    from src import retrievers
+
+    async def slow_source(query: str) -> list[str]:
+        await asyncio.sleep(1)
+        return [f'<Document source="slow"/>\n{query}\n</Document>']
+
+    retrievers.register("slow", slow_source, deadline=0.2)
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        await retrievers.fan_out(query)
+        latencies.append(time.perf_counter() - start)
+    print(
+        f"\nfan-out over {', '.join(retrievers.registry)}: "
+        f"p50 {percentile(latencies, 50) * 1000:.1f} ms, "
+        f"p95 {percentile(latencies, 95) * 1000:.1f} ms"
+    )
+    print(f"{'source':<12}{'p50 ms':>10}{'p95 ms':>10}{'ok':>6}{'timeouts':>10}")
+    for retriever in retrievers.registry.values():
+        print(
+            f"{retriever.name:<12}{retriever.latency(50) * 1000:>10.1f}"
+            f"{retriever.latency(95) * 1000:>10.1f}{retriever.stats['ok']:>6}"
+            f"{retriever.stats['timeout']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument(
+        "--latency", default="fixed:0.05", help="FAKE_SEARCH_LATENCY of the searches"
+    )
+    args = parser.parse_args()
+    # Read when src.fake_retrievers and src.model are imported
+    os.environ["FAKE_SEARCH_LATENCY"] = args.latency
+    os.environ.setdefault("LLM_BACKEND", "fake")
+    asyncio.run(main(args.queries))
@@ -0,0 +1,160 @@
+"""Run the benchmark suite offline and store the results as JSON.
+
+python -m benchmarks.run
+python -m benchmarks.run --scenarios map_reduce,task_maistro --latency fixed:0.05
+python -m benchmarks.run --baseline benchmarks/results/<commit>.json
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scenarios", default="all", help="Comma separated scenario names"
+    )
+    parser.add_argument(
+        "--sizes", help="Comma separated sizes overriding the scenario defaults"
+    )
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument(
+        "--concurrency", type=int, default=1, help="Threads run concurrently"
+    )
+    parser.add_argument(
+        "--latency", help="FAKE_LLM_LATENCY of the fake model, e.g. fixed:0.05"
+    )
+    parser.add_argument(
+        "--output", help="Results file (default: results/<commit>.json)"
+    )
+    parser.add_argument("--baseline", help="Results file to compare against")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="Allowed relative regression"
+    )
+    return parser.parse_args(argv)
+
+
+def cache_delta(before: dict, after: dict) -> dict:
+    """Context cache counters of one scenario run, with its hit ratio."""
+    delta = {key: after[key] - before[key] for key in after}
+    reused = delta["hits"] + delta["refreshed"]
+    served = reused + delta["created"]
+    delta["hit_ratio"] = reused / served if served else 0.0
+    return delta
+
+
+def branch_timings(branches: list[dict]) -> dict:
+    """Queueing and execution time of the Send() branches of one scenario run."""
+    queued = [branch["queued"] for branch in branches]
+    executed = [branch["executed"] for branch in branches]
+    return {
+        "branches": len(branches),
+        "queued_mean": sum(queued) / len(queued),
+        "queued_max": max(queued),
+        "executed_mean": sum(executed) / len(executed),
+    }
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    # The graphs read the backend when src.model is first imported
+    os.environ.setdefault("LLM_BACKEND", "fake")
+    if args.latency:
+        os.environ["FAKE_LLM_LATENCY"] = args.latency
+
+    from benchmarks.harness import compare, environment, run_scenario
+    from benchmarks.scenarios import SCENARIOS
+    from src.model import branch_scheduler, context_cache
+
+    names = list(SCENARIOS) if args.scenarios == "all" else args.scenarios.split(",")
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    results = []
+    print(
+        f"{'scenario':<24}{'size':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+        f"{'ops/s':>9}{'rss MB':>9}{'alloc KB':>10}{'blocks':>9}"
+    )
+    for name in names:
+        scenario = SCENARIOS[name]
+        sizes = (
+            [int(size) for size in args.sizes.split(",")]
+            if args.sizes
+            else scenario.sizes
+        )
+        for size in sizes:
+            before = dict(context_cache.stats) if context_cache else None
+            completed = branch_scheduler.stats["completed"]
+            result = run_scenario(
+                scenario,
+                size,
+                iterations=args.iterations,
+                concurrency=args.concurrency,
+            )
+            if context_cache:
+                result["context_cache"] = cache_delta(before, context_cache.stats)
+            branches = min(
+                branch_scheduler.stats["completed"] - completed,
+                len(branch_scheduler.branches),
+            )
+            if branches:
+                result["branches"] = branch_timings(
+                    list(branch_scheduler.branches)[-branches:]
+                )
+            results.append(result)
+            print(
+                f"{name:<24}{f'{scenario.param}={size}':>12}"
+                f"{result['p50'] * 1000:>10.1f}{result['p95'] * 1000:>10.1f}"
+                f"{result['p99'] * 1000:>10.1f}{result['throughput']:>9.1f}"
+                f"{result['peak_rss_mb']:>9.0f}{result['alloc_peak_kb']:>10.0f}"
+                f"{result['alloc_blocks']:>9}"
+            )
+            if "context_cache" in result:
+                cache = result["context_cache"]
+                print(
+                    f"{'':<24}{'context cache':>12} hit ratio {cache['hit_ratio']:.2f}, "
+                    f"{cache['created']} created, "
+                    f"{cache['cached_tokens']} cached tokens, {cache['skipped']} skipped"
+                )
+            if "branches" in result:
+                timing = result["branches"]
+                print(
+                    f"{'':<24}{'branches':>12} queued {timing['queued_mean'] * 1000:.1f} ms "
+                    f"(max {timing['queued_max'] * 1000:.1f}), "
+                    f"executed {timing['executed_mean'] * 1000:.1f} ms"
+                )
+
+    meta = environment()
+    meta.update(
+        backend=os.environ["LLM_BACKEND"],
+        fake_llm_latency=os.environ.get("FAKE_LLM_LATENCY"),
+        iterations=args.iterations,
+        concurrency=args.concurrency,
+    )
+    output = (
+        Path(args.output) if args.output else RESULTS_DIR / f"{meta['commit']}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({"meta": meta, "results": results}, indent=2))
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"No regression over {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
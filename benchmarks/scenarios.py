@@ -0,0 +1,276 @@
+import contextlib
+import functools
+import importlib
+import io
+import os
+import random
+import sys
+from pathlib import Path
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.store.memory import InMemoryStore
+
+from benchmarks import synthetic
+from benchmarks.harness import Scenario
+from src.fake_llm import FakeChatModel
+from src.fake_retrievers import FakeWebSearch, FakeWikipediaLoader
+
+TASK_MAISTRO_DIR = Path(__file__).parent.parent / "src" / "deployment" / "task_maistro"
+
+
+def quiet_import(name: str):
+    """Import an example module, hiding the demo output printed at import time."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return importlib.import_module(name)
+
+
+def sized_llm(list_size: int):
+    """The shared model, generating `list_size` items for list fields."""
+    from src.model import llm
+
+    if isinstance(llm, FakeChatModel):
+        return llm.model_copy(update={"list_size": list_size})
+    return llm
+
+
+def user_config(index: int, user_id: str = "bench-user") -> dict:
+    return {"configurable": {"thread_id": f"bench-{index}", "user_id": user_id}}
+
+
+# Building assistant
+async def setup_sub_graphs(module, size: int):
+    graph = module.entry_builder.compile()
+    raw_logs = synthetic.logs(size)
+
+    async def op(index: int):
+        await graph.ainvoke({"raw_logs": raw_logs})
+
+    return op
+
+
+async def setup_map_reduce(module, size: int):
+    # Number of subjects, hence of Send() branches
+    module.llm = sized_llm(size)
+    graph = module.graph.compile()
+
+    async def op(index: int):
+        await graph.ainvoke({"topic": f"topic {index}"})
+
+    return op
+
+
+async def setup_research_assistant(module, size: int):
+    # Number of analysts, hence of interviews; searches are served offline
+    module.llm = sized_llm(size)
+    retrievers = quiet_import("src.retrievers")
+    retrievers.TavilySearchResults = FakeWebSearch
+    retrievers.WikipediaLoader = FakeWikipediaLoader
+    # Compiled without the human feedback interrupt: analysts are approved
+    graph = module.builder.compile(checkpointer=MemorySaver())
+
+    async def op(index: int):
+        await graph.ainvoke(
+            {"topic": f"topic {index}", "max_analysts": size},
+            {"configurable": {"thread_id": f"bench-{index}"}},
+        )
+
+    return op
+
+
+# State and memory
+async def setup_chatbot_summarization(module, size: int):
+    graph = module.workflow.compile(checkpointer=MemorySaver())
+    # Histories longer than six messages are summarized and trimmed
+    history = synthetic.conversation(size)
+
+    async def op(index: int):
+        await graph.ainvoke({"messages": history}, user_config(index))
+
+    return op
+
+
+# Long-term memory
+async def setup_memory_store(module, size: int):
+    store = InMemoryStore()
+    await store.aput(
+        ("memory", "bench-user"),
+        "user_memory",
+        {"memory": synthetic.sentence(random.Random(0), 40)},
+    )
+    graph = module.builder.compile(checkpointer=MemorySaver(), store=store)
+    history = synthetic.conversation(size)
+
+    async def op(index: int):
+        await graph.ainvoke({"messages": history}, user_config(index))
+
+    return op
+
+
+async def setup_memory_profile(module, size: int):
+    graph = module.builder.compile(checkpointer=MemorySaver(), store=InMemoryStore())
+    history = synthetic.conversation(size)
+
+    async def op(index: int):
+        await graph.ainvoke({"messages": history}, user_config(index))
+
+    return op
+
+
+async def setup_memory_collection(module, size: int):
+    store = InMemoryStore()
+    rng = random.Random(0)
+    for i in range(size):
+        await store.aput(
+            ("memories", "bench-user"),
+            f"memory-{i}",
+            {"content": synthetic.sentence(rng)},
+        )
+    graph = module.builder.compile(checkpointer=MemorySaver(), store=store)
+
+    async def op(index: int):
+        # Each run writes to its own copy of the prefilled memories
+        user_id = f"bench-user-{index}"
+        for item in await store.asearch(("memories", "bench-user"), limit=size):
+            await store.aput(("memories", user_id), item.key, item.value)
+        await graph.ainvoke(
+            {"messages": [HumanMessage(content="I like to bike around the bay.")]},
+            user_config(index, user_id),
+        )
+
+    return op
+
+
+async def _prefill_todos(store, namespace, size: int):
+    rng = random.Random(0)
+    for i in range(size):
+        await store.aput(namespace, f"todo-{i}", synthetic.todo(i, rng))
+
+
+async def setup_memory_agent(module, size: int):
+    store = InMemoryStore()
+    graph = module.builder.compile(checkpointer=MemorySaver(), store=store)
+
+    async def op(index: int):
+        user_id = f"bench-user-{index}"
+        await _prefill_todos(store, ("todo", user_id), size)
+        await graph.ainvoke(
+            {"messages": [HumanMessage(content="I need to book a dentist visit.")]},
+            user_config(index, user_id),
+        )
+
+    return op
+
+
+# Deployment
+def import_task_maistro():
+    # The deployment is self-contained and imports its own `configuration`
+    if str(TASK_MAISTRO_DIR) not in sys.path:
+        sys.path.insert(0, str(TASK_MAISTRO_DIR))
+    # Its Gemini client is replaced below, but needs a key to be constructed
+    os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+    return quiet_import("task_maistro")
+
+
+async def setup_task_maistro(module, size: int):
+    from trustcall import create_extractor
+
+    module.model = FakeChatModel(latency=os.environ.get("FAKE_LLM_LATENCY"))
+    module.profile_extractor = create_extractor(
+        module.model, tools=[module.Profile], tool_choice="Profile"
+    )
+    store = InMemoryStore()
+    graph = module.builder.compile(checkpointer=MemorySaver(), store=store)
+
+    async def op(index: int):
+        user_id = f"bench-user-{index}"
+        await _prefill_todos(store, ("todo", "general", user_id), size)
+        await graph.ainvoke(
+            {"messages": [HumanMessage(content="I need to book a dentist visit.")]},
+            user_config(index, user_id),
+        )
+
+    return op
+
+
+def _loader(name: str):
+    return functools.partial(quiet_import, name)
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in [
+        Scenario(
+            name="sub_graphs",
+            param="logs",
+            sizes=[10, 100, 1000],
+            load=_loader("src.building_assistant.sub_graphs"),
+            setup=setup_sub_graphs,
+            description="Log pipeline with failure analysis and summarization sub-graphs",
+        ),
+        Scenario(
+            name="map_reduce",
+            param="subjects",
+            sizes=[3, 10, 30],
+            load=_loader("src.building_assistant.map_reduce"),
+            setup=setup_map_reduce,
+            description="Joke generation fanned out with Send()",
+        ),
+        Scenario(
+            name="research_assistant",
+            param="analysts",
+            sizes=[1, 3, 6],
+            load=_loader("src.building_assistant.research_assistant_agent"),
+            setup=setup_research_assistant,
+            description="Analyst interviews with offline searches and report writing",
+        ),
+        Scenario(
+            name="chatbot_summarization",
+            param="messages",
+            sizes=[4, 20, 100],
+            load=_loader("src.state_memory.chatbot"),
+            setup=setup_chatbot_summarization,
+            description="Chatbot summarizing and trimming long histories",
+        ),
+        Scenario(
+            name="memory_store",
+            param="messages",
+            sizes=[2, 20, 100],
+            load=_loader("src.long_term_memory.memory_store_agent"),
+            setup=setup_memory_store,
+            description="Chatbot with a single memory in the store",
+        ),
+        Scenario(
+            name="memory_profile",
+            param="messages",
+            sizes=[2, 20, 100],
+            load=_loader("src.long_term_memory.memoryschema_profile_agent"),
+            setup=setup_memory_profile,
+            description="Chatbot with a Trustcall profile memory",
+        ),
+        Scenario(
+            name="memory_collection",
+            param="memories",
+            sizes=[0, 20, 100],
+            load=_loader("src.long_term_memory.memoryschema_collection_agent"),
+            setup=setup_memory_collection,
+            description="Chatbot with a Trustcall memory collection",
+        ),
+        Scenario(
+            name="memory_agent",
+            param="todos",
+            sizes=[0, 20, 100],
+            load=_loader("src.long_term_memory.memory_agent"),
+            setup=setup_memory_agent,
+            description="ToDo agent with profile, ToDo and instructions memories",
+        ),
+        Scenario(
+            name="task_maistro",
+            param="todos",
+            sizes=[0, 20, 100],
+            load=import_task_maistro,
+            setup=setup_task_maistro,
+            description="Deployed task_mAIstro graph",
+        ),
+    ]
+}
@@ -0,0 +1,57 @@
+import random
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+# Vocabulary of the synthetic conversations, documents and memories
+WORDS = (
+    "schedule dentist groceries flight hotel paper review deadline gym "
+    "python graph agent budget meeting family weekend trip garden book "
+    "coffee report invoice car repair birthday gift concert train"
+).split()
+
+
+def sentence(rng: random.Random, words: int = 12) -> str:
+    return " ".join(rng.choices(WORDS, k=words)).capitalize() + "."
+
+
+def conversation(length: int, seed: int = 0) -> list:
+    """Alternating human / AI messages ending with a human turn."""
+    rng = random.Random(seed)
+    messages = []
+    for i in range(length - 1, -1, -1):
+        message_cls = HumanMessage if i % 2 == 0 else AIMessage
+        messages.append(
+            message_cls(content=sentence(rng, 25), id=f"msg-{seed}-{length - i}")
+        )
+    return messages
+
+
+def todo(index: int, rng: random.Random) -> dict:
+    """A stored ToDo item as written by the memory agents."""
+    return {
+        "task": sentence(rng, 6),
+        "time_to_complete": 15 * (1 + index % 8),
+        "deadline": None,
+        "solutions": [sentence(rng, 5) for _ in range(2)],
+        "status": "not started",
+    }
+
+
+def logs(count: int, seed: int = 0) -> list[dict]:
+    """Question/answer logs for the sub-graph pipeline, a third of them graded."""
+    rng = random.Random(seed)
+    result = []
+    for i in range(count):
+        log = {
+            "id": str(i),
+            "question": sentence(rng, 8),
+            "answer": sentence(rng, 30),
+        }
+        if i % 3 == 0:
+            log.update(
+                grade=0,
+                grader="Document Relevance Recall",
+                feedback=sentence(rng, 12),
+            )
+        result.append(log)
+    return result
@@ -0,0 +1,82 @@
+"""Cost of trimming a history with the model's token counter, a local one or
+the incremental message window.
+
+python -m benchmarks.token_counting --messages 10,100,1000 --iterations 50
+"""
+
+import argparse
+import time
+
+from langchain_core.messages import trim_messages
+
+from benchmarks import synthetic
+from benchmarks.harness import percentile
+from src.fake_llm import FakeChatModel
+from src.message_window import update_window, window_node
+from src.token_counter import TokenCounter
+
+
+def trim(messages: list, token_counter, iterations: int) -> list[float]:
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        trim_messages(
+            messages,
+            max_tokens=1000,
+            strategy="last",
+            token_counter=token_counter,
+            allow_partial=False,
+        )
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def window(messages: list, counter: TokenCounter, iterations: int) -> list[float]:
+    """Update the window of a history of which the last message is new."""
+    node = window_node(1000, counter.count_message)
+    state = {"messages": messages[:-1]}
+    state["window"] = update_window(None, node(state)["window"])
+    state["messages"] = messages
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        update_window(state["window"], node(state)["window"])
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main(sizes: list[int], iterations: int):
+    llm = FakeChatModel()
+    print(f"{'messages':<10}{'counter':<14}{'calls':>8}{'p50 ms':>10}{'p95 ms':>10}")
+    for size in sizes:
+        messages = synthetic.conversation(size)
+        calls = 0
+
+        def model_counter(batch):
+            # With Gemini, each call is a count_tokens request
+            nonlocal calls
+            calls += 1
+            return llm.get_num_tokens_from_messages(batch)
+
+        counter = TokenCounter(llm._llm_type)
+        runs = [
+            ("model", trim(messages, model_counter, iterations)),
+            ("local cold", trim(messages, TokenCounter(llm._llm_type), 1)),
+            ("local", trim(messages, counter, iterations)),
+            ("window", window(messages, counter, iterations)),
+        ]
+        for name, latencies in runs:
+            print(
+                f"{size:<10}{name:<14}"
+                f"{calls // iterations if name == 'model' else 0:>8}"
+                f"{percentile(latencies, 50) * 1000:>10.3f}"
+                f"{percentile(latencies, 95) * 1000:>10.3f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", default="10,100,1000")
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    main([int(size) for size in args.messages.split(",")], args.iterations)
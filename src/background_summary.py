@@ -0,0 +1,159 @@
+import asyncio
+import inspect
+import logging
+import os
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Optional
+
+from langchain_core.messages import RemoveMessage
+from langchain_core.runnables import RunnableConfig
+
+# "inline" summarizes within the turn, "background" after the reply is returned
+SUMMARY_MODE = os.environ.get("SUMMARY_MODE", "inline").lower()
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundSummarizer:
+    """Run conversation turns and summarize their thread off the critical path.
+
+    After a turn leaving more than `max_messages` messages in the thread, the
+    `summarize` node (the graph's `summarize_conversation`) runs on a snapshot
+    of the state in a background thread (`invoke`) or task (`ainvoke`), while
+    the reply is already returned. Its update is then committed as a new
+    checkpoint, as if written by `node`.
+
+    Turns and commits of a thread are serialized, so a commit waits for a turn
+    in progress. Before committing, the summary is checked against the state
+    at that time. If another summary was committed since the snapshot, this
+    one is dropped as a conflict. Messages added by new turns are kept, and
+    messages already removed are skipped.
+    """
+
+    def __init__(
+        self,
+        graph: Any,
+        summarize: Callable,
+        max_messages: int = 6,
+        node: str = "summarize_conversation",
+    ):
+        self.graph = graph
+        self.summarize = summarize
+        self.max_messages = max_messages
+        self.node = node
+        self.stats = {"scheduled": 0, "committed": 0, "conflicts": 0, "errors": 0}
+        self._locks: defaultdict[str, threading.Lock] = defaultdict(threading.Lock)
+        self._alocks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._lock = threading.Lock()
+        self._pending: dict[str, Any] = {}
+
+    @staticmethod
+    def _thread_id(config: RunnableConfig) -> str:
+        return str(config["configurable"]["thread_id"])
+
+    def _update(self, snapshot: dict, current: dict, update: dict) -> Optional[dict]:
+        """The update to commit on `current`, or None on a conflict."""
+        if current.get("summary", "") != snapshot.get("summary", ""):
+            return None
+        present = {message.id for message in current["messages"]}
+        return {
+            **update,
+            "messages": [
+                message
+                for message in update.get("messages", [])
+                if not isinstance(message, RemoveMessage) or message.id in present
+            ],
+        }
+
+    def _commit(self, config: RunnableConfig, snapshot: dict, update: dict):
+        with self._locks[self._thread_id(config)]:
+            current = self.graph.get_state(config).values
+            update = self._update(snapshot, current, update)
+            if update is None:
+                self._count("conflicts")
+                return
+            self.graph.update_state(config, update, as_node=self.node)
+        self._count("committed")
+
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def invoke(self, input: Any, config: RunnableConfig) -> dict:
+        """Run one turn and start summarizing its thread if it grew too long."""
+        thread_id = self._thread_id(config)
+        with self._locks[thread_id]:
+            output = self.graph.invoke(input, config)
+        with self._lock:
+            if len(output["messages"]) <= self.max_messages:
+                return output
+            if thread_id in self._pending:
+                return output
+            thread = threading.Thread(
+                target=self._summarize, args=(config, output), daemon=True
+            )
+            self._pending[thread_id] = thread
+            self.stats["scheduled"] += 1
+        thread.start()
+        return output
+
+    def _summarize(self, config: RunnableConfig, snapshot: dict):
+        try:
+            self._commit(config, snapshot, self.summarize(snapshot))
+        except Exception:
+            # The thread stays unsummarized until a later turn retries
+            logger.exception(
+                "Background summary of thread %s failed", self._thread_id(config)
+            )
+            self._count("errors")
+        finally:
+            with self._lock:
+                self._pending.pop(self._thread_id(config), None)
+
+    def wait(self):
+        """Wait for the summaries being written by background threads."""
+        for thread in list(self._pending.values()):
+            if isinstance(thread, threading.Thread):
+                thread.join()
+
+    async def ainvoke(self, input: Any, config: RunnableConfig) -> dict:
+        """Async `invoke`; the summary is written by a background task."""
+        thread_id = self._thread_id(config)
+        async with self._alocks[thread_id]:
+            output = await self.graph.ainvoke(input, config)
+        if len(output["messages"]) > self.max_messages and (
+            thread_id not in self._pending
+        ):
+            self._pending[thread_id] = asyncio.ensure_future(
+                self._asummarize(config, output)
+            )
+            self.stats["scheduled"] += 1
+        return output
+
+    async def _asummarize(self, config: RunnableConfig, snapshot: dict):
+        try:
+            if inspect.iscoroutinefunction(self.summarize):
+                update = await self.summarize(snapshot)
+            else:
+                update = await asyncio.to_thread(self.summarize, snapshot)
+            async with self._alocks[self._thread_id(config)]:
+                current = (await self.graph.aget_state(config)).values
+                update = self._update(snapshot, current, update)
+                if update is None:
+                    self.stats["conflicts"] += 1
+                    return
+                await self.graph.aupdate_state(config, update, as_node=self.node)
+            self.stats["committed"] += 1
+        except Exception:
+            logger.exception(
+                "Background summary of thread %s failed", self._thread_id(config)
+            )
+            self.stats["errors"] += 1
+        finally:
+            self._pending.pop(self._thread_id(config), None)
+
+    async def drain(self):
+        """Wait for the summaries being written by background tasks."""
+        tasks = [t for t in self._pending.values() if isinstance(t, asyncio.Future)]
+        await asyncio.gather(*tasks, return_exceptions=True)
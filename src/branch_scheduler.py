@@ -0,0 +1,135 @@
+import asyncio
+import time
+import weakref
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+# Branch timings kept for inspection
+HISTORY = 1000
+
+
+class _LoopState:
+    """Queues of a scheduler, which are bound to a single event loop."""
+
+    def __init__(self):
+        self.running = 0
+        # priority -> run -> waiting branches; the runs rotate for fairness
+        self.queues: dict[int, OrderedDict[str, deque[asyncio.Future]]] = {}
+
+
+class BranchScheduler:
+    """Cap the number of `Send` branches of map steps running at once.
+
+    A branch past the cap waits in a queue. The waiting branches of the
+    highest priority (lowest number) start first, and within a priority the
+    runs take turns, one branch each, so a run with many branches cannot
+    starve the others. Runs are told apart by their `thread_id` and take
+    their priority from `configurable.priority` (0 by default).
+    """
+
+    def __init__(self, max_in_flight: int = 4):
+        self.max_in_flight = max_in_flight
+        self.stats = {"running": 0, "queued": 0, "completed": 0}
+        # node, run, priority, queued and executed seconds of recent branches
+        self.branches: deque[dict] = deque(maxlen=HISTORY)
+        self._loops: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def _state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        state = self._loops.get(loop)
+        if state is None:
+            state = self._loops[loop] = _LoopState()
+        return state
+
+    def _dispatch(self, state: _LoopState):
+        """Start waiting branches while there is room."""
+        while state.running < self.max_in_flight:
+            waiting = [p for p, runs in state.queues.items() if runs]
+            if not waiting:
+                return
+            runs = state.queues[min(waiting)]
+            run, branches = next(iter(runs.items()))
+            future = branches.popleft()
+            # The run goes to the back of the rotation
+            del runs[run]
+            if branches:
+                runs[run] = branches
+            if not future.done():
+                state.running += 1
+                future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, run: str = "default", priority: int = 0, node: str = ""):
+        """Hold one branch slot for the duration of the block."""
+        state = self._state()
+        start = time.perf_counter()
+        if state.running < self.max_in_flight and not any(state.queues.values()):
+            state.running += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            runs = state.queues.setdefault(priority, OrderedDict())
+            runs.setdefault(run, deque()).append(future)
+            self.stats["queued"] += 1
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # Granted just before the cancellation
+                    state.running -= 1
+                    self._dispatch(state)
+                elif future in runs.get(run, ()):
+                    runs[run].remove(future)
+                    if not runs[run]:
+                        del runs[run]
+                raise
+            finally:
+                self.stats["queued"] -= 1
+        started = time.perf_counter()
+        self.stats["running"] += 1
+        try:
+            yield
+        finally:
+            state.running -= 1
+            self.stats["running"] -= 1
+            self.stats["completed"] += 1
+            self.branches.append(
+                {
+                    "node": node,
+                    "run": run,
+                    "priority": priority,
+                    "queued": started - start,
+                    "executed": time.perf_counter() - started,
+                }
+            )
+            self._dispatch(state)
+
+    def scheduled(self, node: Any, name: str = "") -> Callable:
+        """Wrap a graph node (async function or runnable such as a compiled
+        sub-graph) so that each branch runs within a slot."""
+
+        async def run(state: dict, config: RunnableConfig):
+            configurable = config.get("configurable", {})
+            async with self.slot(
+                run=str(configurable.get("thread_id", "default")),
+                priority=configurable.get("priority", 0),
+                node=name,
+            ):
+                if isinstance(node, Runnable):
+                    return await node.ainvoke(state, config)
+                return await node(state)
+
+        return run
+
+    def timings(self, node: Optional[str] = None) -> dict:
+        """Mean queueing and execution time (seconds) of the recent branches."""
+        branches = [b for b in self.branches if node is None or b["node"] == node]
+        if not branches:
+            return {"branches": 0, "queued": 0.0, "executed": 0.0}
+        return {
+            "branches": len(branches),
+            "queued": sum(b["queued"] for b in branches) / len(branches),
+            "executed": sum(b["executed"] for b in branches) / len(branches),
+        }
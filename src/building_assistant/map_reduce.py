@@ -1,19 +1,37 @@
+import asyncio
 import json
 import operator
+import os
+from collections import Counter
 from typing import Annotated
 from typing_extensions import TypedDict
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
+from langchain_core.exceptions import OutputParserException
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.config import get_stream_writer
 from langgraph.constants import Send
 from langgraph.graph import START, END, StateGraph
+from langgraph.types import RetryPolicy, default_retry_on
 
-from src.model import llm
+from src.model import branch_scheduler, llm, pool
 
 # Prompts we will use
 subjects_prompt = """Generate a list of 3 sub-topics that are all related to this overall topic: {topic}."""
 joke_prompt = """Generate a joke about {subject}"""
+jokes_prompt = """Generate one joke about each of these subjects, in the same order, with its subject:\n\n{subjects}"""
 best_joke_prompt = """Below are a bunch of jokes about {topic}. Select the best one! Return the ID of the best one, starting 0 as the ID for the first joke. Jokes: \n\n  {jokes}"""
 
+# Attempts per joke branch, the first retry after 0.5s (doubled on each retry,
+# with jitter), and share of the subjects that must have a joke for best_joke
+# to run
+JOKE_ATTEMPTS = 3
+QUORUM = 0.5
+# Subjects written by one structured-output request; 1 (the default) sends one
+# request per subject
+JOKE_BATCH_SIZE = int(os.environ.get("JOKE_BATCH_SIZE", "1"))
+
 
 # Parallelizing joke generation
 class Subjects(BaseModel):
@@ -28,17 +46,24 @@ class OverallState(TypedDict):
     topic: str
     subjects: list
     jokes: Annotated[list, operator.add]
+    failed: Annotated[list, operator.add]  # Subjects without a joke
     best_selected_joke: str
 
 
-def generate_topics(state: OverallState):
+async def generate_topics(state: OverallState):
     prompt = subjects_prompt.format(topic=state["topic"])
-    response = llm.with_structured_output(Subjects).invoke(prompt)
+    response = await pool.ainvoke(llm.with_structured_output(Subjects), prompt)
     return {"subjects": response.subjects}
 
 
 def continue_to_jokes(state: OverallState):
-    return [Send("generate_joke", {"subject": s}) for s in state["subjects"]]
+    subjects = state["subjects"]
+    if JOKE_BATCH_SIZE > 1:
+        return [
+            Send("generate_jokes", {"subjects": subjects[i : i + JOKE_BATCH_SIZE]})
+            for i in range(0, len(subjects), JOKE_BATCH_SIZE)
+        ]
+    return [Send("generate_joke", {"subject": s}) for s in subjects]
 
 
 # Joke generation (map)
@@ -50,34 +75,162 @@ class Joke(BaseModel):
     joke: str
 
 
-def generate_joke(state: JokeState):
+async def generate_joke(state: JokeState):
     prompt = joke_prompt.format(subject=state["subject"])
-    response = llm.with_structured_output(Joke).invoke(prompt)
+    response = await pool.ainvoke(llm.with_structured_output(Joke), prompt)
+    # Stream the joke as soon as this branch is done (stream_mode="custom")
+    get_stream_writer()({"subject": state["subject"], "joke": response.joke})
     return {"jokes": [response.joke]}
 
 
+# Batched joke generation (map, JOKE_BATCH_SIZE > 1)
+class JokeBatchState(TypedDict):
+    subjects: list[str]
+
+
+class SubjectJoke(BaseModel):
+    subject: str
+    joke: str
+
+
+class Jokes(BaseModel):
+    jokes: list[SubjectJoke]
+
+
+def match_jokes(subjects: list[str], jokes: list[SubjectJoke]) -> dict[str, str]:
+    """Joke of each subject: by position when the model returned one joke per
+    subject, else by subject name."""
+    if len(jokes) == len(subjects):
+        return {subject: item.joke for subject, item in zip(subjects, jokes)}
+    by_name = {item.subject.strip().casefold(): item.joke for item in jokes}
+    return {
+        subject: by_name[subject.strip().casefold()]
+        for subject in subjects
+        if subject.strip().casefold() in by_name
+    }
+
+
+async def generate_jokes(state: JokeBatchState):
+    subjects = state["subjects"]
+    prompt = jokes_prompt.format(subjects="\n".join(f"- {s}" for s in subjects))
+    # Only an unparsable answer falls back to one call per subject; other
+    # errors (throttling, network) are left to the node's RetryPolicy
+    try:
+        response = await pool.ainvoke(llm.with_structured_output(Jokes), prompt)
+        matched = match_jokes(subjects, response.jokes)
+    except (OutputParserException, ValidationError):
+        matched = {}
+    writer = get_stream_writer()
+    for subject, joke in matched.items():
+        writer({"subject": subject, "joke": joke})
+    # Subjects the batch did not answer fall back to one request each
+    fallbacks = await asyncio.gather(
+        *(generate_joke({"subject": s}) for s in subjects if s not in matched)
+    )
+    return {
+        "jokes": list(matched.values())
+        + [joke for update in fallbacks for joke in update["jokes"]]
+    }
+
+
+def retry_joke(error: Exception) -> bool:
+    """Errors worth another attempt: those LangGraph retries by default
+    (network, 5xx) and the parse errors of a structured output."""
+    return isinstance(error, (OutputParserException, ValidationError)) or (
+        default_retry_on(error)
+    )
+
+
+# Attempts made so far by each joke task (its checkpoint namespace)
+_attempts: Counter = Counter()
+
+
+def tolerate_failure(node):
+    """Wrap a joke node retried by `RetryPolicy(retry_on=retry_joke)`.
+
+    A retryable error is raised for the policy to retry the branch, until the
+    last attempt, which reports the branch's subjects in `failed` instead, so
+    best_joke can run on the other branches. Other errors fail the run, and
+    resuming the thread reruns only the failed branches.
+    """
+
+    async def run(state: dict, config: RunnableConfig):
+        task = config["configurable"]["checkpoint_ns"]
+        _attempts[task] += 1
+        try:
+            update = await node(state, config)
+        except Exception as error:
+            retry = retry_joke(error)
+            if retry and _attempts[task] < JOKE_ATTEMPTS:
+                raise
+            _attempts.pop(task, None)
+            if not retry:
+                raise
+            subjects = state.get("subjects") or [state["subject"]]
+            writer = get_stream_writer()
+            for subject in subjects:
+                writer({"subject": subject, "error": repr(error)})
+            return {"failed": subjects}
+        _attempts.pop(task, None)
+        return update
+
+    return run
+
+
 # Best joke selection (reduce)
-def best_joke(state: OverallState):
-    jokes = "\n\n".join(state["jokes"])
-    prompt = best_joke_prompt.format(topic=state["topic"], jokes=jokes)
-    response = llm.with_structured_output(BestJoke).invoke(prompt)
-    return {"best_selected_joke": state["jokes"][response.id]}
+async def best_joke(state: OverallState):
+    jokes = state["jokes"]
+    if not jokes or len(jokes) < QUORUM * len(state["subjects"]):
+        raise ValueError(
+            f"Only {len(jokes)} of {len(state['subjects'])} jokes were written, "
+            f"failed subjects: {state.get('failed', [])}"
+        )
+    prompt = best_joke_prompt.format(topic=state["topic"], jokes="\n\n".join(jokes))
+    response = await pool.ainvoke(llm.with_structured_output(BestJoke), prompt)
+    # The model may return an ID outside the list; fall back to the first joke
+    index = response.id if 0 <= response.id < len(jokes) else 0
+    return {"best_selected_joke": jokes[index]}
 
 
 # Construct the graph: here we put everything together to construct our graph
 graph = StateGraph(OverallState)
 graph.add_node("generate_topics", generate_topics)
-graph.add_node("generate_joke", generate_joke)
+# Each subject is a Send() branch, started within the shared branch cap and
+# retried alone; a branch still failing is reported in `failed`
+graph.add_node(
+    "generate_joke",
+    tolerate_failure(branch_scheduler.scheduled(generate_joke, "generate_joke")),
+    retry=RetryPolicy(max_attempts=JOKE_ATTEMPTS, retry_on=retry_joke),
+)
+graph.add_node(
+    "generate_jokes",
+    tolerate_failure(branch_scheduler.scheduled(generate_jokes, "generate_jokes")),
+    retry=RetryPolicy(max_attempts=JOKE_ATTEMPTS, retry_on=retry_joke),
+)
 graph.add_node("best_joke", best_joke)
 graph.add_edge(START, "generate_topics")
-graph.add_conditional_edges("generate_topics", continue_to_jokes, ["generate_joke"])
+graph.add_conditional_edges(
+    "generate_topics", continue_to_jokes, ["generate_joke", "generate_jokes"]
+)
 graph.add_edge("generate_joke", "best_joke")
+graph.add_edge("generate_jokes", "best_joke")
 graph.add_edge("best_joke", END)
 
-# Compile the graph
-app = graph.compile()
+# Compile the graph; the checkpointer saves each branch result as it lands, so
+# a run failed by a non-retryable error and resumed on the same thread
+# (`app.ainvoke(None, thread)`) only reruns the failed branches
+app = graph.compile(checkpointer=MemorySaver())
 print(json.dumps(app.get_graph().to_json(), indent=2))
 
+
 # Call the graph: here we call it to generate a list of jokes
-for s in app.stream({"topic": "animals"}):
-    print(s)
+async def main():
+    thread = {"configurable": {"thread_id": "1"}}
+    # Jokes are streamed as each branch finishes, then the node updates
+    async for mode, chunk in app.astream(
+        {"topic": "animals"}, thread, stream_mode=["custom", "updates"]
+    ):
+        print(mode, chunk)
+
+
+asyncio.run(main())
@@ -7,7 +7,7 @@ from langchain_community.document_loaders import WikipediaLoader
 from langchain_community.tools import TavilySearchResults
 from langgraph.graph import StateGraph, START, END
 
-from src.model import llm
+from src.model import llm, pool
 
 
 class State(TypedDict):
@@ -16,12 +16,12 @@ class State(TypedDict):
     context: Annotated[list, operator.add]
 
 
-def search_web(state):
+async def search_web(state):
     """Retrieve docs from web search"""
 
     # Search
     tavily_search = TavilySearchResults(max_results=3)
-    search_docs = tavily_search.invoke(state["question"])
+    search_docs = await tavily_search.ainvoke(state["question"])
     # Format
     formatted_search_docs = "\n\n---\n\n".join(
         [
@@ -32,11 +32,13 @@ def search_web(state):
     return {"context": [formatted_search_docs]}
 
 
-def search_wikipedia(state):
+async def search_wikipedia(state):
     """Retrieve docs from wikipedia"""
 
     # Search
-    search_docs = WikipediaLoader(query=state["question"], load_max_docs=2).load()
+    search_docs = await WikipediaLoader(
+        query=state["question"], load_max_docs=2
+    ).aload()
     # Format
     formatted_search_docs = "\n\n---\n\n".join(
         [
@@ -47,7 +49,7 @@ def search_wikipedia(state):
     return {"context": [formatted_search_docs]}
 
 
-def generate_answer(state):
+async def generate_answer(state):
     """Node to answer a question"""
 
     # Get state
@@ -58,9 +60,10 @@ def generate_answer(state):
     answer_instructions = answer_template.format(question=question, context=context)
 
     # Answer
-    answer = llm.invoke(
+    answer = await pool.ainvoke(
+        llm,
         [SystemMessage(content=answer_instructions)]
-        + [HumanMessage(content="Answer the question.")]
+        + [HumanMessage(content="Answer the question.")],
     )
 
     # Append it to state
@@ -7,13 +7,17 @@ from pydantic import BaseModel, Field
 from langgraph.graph import MessagesState
 from langgraph.graph import START, END, StateGraph
 from langgraph.checkpoint.memory import MemorySaver
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain_community.document_loaders import WikipediaLoader
+from langchain_core.documents import Document
 from langchain_core.messages import get_buffer_string
 from langgraph.constants import Send
 
-from src.model import llm
+from src.context_cache import static_prefix
+from src.model import llm, retrieval_cache
+from src.research_context import merge_documents, pack_documents
+from src.retrieval_cache import retrieve
 
 
 # GENERATE ANALYSTS: HUMAN-IN-THE-LOOP
@@ -177,9 +181,12 @@ for analyst in analysts:
 # CONDUCT INTERVIEW
 class InterviewState(MessagesState):
     max_num_turns: int  # Number turns of conversation
-    context: Annotated[list, operator.add]  # Source docs
+    turns: Annotated[int, operator.add]  # Expert answers so far
+    finished: Annotated[bool, operator.or_]  # The analyst ended the interview
+    context: Annotated[list, merge_documents]  # Source docs, without duplicates
     analyst: Analyst  # Analyst asking questions
     interview: str  # Interview transcript
+    search_query: str  # Query shared by all the retrievers
     sections: list  # Final key we duplicate in outer state for Send() API
 
 
@@ -187,15 +194,18 @@ class SearchQuery(BaseModel):
     search_query: str = Field(None, description="Search query for retrieval.")
 
 
-question_instructions = """You are an analyst tasked with interviewing an expert to learn about a specific topic.
+question_instructions = static_prefix(
+    """You are an analyst tasked with interviewing an expert to learn about a specific topic.
 Your goal is boil down to interesting and specific insights related to your topic.
 1. Interesting: Insights that people will find surprising or non-obvious.
 2. Specific: Insights that avoid generalities and include specific examples from the expert.
-Here is your topic of focus and set of goals: {goals}
+You will be given your topic of focus and set of goals.
 Begin by introducing yourself using a name that fits your persona, and then ask your question.
 Continue to ask questions to drill down and refine your understanding of the topic.
 When you are satisfied with your understanding, complete the interview with: "Thank you so much for your help!"
 Remember to stay in character throughout your response, reflecting the persona and goals provided to you."""
+)
+question_goals = "Here is your topic of focus and set of goals: {goals}"
 
 
 def generate_question(state: InterviewState):
@@ -204,10 +214,13 @@ def generate_question(state: InterviewState):
     analyst = state["analyst"]
     messages = state["messages"]
     # Generate question
-    system_message = question_instructions.format(goals=analyst.persona)
-    question = llm.invoke([SystemMessage(content=system_message)] + messages)
-    # Write messages to state
-    return {"messages": [question]}
+    goals = HumanMessage(content=question_goals.format(goals=analyst.persona))
+    question = llm.invoke([question_instructions, goals] + messages)
+    # Write messages to state, noting whether this question ends the interview
+    return {
+        "messages": [question],
+        "finished": "Thank you so much for your help" in question.content,
+    }
 
 
 # GENERATE ANSWER: PARALLELIZATION
@@ -223,47 +236,43 @@ Convert this final question into a well-structured web search query"""
 )
 
 
-def search_web(state: InterviewState):
-    """Retrieve docs from web search"""
-    # Search query
+def generate_query(state: InterviewState):
+    """Write the search query used by every retriever"""
     structured_llm = llm.with_structured_output(SearchQuery)
     search_query = structured_llm.invoke([search_instructions] + state["messages"])
-    # Search
-    search_docs = tavily_search.invoke(search_query.search_query)
-    # Format
-    formatted_search_docs = "\n\n---\n\n".join(
-        [
-            f'<Document href="{doc["url"]}"/>\n{doc["content"]}\n</Document>'
+    return {"search_query": search_query.search_query}
+
+
+def search_web(state: InterviewState):
+    """Retrieve docs from web search"""
+    # Search, reusing the results of an equivalent query
+    search_docs = retrieve(
+        retrieval_cache, "web", state["search_query"], tavily_search.invoke
+    )
+    return {
+        "context": [
+            Document(page_content=doc["content"], metadata={"href": doc["url"]})
             for doc in search_docs
         ]
-    )
-    return {"context": [formatted_search_docs]}
+    }
 
 
 def search_wikipedia(state: InterviewState):
     """Retrieve docs from wikipedia"""
-    # Search query
-    structured_llm = llm.with_structured_output(SearchQuery)
-    search_query = structured_llm.invoke([search_instructions] + state["messages"])
-    # Search
-    search_docs = WikipediaLoader(
-        query=search_query.search_query, load_max_docs=2
-    ).load()
-    # Format
-    formatted_search_docs = "\n\n---\n\n".join(
-        [
-            f'<Document source="{doc.metadata["source"]}" page="{doc.metadata.get("page", "")}"/>\n{doc.page_content}\n</Document>'
-            for doc in search_docs
-        ]
+    # Search, reusing the results of an equivalent query
+    search_docs = retrieve(
+        retrieval_cache,
+        "wikipedia",
+        state["search_query"],
+        lambda query: WikipediaLoader(query=query, load_max_docs=2).load(),
     )
-    return {"context": [formatted_search_docs]}
+    return {"context": search_docs}
 
 
-answer_instructions = """You are an expert being interviewed by an analyst.
-Here is analyst area of focus: {goals}.
-You goal is to answer a question posed by the interviewer.
-To answer question, use this context:
-{context}
+answer_instructions = static_prefix(
+    """You are an expert being interviewed by an analyst.
+You will be given the analyst area of focus and a context.
+You goal is to answer a question posed by the interviewer, using this context.
 When answering questions, follow these guidelines:
 1. Use only the information provided in the context.
 2. Do not introduce external information or make assumptions beyond what is explicitly stated in the context.
@@ -273,6 +282,10 @@ When answering questions, follow these guidelines:
 6. If the source is: <Document source="assistant/docs/llama3_1.pdf" page="7"/>' then just list:
 [1] assistant/docs/llama3_1.pdf, page 7
 And skip the addition of the brackets as well as the Document source preamble in your citation."""
+)
+answer_context = """Here is analyst area of focus: {goals}.
+To answer question, use this context:
+{context}"""
 
 
 def generate_answer(state: InterviewState):
@@ -280,14 +293,17 @@ def generate_answer(state: InterviewState):
     # Get state
     analyst = state["analyst"]
     messages = state["messages"]
-    context = state["context"]
+    # Documents most relevant to the question, within the token budget
+    context = pack_documents(state["context"], messages[-1].content)
     # Answer question
-    system_message = answer_instructions.format(goals=analyst.persona, context=context)
-    answer = llm.invoke([SystemMessage(content=system_message)] + messages)
+    context = HumanMessage(
+        content=answer_context.format(goals=analyst.persona, context=context)
+    )
+    answer = llm.invoke([answer_instructions, context] + messages)
     # Name the message as coming from the expert
     answer.name = "expert"
-    # Append it to state
-    return {"messages": [answer]}
+    # Append it to state and count the turn
+    return {"messages": [answer], "turns": 1}
 
 
 def save_interview(state: InterviewState):
@@ -300,27 +316,17 @@ def save_interview(state: InterviewState):
     return {"interview": interview}
 
 
-def route_messages(state: InterviewState, name: str = "expert"):
+def route_messages(state: InterviewState):
     """Route between question and answer"""
-    # Get messages
-    messages = state["messages"]
-    max_num_turns = state.get("max_num_turns", 2)
-    # Check the number of expert answers
-    num_responses = len(
-        [m for m in messages if isinstance(m, AIMessage) and m.name == name]
-    )
-    # End if expert has answered more than the max turns
-    if num_responses >= max_num_turns:
-        return "save_interview"
-    # This router is run after each question - answer pair
-    # Get the last question asked to check if it signals the end of discussion
-    last_question = messages[-2]
-    if "Thank you so much for your help" in last_question.content:
+    # End if expert has answered the max turns, or if the last question
+    # signaled the end of discussion (both are kept up to date by the nodes)
+    if state["turns"] >= state.get("max_num_turns", 2) or state["finished"]:
         return "save_interview"
     return "ask_question"
 
 
-section_writer_instructions = """You are an expert technical writer.
+section_writer_instructions = static_prefix(
+    """You are an expert technical writer.
 Your task is to create a short, easily digestible section of a report based on a set of source documents.
 1. Analyze the content of the source documents:
 - The name of each source document is at the start of the document, with the <Document tag.
@@ -331,8 +337,7 @@ Your task is to create a short, easily digestible section of a report based on a
 a. Title (## header)
 b. Summary (### header)
 c. Sources (### header)
-4. Make your title engaging based upon the focus area of the analyst:
-{focus}
+4. Make your title engaging based upon the focus area of the analyst, given with the source documents.
 5. For the summary section:
 - Set up summary with general background / context related to the focus area of the analyst
 - Emphasize what is novel, interesting, or surprising about insights gathered from the interview
@@ -357,17 +362,19 @@ There should be no redundant sources. It should simply be:
 - Ensure the report follows the required structure
 - Include no preamble before the title of the report
 - Check that all guidelines have been followed"""
+)
+section_writer_focus = "Here is the focus area of the analyst: {focus}"
 
 
 def write_section(state: InterviewState):
     """Node to answer a question"""
     # Get state
-    context = state["context"]
     analyst = state["analyst"]
+    context = pack_documents(state["context"], analyst.description)
     # Write section using either the gathered source docs from interview (context) or the interview itself (interview)
-    system_message = section_writer_instructions.format(focus=analyst.description)
+    focus = section_writer_focus.format(focus=analyst.description)
     section = llm.invoke(
-        [SystemMessage(content=system_message)]
+        [section_writer_instructions, HumanMessage(content=focus)]
         + [HumanMessage(content=f"Use this source to write your section: {context}")]
     )
     # Append it to state
@@ -377,6 +384,7 @@ def write_section(state: InterviewState):
 # Add nodes and edges
 interview_builder = StateGraph(InterviewState)
 interview_builder.add_node("ask_question", generate_question)
+interview_builder.add_node("generate_query", generate_query)
 interview_builder.add_node("search_web", search_web)
 interview_builder.add_node("search_wikipedia", search_wikipedia)
 interview_builder.add_node("answer_question", generate_answer)
@@ -384,8 +392,10 @@ interview_builder.add_node("save_interview", save_interview)
 interview_builder.add_node("write_section", write_section)
 # Flow
 interview_builder.add_edge(START, "ask_question")
-interview_builder.add_edge("ask_question", "search_web")
-interview_builder.add_edge("ask_question", "search_wikipedia")
+interview_builder.add_edge("ask_question", "generate_query")
+# One query fanned out to all the retrievers
+interview_builder.add_edge("generate_query", "search_web")
+interview_builder.add_edge("generate_query", "search_wikipedia")
 interview_builder.add_edge("search_web", "answer_question")
 interview_builder.add_edge("search_wikipedia", "answer_question")
 interview_builder.add_conditional_edges(
@@ -450,8 +460,8 @@ def initiate_all_interviews(state: ResearchGraphState):
         ]
 
 
-report_writer_instructions = """You are a technical writer creating a report on this overall topic:
-{topic}
+report_writer_instructions = static_prefix(
+    """You are a technical writer creating a report on an overall topic, given with the memos.
 You have a team of analysts. Each analyst has done two things:
 1. They conducted an interview with an expert on a specific sub-topic.
 2. They write up their finding into a memo.
@@ -470,7 +480,9 @@ To format your report:
 7. Create a final, consolidated list of sources and add to a Sources section with the `## Sources` header.
 8. List your sources in order and do not repeat.
 [1] Source 1
-[2] Source 2
+[2] Source 2"""
+)
+report_writer_memos = """Here is the overall topic: {topic}
 Here are the memos from your analysts to build your report from:
 {context}"""
 
@@ -482,18 +494,17 @@ def write_report(state: ResearchGraphState):
     # Concat all sections together
     formatted_str_sections = "\n\n".join([f"{section}" for section in sections])
     # Summarize the sections into a final report
-    system_message = report_writer_instructions.format(
-        topic=topic, context=formatted_str_sections
-    )
+    memos = report_writer_memos.format(topic=topic, context=formatted_str_sections)
     report = llm.invoke(
-        [SystemMessage(content=system_message)]
+        [report_writer_instructions, HumanMessage(content=memos)]
         + [HumanMessage(content="Write a report based upon these memos.")]
     )
     return {"content": report.content}
 
 
-intro_conclusion_instructions = """You are a technical writer finishing a report on {topic}
-You will be given all of the sections of the report.
+intro_conclusion_instructions = static_prefix(
+    """You are a technical writer finishing a report.
+You will be given the topic and all of the sections of the report.
 You job is to write a crisp and compelling introduction or conclusion section.
 The user will instruct you whether to write the introduction or conclusion.
 Include no pre-amble for either section.
@@ -501,7 +512,9 @@ Target around 100 words, crisply previewing (for introduction) or recapping (for
 Use markdown formatting.
 For your introduction, create a compelling title and use the # header for the title.
 For your introduction, use ## Introduction as the section header.
-For your conclusion, use ## Conclusion as the section header.
+For your conclusion, use ## Conclusion as the section header."""
+)
+intro_conclusion_sections = """The report is on {topic}
 Here are the sections to reflect on for writing: {formatted_str_sections}"""
 
 
@@ -512,11 +525,12 @@ def write_introduction(state: ResearchGraphState):
     # Concat all sections together
     formatted_str_sections = "\n\n".join([f"{section}" for section in sections])
     # Summarize the sections into a final report
-    instructions = intro_conclusion_instructions.format(
+    report_sections = intro_conclusion_sections.format(
         topic=topic, formatted_str_sections=formatted_str_sections
     )
     intro = llm.invoke(
-        [instructions] + [HumanMessage(content="Write the report introduction")]
+        [intro_conclusion_instructions, HumanMessage(content=report_sections)]
+        + [HumanMessage(content="Write the report introduction")]
     )
     return {"introduction": intro.content}
 
@@ -528,11 +542,12 @@ def write_conclusion(state: ResearchGraphState):
     # Concat all sections together
     formatted_str_sections = "\n\n".join([f"{section}" for section in sections])
     # Summarize the sections into a final report
-    instructions = intro_conclusion_instructions.format(
+    report_sections = intro_conclusion_sections.format(
         topic=topic, formatted_str_sections=formatted_str_sections
     )
     conclusion = llm.invoke(
-        [instructions] + [HumanMessage(content="Write the report conclusion")]
+        [intro_conclusion_instructions, HumanMessage(content=report_sections)]
+        + [HumanMessage(content="Write the report conclusion")]
     )
     return {"conclusion": conclusion.content}
 
@@ -1,20 +1,21 @@
 import operator
-from typing import Annotated, List
+from typing import Annotated, List, Optional
 from typing_extensions import TypedDict
 
 from pydantic import BaseModel, Field
-from langchain_community.document_loaders import WikipediaLoader
-from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain_core.messages import (
-    AIMessage,
     HumanMessage,
     SystemMessage,
     get_buffer_string,
 )
+from langgraph.config import get_stream_writer
 from langgraph.constants import Send
 from langgraph.graph import END, MessagesState, START, StateGraph
 
-from src.model import llm
+from src import retrievers
+from src.context_cache import static_prefix
+from src.model import branch_scheduler, llm, pool
+from src.research_context import merge_documents, pack_documents
 
 
 ### Schema
@@ -50,9 +51,13 @@ class GenerateAnalystsState(TypedDict):
 
 class InterviewState(MessagesState):
     max_num_turns: int  # Number turns of conversation
-    context: Annotated[list, operator.add]  # Source docs
+    turns: Annotated[int, operator.add]  # Expert answers so far
+    finished: Annotated[bool, operator.or_]  # The analyst ended the interview
+    context: Annotated[list, merge_documents]  # Source docs, without duplicates
     analyst: Analyst  # Analyst asking questions
     interview: str  # Interview transcript
+    search_query: str  # Query shared by all the retrievers
+    retrieval: Annotated[list, operator.add]  # Latency and status of each source
     sections: list  # Final key we duplicate in outer state for Send() API
 
 
@@ -90,7 +95,7 @@ analyst_instructions = """You are tasked with creating a set of AI analyst perso
 5. Assign one analyst to each theme."""
 
 
-def create_analysts(state: GenerateAnalystsState):
+async def create_analysts(state: GenerateAnalystsState):
     """Create analysts"""
 
     topic = state["topic"]
@@ -105,9 +110,10 @@ def create_analysts(state: GenerateAnalystsState):
         max_analysts=max_analysts,
     )
     # Generate question
-    analysts = structured_llm.invoke(
+    analysts = await pool.ainvoke(
+        structured_llm,
         [SystemMessage(content=system_message)]
-        + [HumanMessage(content="Generate the set of analysts.")]
+        + [HumanMessage(content="Generate the set of analysts.")],
     )
     # Write the list of analysis to state
     return {"analysts": analysts.analysts}
@@ -119,7 +125,8 @@ def human_feedback(state: GenerateAnalystsState):
 
 
 # Generate analyst question
-question_instructions = """You are an analyst tasked with interviewing an expert to learn about a specific topic.
+question_instructions = static_prefix(
+    """You are an analyst tasked with interviewing an expert to learn about a specific topic.
 
 Your goal is boil down to interesting and specific insights related to your topic.
 
@@ -127,7 +134,7 @@ Your goal is boil down to interesting and specific insights related to your topi
 
 2. Specific: Insights that avoid generalities and include specific examples from the expert.
 
-Here is your topic of focus and set of goals: {goals}
+You will be given your topic of focus and set of goals.
 
 Begin by introducing yourself using a name that fits your persona, and then ask your question.
 
@@ -136,18 +143,23 @@ Continue to ask questions to drill down and refine your understanding of the top
 When you are satisfied with your understanding, complete the interview with: "Thank you so much for your help!"
 
 Remember to stay in character throughout your response, reflecting the persona and goals provided to you."""
+)
+question_goals = "Here is your topic of focus and set of goals: {goals}"
 
 
-def generate_question(state: InterviewState):
+async def generate_question(state: InterviewState):
     """Node to generate a question"""
     # Get state
     analyst = state["analyst"]
     messages = state["messages"]
     # Generate question
-    system_message = question_instructions.format(goals=analyst.persona)
-    question = llm.invoke([SystemMessage(content=system_message)] + messages)
-    # Write messages to state
-    return {"messages": [question]}
+    goals = HumanMessage(content=question_goals.format(goals=analyst.persona))
+    question = await pool.ainvoke(llm, [question_instructions, goals] + messages)
+    # Write messages to state, noting whether this question ends the interview
+    return {
+        "messages": [question],
+        "finished": "Thank you so much for your help" in question.content,
+    }
 
 
 # Search query writing
@@ -164,55 +176,32 @@ Convert this final question into a well-structured web search query"""
 )
 
 
-def search_web(state: InterviewState):
-    """Retrieve docs from web search"""
-    # Search
-    tavily_search = TavilySearchResults(max_results=3)
-    # Search query
+async def generate_query(state: InterviewState):
+    """Write the search query used by every retriever"""
     structured_llm = llm.with_structured_output(SearchQuery)
-    search_query = structured_llm.invoke([search_instructions] + state["messages"])
-    # Search
-    search_docs = tavily_search.invoke(search_query.search_query)
-    # Format
-    formatted_search_docs = "\n\n---\n\n".join(
-        [
-            f'<Document href="{doc["url"]}"/>\n{doc["content"]}\n</Document>'
-            for doc in search_docs
-        ]
+    search_query = await pool.ainvoke(
+        structured_llm, [search_instructions] + state["messages"]
     )
-    return {"context": [formatted_search_docs]}
-
+    return {"search_query": search_query.search_query}
 
-def search_wikipedia(state: InterviewState):
-    """Retrieve docs from wikipedia"""
 
-    # Search query
-    structured_llm = llm.with_structured_output(SearchQuery)
-    search_query = structured_llm.invoke([search_instructions] + state["messages"])
-    # Search
-    search_docs = WikipediaLoader(
-        query=search_query.search_query, load_max_docs=2
-    ).load()
-    # Format
-    formatted_search_docs = "\n\n---\n\n".join(
-        [
-            f'<Document source="{doc.metadata["source"]}" page="{doc.metadata.get("page", "")}"/>\n{doc.page_content}\n</Document>'
-            for doc in search_docs
-        ]
-    )
-    return {"context": [formatted_search_docs]}
+async def retrieve(state: InterviewState):
+    """Retrieve docs from every registered source"""
+    # Sources missing their deadline are left out of the context
+    documents, metrics = await retrievers.fan_out(state["search_query"])
+    return {
+        "context": [doc for docs in documents.values() for doc in docs],
+        "retrieval": [metrics],
+    }
 
 
 # Generate expert answer
-answer_instructions = """You are an expert being interviewed by an analyst.
-
-Here is analyst area of focus: {goals}.
+answer_instructions = static_prefix(
+    """You are an expert being interviewed by an analyst.
 
-You goal is to answer a question posed by the interviewer.
+You will be given the analyst area of focus and a context.
 
-To answer question, use this context:
-
-{context}
+You goal is to answer a question posed by the interviewer, using this context.
 
 When answering questions, follow these guidelines:
 
@@ -231,22 +220,31 @@ When answering questions, follow these guidelines:
 [1] assistant/docs/llama3_1.pdf, page 7
 
 And skip the addition of the brackets as well as the Document source preamble in your citation."""
+)
+answer_context = """Here is analyst area of focus: {goals}.
 
+To answer question, use this context:
+
+{context}"""
 
-def generate_answer(state: InterviewState):
+
+async def generate_answer(state: InterviewState):
     """Node to answer a question"""
 
     # Get state
     analyst = state["analyst"]
     messages = state["messages"]
-    context = state["context"]
+    # Documents most relevant to the question, within the token budget
+    context = pack_documents(state["context"], messages[-1].content)
     # Answer question
-    system_message = answer_instructions.format(goals=analyst.persona, context=context)
-    answer = llm.invoke([SystemMessage(content=system_message)] + messages)
+    context = HumanMessage(
+        content=answer_context.format(goals=analyst.persona, context=context)
+    )
+    answer = await pool.ainvoke(llm, [answer_instructions, context] + messages)
     # Name the message as coming from the expert
     answer.name = "expert"
-    # Append it to state
-    return {"messages": [answer]}
+    # Append it to state and count the turn
+    return {"messages": [answer], "turns": 1}
 
 
 def save_interview(state: InterviewState):
@@ -259,28 +257,18 @@ def save_interview(state: InterviewState):
     return {"interview": interview}
 
 
-def route_messages(state: InterviewState, name: str = "expert"):
+def route_messages(state: InterviewState):
     """Route between question and answer"""
-    # Get messages
-    messages = state["messages"]
-    max_num_turns = state.get("max_num_turns", 2)
-    # Check the number of expert answers
-    num_responses = len(
-        [m for m in messages if isinstance(m, AIMessage) and m.name == name]
-    )
-    # End if expert has answered more than the max turns
-    if num_responses >= max_num_turns:
-        return "save_interview"
-    # This router is run after each question - answer pair
-    # Get the last question asked to check if it signals the end of discussion
-    last_question = messages[-2]
-    if "Thank you so much for your help" in last_question.content:
+    # End if expert has answered the max turns, or if the last question
+    # signaled the end of discussion (both are kept up to date by the nodes)
+    if state["turns"] >= state.get("max_num_turns", 2) or state["finished"]:
         return "save_interview"
     return "ask_question"
 
 
 # Write a summary (section of the final report) of the interview
-section_writer_instructions = """You are an expert technical writer.
+section_writer_instructions = static_prefix(
+    """You are an expert technical writer.
 
 Your task is to create a short, easily digestible section of a report based on a set of source documents.
 
@@ -296,8 +284,7 @@ a. Title (## header)
 b. Summary (### header)
 c. Sources (### header)
 
-4. Make your title engaging based upon the focus area of the analyst:
-{focus}
+4. Make your title engaging based upon the focus area of the analyst, given with the source documents.
 
 5. For the summary section:
 - Set up summary with general background / context related to the focus area of the analyst
@@ -330,20 +317,25 @@ There should be no redundant sources. It should simply be:
 - Ensure the report follows the required structure
 - Include no preamble before the title of the report
 - Check that all guidelines have been followed"""
+)
+section_writer_focus = "Here is the focus area of the analyst: {focus}"
 
 
-def write_section(state: InterviewState):
+async def write_section(state: InterviewState):
     """Node to write a section"""
 
     # Get state
-    context = state["context"]
     analyst = state["analyst"]
+    context = pack_documents(state["context"], analyst.description)
     # Write section using either the gathered source docs from interview (context) or the interview itself (interview)
-    system_message = section_writer_instructions.format(focus=analyst.description)
-    section = llm.invoke(
-        [SystemMessage(content=system_message)]
-        + [HumanMessage(content=f"Use this source to write your section: {context}")]
+    focus = section_writer_focus.format(focus=analyst.description)
+    section = await pool.ainvoke(
+        llm,
+        [section_writer_instructions, HumanMessage(content=focus)]
+        + [HumanMessage(content=f"Use this source to write your section: {context}")],
     )
+    # Emit the section as soon as this interview is done (stream_mode="custom")
+    get_stream_writer()({"section": section.content})
     # Append it to state
     return {"sections": [section.content]}
 
@@ -351,17 +343,17 @@ def write_section(state: InterviewState):
 # Add nodes and edges
 interview_builder = StateGraph(InterviewState)
 interview_builder.add_node("ask_question", generate_question)
-interview_builder.add_node("search_web", search_web)
-interview_builder.add_node("search_wikipedia", search_wikipedia)
+interview_builder.add_node("generate_query", generate_query)
+interview_builder.add_node("retrieve", retrieve)
 interview_builder.add_node("answer_question", generate_answer)
 interview_builder.add_node("save_interview", save_interview)
 interview_builder.add_node("write_section", write_section)
 # Flow
 interview_builder.add_edge(START, "ask_question")
-interview_builder.add_edge("ask_question", "search_web")
-interview_builder.add_edge("ask_question", "search_wikipedia")
-interview_builder.add_edge("search_web", "answer_question")
-interview_builder.add_edge("search_wikipedia", "answer_question")
+interview_builder.add_edge("ask_question", "generate_query")
+# One query fanned out to all the registered retrievers
+interview_builder.add_edge("generate_query", "retrieve")
+interview_builder.add_edge("retrieve", "answer_question")
 interview_builder.add_conditional_edges(
     "answer_question", route_messages, ["ask_question", "save_interview"]
 )
@@ -396,9 +388,8 @@ def initiate_all_interviews(state: ResearchGraphState):
 
 
 # Write a report based on the interviews
-report_writer_instructions = """You are a technical writer creating a report on this overall topic:
-
-{topic}
+report_writer_instructions = static_prefix(
+    """You are a technical writer creating a report on an overall topic, given with the memos.
 
 You have a team of analysts. Each analyst has done two things:
 
@@ -424,14 +415,16 @@ To format your report:
 8. List your sources in order and do not repeat.
 
 [1] Source 1
-[2] Source 2
+[2] Source 2"""
+)
+report_writer_memos = """Here is the overall topic: {topic}
 
 Here are the memos from your analysts to build your report from:
 
 {context}"""
 
 
-def write_report(state: ResearchGraphState):
+async def write_report(state: ResearchGraphState):
     """Node to write the final report body"""
     # Full set of sections
     sections = state["sections"]
@@ -439,20 +432,21 @@ def write_report(state: ResearchGraphState):
     # Concat all sections together
     formatted_str_sections = "\n\n".join([f"{section}" for section in sections])
     # Summarize the sections into a final report
-    system_message = report_writer_instructions.format(
-        topic=topic, context=formatted_str_sections
-    )
-    report = llm.invoke(
-        [SystemMessage(content=system_message)]
-        + [HumanMessage(content="Write a report based upon these memos.")]
+    memos = report_writer_memos.format(topic=topic, context=formatted_str_sections)
+    report = await pool.ainvoke(
+        llm,
+        [report_writer_instructions, HumanMessage(content=memos)]
+        + [HumanMessage(content="Write a report based upon these memos.")],
     )
+    get_stream_writer()({"content": report.content})
     return {"content": report.content}
 
 
 # Write the introduction or conclusion
-intro_conclusion_instructions = """You are a technical writer finishing a report on {topic}
+intro_conclusion_instructions = static_prefix(
+    """You are a technical writer finishing a report.
 
-You will be given all of the sections of the report.
+You will be given the topic and all of the sections of the report.
 
 You job is to write a crisp and compelling introduction or conclusion section.
 
@@ -468,12 +462,14 @@ For your introduction, create a compelling title and use the # header for the ti
 
 For your introduction, use ## Introduction as the section header.
 
-For your conclusion, use ## Conclusion as the section header.
+For your conclusion, use ## Conclusion as the section header."""
+)
+intro_conclusion_sections = """The report is on {topic}
 
 Here are the sections to reflect on for writing: {formatted_str_sections}"""
 
 
-def write_introduction(state: ResearchGraphState):
+async def write_introduction(state: ResearchGraphState):
     """Node to write the introduction"""
     # Full set of sections
     sections = state["sections"]
@@ -481,16 +477,19 @@ def write_introduction(state: ResearchGraphState):
     # Concat all sections together
     formatted_str_sections = "\n\n".join([f"{section}" for section in sections])
     # Summarize the sections into a final report
-    instructions = intro_conclusion_instructions.format(
+    report_sections = intro_conclusion_sections.format(
         topic=topic, formatted_str_sections=formatted_str_sections
     )
-    intro = llm.invoke(
-        [instructions] + [HumanMessage(content="Write the report introduction")]
+    intro = await pool.ainvoke(
+        llm,
+        [intro_conclusion_instructions, HumanMessage(content=report_sections)]
+        + [HumanMessage(content="Write the report introduction")],
     )
+    get_stream_writer()({"introduction": intro.content})
     return {"introduction": intro.content}
 
 
-def write_conclusion(state: ResearchGraphState):
+async def write_conclusion(state: ResearchGraphState):
     """Node to write the conclusion"""
 
     # Full set of sections
@@ -499,40 +498,49 @@ def write_conclusion(state: ResearchGraphState):
     # Concat all sections together
     formatted_str_sections = "\n\n".join([f"{section}" for section in sections])
     # Summarize the sections into a final report
-    instructions = intro_conclusion_instructions.format(
+    report_sections = intro_conclusion_sections.format(
         topic=topic, formatted_str_sections=formatted_str_sections
     )
-    conclusion = llm.invoke(
-        [instructions] + [HumanMessage(content="Write the report conclusion")]
+    conclusion = await pool.ainvoke(
+        llm,
+        [intro_conclusion_instructions, HumanMessage(content=report_sections)]
+        + [HumanMessage(content="Write the report conclusion")],
     )
+    get_stream_writer()({"conclusion": conclusion.content})
     return {"conclusion": conclusion.content}
 
 
+def assemble_report(
+    introduction: Optional[str],
+    content: Optional[str],
+    conclusion: Optional[str],
+    sections: Optional[list] = None,
+) -> str:
+    """Markdown of the report from the parts written so far.
+
+    Until the report body is written, the interview sections are shown in
+    its place.
+    """
+    sources = None
+    if content is not None:
+        content = content.removeprefix("## Insights")
+        if "\n## Sources\n" in content:
+            content, _, sources = content.partition("\n## Sources\n")
+    else:
+        content = "\n\n".join(sections or [])
+    parts = [part for part in (introduction, content, conclusion) if part]
+    report = "\n\n---\n\n".join(parts)
+    if sources is not None:
+        report += "\n\n## Sources\n" + sources
+    return report
+
+
 def finalize_report(state: ResearchGraphState):
     """The is the "reduce" step where we gather all the sections, combine them, and reflect on them to write the intro/conclusion"""
-
     # Save full final report
-    content = state["content"]
-    if content.startswith("## Insights"):
-        content = content.strip("## Insights")
-    if "## Sources" in content:
-        try:
-            content, sources = content.split("\n## Sources\n")
-        except ValueError as ex:
-            print(f"A ValueError occurred: {ex}")
-            sources = None
-    else:
-        sources = None
-
-    final_report = (
-        state["introduction"]
-        + "\n\n---\n\n"
-        + content
-        + "\n\n---\n\n"
-        + state["conclusion"]
+    final_report = assemble_report(
+        state["introduction"], state["content"], state["conclusion"]
     )
-    if sources is not None:
-        final_report += "\n\n## Sources\n" + sources
     return {"final_report": final_report}
 
 
@@ -540,7 +548,11 @@ def finalize_report(state: ResearchGraphState):
 builder = StateGraph(ResearchGraphState)
 builder.add_node("create_analysts", create_analysts)
 builder.add_node("human_feedback", human_feedback)
-builder.add_node("conduct_interview", interview_builder.compile())
+# Interviews are Send() branches, started within the shared branch cap
+builder.add_node(
+    "conduct_interview",
+    branch_scheduler.scheduled(interview_builder.compile(), "conduct_interview"),
+)
 builder.add_node("write_report", write_report)
 builder.add_node("write_introduction", write_introduction)
 builder.add_node("write_conclusion", write_conclusion)
@@ -561,3 +573,26 @@ builder.add_edge(
 builder.add_edge("finalize_report", END)
 # Compile
 graph = builder.compile(interrupt_before=["human_feedback"])
+
+
+async def stream_report(graph, inputs, config=None):
+    """Yield the report markdown each time a part of it is written.
+
+    Sections are yielded as each interview finishes, then replaced by the
+    report body, around which the introduction and conclusion (written
+    concurrently with it) are added as they arrive.
+    """
+    parts = {"sections": [], "introduction": None, "content": None, "conclusion": None}
+    async for _, event in graph.astream(
+        inputs, config, stream_mode="custom", subgraphs=True
+    ):
+        if "section" in event:
+            parts["sections"].append(event["section"])
+        else:
+            parts.update(event)
+        yield assemble_report(
+            parts["introduction"],
+            parts["content"],
+            parts["conclusion"],
+            parts["sections"],
+        )
@@ -0,0 +1,345 @@
+import asyncio
+import hashlib
+import os
+import string
+import threading
+import time
+from typing import Any, Optional, Sequence
+
+from langchain_core.messages import BaseMessage, SystemMessage
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+
+def split_prompt(messages: Sequence[BaseMessage]) -> tuple[list, list]:
+    """Split a prompt into its static prefix (the leading system messages) and
+    its dynamic suffix (the conversation)."""
+    index = 0
+    while index < len(messages) and isinstance(messages[index], SystemMessage):
+        index += 1
+    return list(messages[:index]), list(messages[index:])
+
+
+def static_prefix(content: str) -> SystemMessage:
+    """System message for the static prefix of a prompt.
+
+    The prefix is cached only if it is identical across calls, so per-call data
+    (persona, context, sections) belongs in the messages after it. Raises
+    `ValueError` if `content` is still a template with replacement fields.
+    """
+    fields = [field for _, field, _, _ in string.Formatter().parse(content) if field]
+    if fields:
+        raise ValueError(f"Static prefix has replacement fields: {fields}")
+    return SystemMessage(content=content)
+
+
+def estimate_tokens(messages: Sequence[BaseMessage]) -> int:
+    """Rough token count (4 characters per token), without calling the API."""
+    return sum(len(str(message.content)) for message in messages) // 4
+
+
+def is_cache_error(error: BaseException) -> bool:
+    """Whether a request failed because its cached content is gone."""
+    message = str(error)
+    return "CachedContent" in message or "cached content" in message.lower()
+
+
+class GeminiCacheBackend:
+    """Cached contents stored by the Gemini API (`client.caches`)."""
+
+    def __init__(self, api_key: Optional[str] = None):
+        # Optional dependency, not installed with langchain-google-genai
+        try:
+            from google import genai
+            from google.genai import types
+        except ImportError as error:
+            raise ImportError(
+                "LLM_CONTEXT_CACHE=gemini requires the google-genai package: "
+                "pip install google-genai"
+            ) from error
+
+        self._types = types
+        self.client = genai.Client(api_key=api_key or os.environ.get("GOOGLE_API_KEY"))
+
+    def _create_config(self, prefix: list, ttl: float):
+        return self._types.CreateCachedContentConfig(
+            system_instruction="\n\n".join(str(m.content) for m in prefix),
+            ttl=f"{int(ttl)}s",
+        )
+
+    def create(self, model: str, prefix: list, ttl: float) -> str:
+        return self.client.caches.create(
+            model=model, config=self._create_config(prefix, ttl)
+        ).name
+
+    async def acreate(self, model: str, prefix: list, ttl: float) -> str:
+        cache = await self.client.aio.caches.create(
+            model=model, config=self._create_config(prefix, ttl)
+        )
+        return cache.name
+
+    def refresh(self, name: str, ttl: float):
+        self.client.caches.update(
+            name=name, config=self._types.UpdateCachedContentConfig(ttl=f"{int(ttl)}s")
+        )
+
+    async def arefresh(self, name: str, ttl: float):
+        await self.client.aio.caches.update(
+            name=name, config=self._types.UpdateCachedContentConfig(ttl=f"{int(ttl)}s")
+        )
+
+
+class LocalCacheBackend:
+    """In-process stand-in for the provider cache, used with the fake model."""
+
+    def __init__(self):
+        self.contents: dict[str, list] = {}
+
+    def create(self, model: str, prefix: list, ttl: float) -> str:
+        name = f"localCachedContents/{len(self.contents)}"
+        self.contents[name] = list(prefix)
+        return name
+
+    async def acreate(self, model: str, prefix: list, ttl: float) -> str:
+        return self.create(model, prefix, ttl)
+
+    def refresh(self, name: str, ttl: float):
+        if name not in self.contents:
+            raise KeyError(f"CachedContent not found: {name}")
+
+    async def arefresh(self, name: str, ttl: float):
+        self.refresh(name, ttl)
+
+    def resolve(self, name: str) -> list:
+        """Prefix stored under `name`, as the provider would prepend it."""
+        if name not in self.contents:
+            raise KeyError(f"CachedContent not found: {name}")
+        return self.contents[name]
+
+
+class ContextCache:
+    """Reuse provider-side cached content for repeated static prompt prefixes.
+
+    The leading system messages of a prompt are cached once per (model,
+    prefix) for `ttl` seconds and refreshed when less than `refresh_margin`
+    seconds are left; the request then only sends the dynamic suffix with
+    `cached_content`. Prefixes shorter than `min_tokens` (the provider minimum)
+    or prompts with nothing after the prefix are sent as usual, and so is any
+    prompt whose cache could not be created.
+    """
+
+    def __init__(
+        self,
+        backend,
+        ttl: float = 3600,
+        refresh_margin: float = 300,
+        min_tokens: int = 4096,
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.min_tokens = min_tokens
+        self.stats = {
+            "lookups": 0,
+            "hits": 0,
+            "created": 0,
+            "refreshed": 0,
+            "skipped": 0,
+            "fallbacks": 0,
+            "cached_tokens": 0,
+        }
+        # (model, prefix digest) -> (cache name, expiry time)
+        self._entries: dict[str, tuple[str, float]] = {}
+        self._pending: dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(model: str, prefix: list) -> str:
+        digest = hashlib.sha256(model.encode())
+        for message in prefix:
+            digest.update(b"\x00" + str(message.content).encode())
+        return digest.hexdigest()
+
+    def _eligible(self, messages) -> Optional[tuple[list, list, int]]:
+        prefix, suffix = split_prompt(messages)
+        tokens = estimate_tokens(prefix)
+        with self._lock:
+            self.stats["lookups"] += 1
+            if not prefix or not suffix or tokens < self.min_tokens:
+                self.stats["skipped"] += 1
+                return None
+        return prefix, suffix, tokens
+
+    def _cached(self, key: str) -> tuple[Optional[str], bool]:
+        """(cache name, whether its TTL should be extended) if still alive."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry[1] <= time.time():
+            return None, False
+        return entry[0], entry[1] - time.time() < self.refresh_margin
+
+    def _served(self, key: str, name: str, tokens: int, stat: str):
+        """Count a request served from `name`; created/refreshed caches get a new TTL."""
+        with self._lock:
+            if stat != "hits":
+                self._entries[key] = (name, time.time() + self.ttl)
+            self.stats[stat] += 1
+            self.stats["cached_tokens"] += tokens
+
+    def _fallback(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+            self.stats["fallbacks"] += 1
+
+    def prepare(self, model: str, messages) -> Optional[tuple[str, list]]:
+        """Return (cache name, suffix) to send instead of `messages`, or None."""
+        eligible = self._eligible(messages)
+        if eligible is None:
+            return None
+        prefix, suffix, tokens = eligible
+        key = self._key(model, prefix)
+        name, refresh = self._cached(key)
+        try:
+            if name is None:
+                name = self.backend.create(model, prefix, self.ttl)
+                stat = "created"
+            elif refresh:
+                self.backend.refresh(name, self.ttl)
+                stat = "refreshed"
+            else:
+                stat = "hits"
+        except Exception:
+            self._fallback(key)
+            return None
+        self._served(key, name, tokens, stat)
+        return name, suffix
+
+    async def aprepare(self, model: str, messages) -> Optional[tuple[str, list]]:
+        """Async `prepare`; concurrent branches share one cache creation."""
+        eligible = self._eligible(messages)
+        if eligible is None:
+            return None
+        prefix, suffix, tokens = eligible
+        key = self._key(model, prefix)
+        name, refresh = self._cached(key)
+        try:
+            if name is None:
+                pending = self._pending.get(key)
+                running = asyncio.get_running_loop()
+                if pending is not None and pending.get_loop() is running:
+                    # Another branch is creating the same cache
+                    name = await asyncio.shield(pending)
+                    stat = "hits"
+                else:
+                    task = asyncio.ensure_future(
+                        self.backend.acreate(model, prefix, self.ttl)
+                    )
+                    self._pending[key] = task
+                    try:
+                        name = await task
+                    finally:
+                        self._pending.pop(key, None)
+                    stat = "created"
+            elif refresh:
+                await self.backend.arefresh(name, self.ttl)
+                stat = "refreshed"
+            else:
+                stat = "hits"
+        except Exception:
+            self._fallback(key)
+            return None
+        self._served(key, name, tokens, stat)
+        return name, suffix
+
+    def invalidate(self, messages, model: str):
+        """Forget the cache of a prompt whose request was rejected."""
+        prefix, _ = split_prompt(messages)
+        self._fallback(self._key(model, prefix))
+
+    @property
+    def hit_ratio(self) -> float:
+        """Share of the cached requests that reused an existing cache."""
+        reused = self.stats["hits"] + self.stats["refreshed"]
+        served = reused + self.stats["created"]
+        return reused / served if served else 0.0
+
+
+class CachingChatGoogleGenerativeAI(ChatGoogleGenerativeAI):
+    """Gemini chat model sending static prompt prefixes as cached content.
+
+    Requests with bound tools are sent as usual, since cached content cannot
+    be combined with tools declared in the request, and so are streamed ones.
+    """
+
+    context_cache: Optional[Any] = None
+
+    def _use_cache(self, kwargs) -> bool:
+        return (
+            self.context_cache is not None
+            and not kwargs.get("tools")
+            and not kwargs.get("cached_content")
+        )
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        prepared = (
+            self.context_cache.prepare(self.model, messages)
+            if self._use_cache(kwargs)
+            else None
+        )
+        if prepared is not None:
+            name, suffix = prepared
+            try:
+                return super()._generate(
+                    suffix, stop, run_manager, cached_content=name, **kwargs
+                )
+            except Exception as error:
+                if not is_cache_error(error):
+                    raise
+                self.context_cache.invalidate(messages, self.model)
+        return super()._generate(messages, stop, run_manager, **kwargs)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        prepared = (
+            await self.context_cache.aprepare(self.model, messages)
+            if self._use_cache(kwargs)
+            else None
+        )
+        if prepared is not None:
+            name, suffix = prepared
+            try:
+                return await super()._agenerate(
+                    suffix, stop, run_manager, cached_content=name, **kwargs
+                )
+            except Exception as error:
+                if not is_cache_error(error):
+                    raise
+                self.context_cache.invalidate(messages, self.model)
+        return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+
+def context_cache_from_env(offline: bool = False) -> Optional[ContextCache]:
+    """Build the context cache selected by LLM_CONTEXT_CACHE (gemini | local).
+
+    Anything else (the default) disables it. `offline` (fake model) always
+    emulates the cache locally. Raises `ValueError` if the local cache is
+    selected with the Gemini model, which would be sent the names of caches
+    it does not have, and `ImportError` if the gemini cache is selected
+    without the google-genai package.
+    """
+    mode = os.environ.get("LLM_CONTEXT_CACHE", "").lower()
+    if mode == "local" and not offline:
+        raise ValueError(
+            "LLM_CONTEXT_CACHE=local only emulates the cache for the fake model "
+            "(LLM_BACKEND=fake); use LLM_CONTEXT_CACHE=gemini with Gemini"
+        )
+    if offline and mode in ("local", "gemini"):
+        backend = LocalCacheBackend()
+    elif mode == "gemini":
+        backend = GeminiCacheBackend()
+    else:
+        return None
+    return ContextCache(
+        backend,
+        ttl=float(os.environ.get("LLM_CONTEXT_CACHE_TTL", "3600")),
+        refresh_margin=float(os.environ.get("LLM_CONTEXT_CACHE_REFRESH", "300")),
+        min_tokens=int(os.environ.get("LLM_CONTEXT_CACHE_MIN_TOKENS", "4096")),
+    )
@@ -1,15 +1,17 @@
 import uuid
+from collections import OrderedDict
 from datetime import datetime
-from typing import Literal, Optional, TypedDict
+from typing import Annotated, Literal, Optional, TypedDict
 
 from pydantic import BaseModel, Field
 from trustcall import create_extractor
 from langchain_core.runnables import RunnableConfig
 from langchain_core.messages import merge_message_runs
-from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.messages import SystemMessage, HumanMessage, ToolMessage
 from langchain_google_genai import ChatGoogleGenerativeAI
+from langgraph.channels import UntrackedValue
 from langgraph.graph import StateGraph, MessagesState, START, END
-from langgraph.store.base import BaseStore
+from langgraph.store.base import BaseStore, SearchOp
 
 import configuration
 
@@ -86,6 +88,99 @@ def extract_tool_info(tool_calls, schema_name="Memory"):
     return "\n\n".join(result_parts)
 
 
+# Trustcall extractors by (model, tools, tool_choice, enable_inserts)
+_extractors: dict[tuple, tuple] = {}
+
+
+def get_extractor(model, tools, tool_choice=None, enable_inserts=False, on_end=None):
+    """Return the Trustcall extractor for these arguments, creating it once.
+
+    `on_end` attaches a per-request listener (e.g. `Spy`) without rebuilding
+    the extractor (schemas, tool binding and extraction graph).
+    """
+    key = (id(model), tuple(tools), tool_choice, enable_inserts)
+    if key not in _extractors:
+        # Keep the model so its id cannot be reused by another object
+        _extractors[key] = (
+            model,
+            create_extractor(
+                model,
+                tools=list(tools),
+                tool_choice=tool_choice,
+                enable_inserts=enable_inserts,
+            ),
+        )
+    extractor = _extractors[key][1]
+    return extractor.with_listeners(on_end=on_end) if on_end else extractor
+
+
+# Memory types kept in the store, each in its own namespace
+MEMORY_TYPES = ("profile", "todo", "instructions")
+
+
+async def load_memories(
+    store: BaseStore, todo_category: str, user_id: str
+) -> tuple[dict[str, dict], dict[str, str]]:
+    """Read the profile, ToDo and instructions namespaces in a single store batch.
+
+    Returns `(memories, versions)`: the snapshot {memory type: {key: value}},
+    ordered by creation time so updated items keep their position and new ones
+    are appended, and {memory type: version}, the item count and last update
+    time of each memory type.
+    """
+    results = await store.abatch(
+        [
+            SearchOp((memory_type, todo_category, user_id))
+            for memory_type in MEMORY_TYPES
+        ]
+    )
+    memories, versions = {}, {}
+    for memory_type, items in zip(MEMORY_TYPES, results):
+        items = sorted(items, key=lambda item: (item.created_at, item.key))
+        memories[memory_type] = {item.key: item.value for item in items}
+        last_update = max((item.updated_at for item in items), default=None)
+        versions[memory_type] = f"{len(items)}:{last_update}"
+    return memories, versions
+
+
+class State(MessagesState):
+    # Per-run snapshot of the store, loaded once per user turn by task_mAIstro
+    # and kept in sync by the update nodes (write-through). Untracked, so it is
+    # never written to the checkpoints; a run resumed from a checkpoint loads
+    # it again from the store.
+    memories: Annotated[dict, UntrackedValue]
+    # Version of each memory type of the snapshot, changed by every write
+    memory_versions: Annotated[dict, UntrackedValue]
+
+
+# Rendered ToDo blocks by namespace: (version, {key: (value, line)}, block)
+_todo_blocks: OrderedDict = OrderedDict()
+MAX_RENDERED_BLOCKS = 1024
+
+
+def render_todos(namespace: tuple, version: str, todos: dict) -> str:
+    """Render the ToDo list of the system prompt, one line per item.
+
+    The block is cached per (namespace, version). When the version changed,
+    only the lines of added or modified items are formatted again.
+    """
+    cached = _todo_blocks.get(namespace)
+    if cached is not None:
+        _todo_blocks.move_to_end(namespace)
+        if cached[0] == version:
+            return cached[2]
+    previous = cached[1] if cached is not None else {}
+    lines = {}
+    for key, value in todos.items():
+        entry = previous.get(key)
+        lines[key] = entry if entry and entry[0] == value else (value, f"{value}")
+    block = "\n".join(line for _, line in lines.values())
+    _todo_blocks[namespace] = (version, lines, block)
+    while len(_todo_blocks) > MAX_RENDERED_BLOCKS:
+        _todo_blocks.popitem(last=False)
+    return block
+
+
 ## Schema definitions
 # User profile schema
 class Profile(BaseModel):
@@ -211,7 +306,7 @@ Your current instructions are:
 ## Node definitions
 
 
-def task_mAIstro(state: MessagesState, config: RunnableConfig, store: BaseStore):
+async def task_mAIstro(state: State, config: RunnableConfig, store: BaseStore):
     """Load memories from the store and use them to personalize the chatbot's response."""
 
     # Get the user ID from the config
@@ -219,24 +314,21 @@ def task_mAIstro(state: MessagesState, config: RunnableConfig, store: BaseStore)
     user_id = configurable.user_id
     todo_category = configurable.todo_category
     task_maistro_role = configurable.task_maistro_role
-    # Retrieve profile memory from the store
-    namespace = ("profile", todo_category, user_id)
-    memories = store.search(namespace)
-    if memories:
-        user_profile = memories[0].value
-    else:
-        user_profile = None
-    # Retrieve people memory from the store
-    namespace = ("todo", todo_category, user_id)
-    memories = store.search(namespace)
-    todo = "\n".join(f"{mem.value}" for mem in memories)
+    # Read the store once per user turn; after an update node the snapshot is current
+    memories = state.get("memories")
+    versions = state.get("memory_versions")
+    if not memories or not isinstance(state["messages"][-1], ToolMessage):
+        memories, versions = await load_memories(store, todo_category, user_id)
+    # Retrieve profile memory
+    profiles = list(memories["profile"].values())
+    user_profile = profiles[0] if profiles else None
+    # Retrieve ToDo memories, rendered again only for the items that changed
+    todo = render_todos(
+        ("todo", todo_category, user_id), versions["todo"], memories["todo"]
+    )
     # Retrieve custom instructions
-    namespace = ("instructions", todo_category, user_id)
-    memories = store.search(namespace)
-    if memories:
-        instructions = memories[0].value
-    else:
-        instructions = ""
+    instructions = list(memories["instructions"].values())
+    instructions = instructions[0] if instructions else ""
     system_msg = MODEL_SYSTEM_MESSAGE.format(
         task_maistro_role=task_maistro_role,
         user_profile=user_profile,
@@ -244,13 +336,17 @@ def task_mAIstro(state: MessagesState, config: RunnableConfig, store: BaseStore)
         instructions=instructions,
     )
     # Respond using memory as well as the chat history
-    response = model.bind_tools([UpdateMemory]).invoke(
+    response = await model.bind_tools([UpdateMemory]).ainvoke(
         [SystemMessage(content=system_msg)] + state["messages"]
     )
-    return {"messages": [response]}
+    return {
+        "messages": [response],
+        "memories": memories,
+        "memory_versions": versions,
+    }
 
 
-def update_profile(state: MessagesState, config: RunnableConfig, store: BaseStore):
+async def update_profile(state: State, config: RunnableConfig, store: BaseStore):
     """Reflect on the chat history and update the memory collection."""
     # Get the user ID from the config
     configurable = configuration.Configuration.from_runnable_config(config)
@@ -258,15 +354,12 @@ def update_profile(state: MessagesState, config: RunnableConfig, store: BaseStor
     todo_category = configurable.todo_category
     # Define the namespace for the memories
     namespace = ("profile", todo_category, user_id)
-    # Retrieve the most recent memories for context
-    existing_items = store.search(namespace)
+    # Use the memories loaded by task_mAIstro for context
+    existing_items = dict(state["memories"]["profile"])
     # Format the existing memories for the Trustcall extractor
     tool_name = "Profile"
     existing_memories = (
-        [
-            (existing_item.key, tool_name, existing_item.value)
-            for existing_item in existing_items
-        ]
+        [(key, tool_name, value) for key, value in existing_items.items()]
         if existing_items
         else None
     )
@@ -281,16 +374,15 @@ def update_profile(state: MessagesState, config: RunnableConfig, store: BaseStor
         )
     )
     # Invoke the extractor
-    result = profile_extractor.invoke(
+    result = await profile_extractor.ainvoke(
         {"messages": updated_messages, "existing": existing_memories}
     )
     # Save save the memories from Trustcall to the store
     for r, rmeta in zip(result["responses"], result["response_metadata"]):
-        store.put(
-            namespace,
-            rmeta.get("json_doc_id", str(uuid.uuid4())),
-            r.model_dump(mode="json"),
-        )
+        key = rmeta.get("json_doc_id", str(uuid.uuid4()))
+        value = r.model_dump(mode="json")
+        await store.aput(namespace, key, value)
+        existing_items[key] = value
     tool_calls = state["messages"][-1].tool_calls
     # Return tool message with update verification
     return {
@@ -300,11 +392,13 @@ def update_profile(state: MessagesState, config: RunnableConfig, store: BaseStor
                 "content": "updated profile",
                 "tool_call_id": tool_calls[0]["id"],
             }
-        ]
+        ],
+        "memories": {**state["memories"], "profile": existing_items},
+        "memory_versions": {**state["memory_versions"], "profile": str(uuid.uuid4())},
     }
 
 
-def update_todos(state: MessagesState, config: RunnableConfig, store: BaseStore):
+async def update_todos(state: State, config: RunnableConfig, store: BaseStore):
     """Reflect on the chat history and update the memory collection."""
     # Get the user ID from the config
     configurable = configuration.Configuration.from_runnable_config(config)
@@ -312,15 +406,12 @@ def update_todos(state: MessagesState, config: RunnableConfig, store: BaseStore)
     todo_category = configurable.todo_category
     # Define the namespace for the memories
     namespace = ("todo", todo_category, user_id)
-    # Retrieve the most recent memories for context
-    existing_items = store.search(namespace)
+    # Use the memories loaded by task_mAIstro for context
+    existing_items = dict(state["memories"]["todo"])
     # Format the existing memories for the Trustcall extractor
     tool_name = "ToDo"
     existing_memories = (
-        [
-            (existing_item.key, tool_name, existing_item.value)
-            for existing_item in existing_items
-        ]
+        [(key, tool_name, value) for key, value in existing_items.items()]
         if existing_items
         else None
     )
@@ -336,21 +427,20 @@ def update_todos(state: MessagesState, config: RunnableConfig, store: BaseStore)
     )
     # Initialize the spy for visibility into the tool calls made by Trustcall
     spy = Spy()
-    # Create the Trustcall extractor for updating the ToDo list
-    todo_extractor = create_extractor(
-        model, tools=[ToDo], tool_choice=tool_name, enable_inserts=True
-    ).with_listeners(on_end=spy)
+    # Get the Trustcall extractor for updating the ToDo list, built on first use
+    todo_extractor = get_extractor(
+        model, tools=[ToDo], tool_choice=tool_name, enable_inserts=True, on_end=spy
+    )
     # Invoke the extractor
-    result = todo_extractor.invoke(
+    result = await todo_extractor.ainvoke(
         {"messages": updated_messages, "existing": existing_memories}
     )
     # Save save the memories from Trustcall to the store
     for r, rmeta in zip(result["responses"], result["response_metadata"]):
-        store.put(
-            namespace,
-            rmeta.get("json_doc_id", str(uuid.uuid4())),
-            r.model_dump(mode="json"),
-        )
+        key = rmeta.get("json_doc_id", str(uuid.uuid4()))
+        value = r.model_dump(mode="json")
+        await store.aput(namespace, key, value)
+        existing_items[key] = value
     # Respond to the tool call made in task_mAIstro, confirming the update
     tool_calls = state["messages"][-1].tool_calls
     # Extract the changes made by Trustcall and add the the ToolMessage returned to task_mAIstro
@@ -362,23 +452,23 @@ def update_todos(state: MessagesState, config: RunnableConfig, store: BaseStore)
                 "content": todo_update_msg,
                 "tool_call_id": tool_calls[0]["id"],
             }
-        ]
+        ],
+        "memories": {**state["memories"], "todo": existing_items},
+        "memory_versions": {**state["memory_versions"], "todo": str(uuid.uuid4())},
     }
 
 
-def update_instructions(state: MessagesState, config: RunnableConfig, store: BaseStore):
+async def update_instructions(state: State, config: RunnableConfig, store: BaseStore):
     """Reflect on the chat history and update the memory collection."""
     # Get the user ID from the config
     configurable = configuration.Configuration.from_runnable_config(config)
     user_id = configurable.user_id
     todo_category = configurable.todo_category
     namespace = ("instructions", todo_category, user_id)
-    existing_memory = store.get(namespace, "user_instructions")
+    existing_memory = state["memories"]["instructions"].get("user_instructions")
     # Format the memory in the system prompt
-    system_msg = CREATE_INSTRUCTIONS.format(
-        current_instructions=existing_memory.value if existing_memory else None
-    )
-    new_memory = model.invoke(
+    system_msg = CREATE_INSTRUCTIONS.format(current_instructions=existing_memory)
+    new_memory = await model.ainvoke(
         [SystemMessage(content=system_msg)]
         + state["messages"][:-1]
         + [
@@ -389,7 +479,8 @@ def update_instructions(state: MessagesState, config: RunnableConfig, store: Bas
     )
     # Overwrite the existing memory in the store
     key = "user_instructions"
-    store.put(namespace, key, {"memory": new_memory.content})
+    value = {"memory": new_memory.content}
+    await store.aput(namespace, key, value)
     tool_calls = state["messages"][-1].tool_calls
     # Return tool message with update verification
     return {
@@ -399,13 +490,21 @@ def update_instructions(state: MessagesState, config: RunnableConfig, store: Bas
                 "content": "updated instructions",
                 "tool_call_id": tool_calls[0]["id"],
             }
-        ]
+        ],
+        "memories": {
+            **state["memories"],
+            "instructions": {**state["memories"]["instructions"], key: value},
+        },
+        "memory_versions": {
+            **state["memory_versions"],
+            "instructions": str(uuid.uuid4()),
+        },
     }
 
 
 # Conditional edge
 def route_message(
-    state: MessagesState, config: RunnableConfig, store: BaseStore
+    state: State, config: RunnableConfig, store: BaseStore
 ) -> Literal[END, "update_todos", "update_instructions", "update_profile"]:
     """Reflect on the memories and chat history to decide whether to update the memory collection."""
     message = state["messages"][-1]
@@ -424,7 +523,12 @@ def route_message(
 
 
 # Create the graph + all nodes
-builder = StateGraph(MessagesState, config_schema=configuration.Configuration)
+builder = StateGraph(
+    State,
+    input=MessagesState,
+    output=MessagesState,
+    config_schema=configuration.Configuration,
+)
 # Define the flow of the memory extraction process
 builder.add_node(task_mAIstro)
 builder.add_node(update_todos)
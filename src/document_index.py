@@ -0,0 +1,323 @@
+"""Offline hybrid (BM25 + embeddings) index of local documents.
+
+python -m src.document_index add docs/ --index .document_index
+python -m src.document_index search "llama 3.1 context length" --index .document_index
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import math
+import re
+import time
+import zlib
+from bisect import bisect_left
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+
+# Files indexed from a directory; PDFs need the optional pypdf package
+# (the `pdf` extra)
+TEXT_SUFFIXES = (".txt", ".md")
+PDF_SUFFIX = ".pdf"
+
+logger = logging.getLogger(__name__)
+
+
+def tokenize(text: str) -> list[str]:
+    return re.findall(r"\w+", text.casefold())
+
+
+def chunk_text(text: str, words: int = 200, overlap: int = 40) -> list[str]:
+    """Split a text in chunks of `words` words, `overlap` of them shared with
+    the previous chunk."""
+    tokens = text.split()
+    step = max(1, words - overlap)
+    return [
+        " ".join(tokens[start : start + words])
+        for start in range(0, max(1, len(tokens) - overlap), step)
+        if tokens[start : start + words]
+    ]
+
+
+class HashingEmbedder:
+    """Deterministic offline embeddings: signed feature hashing of the words.
+
+    Captures lexical overlap only; pass `embed` to `DocumentIndex` (e.g. the
+    `embed_documents` of a Gemini embeddings model) for semantic similarity.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def __call__(self, texts: Sequence[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token, count in Counter(tokenize(text)).items():
+                bucket = zlib.crc32(token.encode())
+                sign = 1.0 if bucket & 0x80000000 else -1.0
+                matrix[row, bucket % self.dim] += sign * (1 + math.log(count))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+
+class DocumentIndex:
+    """Chunks of local documents, searched by BM25 and embedding similarity.
+
+    The index lives in `directory`: `chunks.jsonl` (text and source of each
+    chunk), `embeddings.f32` (the row-major float32 embedding matrix, memory
+    mapped), `sources.json` (content hash of every indexed file) and
+    `deleted.json` (ids of the chunks of changed files). Adding documents
+    appends to these files and updates the in-memory inverted index, so
+    nothing already indexed is re-embedded. The chunks of a changed file are
+    marked deleted and left out of the inverted index and the results. The
+    hybrid score is `alpha * cosine + (1 - alpha) * BM25`, each normalized by
+    its best match.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        embed: Optional[Callable[[Sequence[str]], np.ndarray]] = None,
+        dim: int = 256,
+        alpha: float = 0.5,
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.embed = embed or HashingEmbedder(dim)
+        self.dim = dim
+        self.alpha = alpha
+        self.k1 = k1
+        self.b = b
+        self.chunks: list[dict] = []
+        self.lengths: list[int] = []
+        # term -> (chunk ids, term frequencies)
+        self.postings: dict[str, tuple[list[int], list[int]]] = {}
+        self.total_length = 0
+        self._length_array: Optional[np.ndarray] = None
+        self.sources: dict[str, str] = {}
+        self.deleted: set[int] = set()
+        self._deleted_array: Optional[np.ndarray] = None
+        self._embeddings: Optional[np.ndarray] = None
+        self._load()
+
+    @property
+    def _chunks_path(self) -> Path:
+        return self.directory / "chunks.jsonl"
+
+    @property
+    def _embeddings_path(self) -> Path:
+        return self.directory / "embeddings.f32"
+
+    @property
+    def _sources_path(self) -> Path:
+        return self.directory / "sources.json"
+
+    @property
+    def _deleted_path(self) -> Path:
+        return self.directory / "deleted.json"
+
+    def _load(self):
+        if self._sources_path.exists():
+            self.sources = json.loads(self._sources_path.read_text())
+        if self._deleted_path.exists():
+            self.deleted = set(json.loads(self._deleted_path.read_text()))
+        if self._chunks_path.exists():
+            with self._chunks_path.open() as lines:
+                for line in lines:
+                    self._index_chunk(json.loads(line))
+        self._map_embeddings()
+
+    def _map_embeddings(self):
+        rows = len(self.chunks)
+        if rows and self._embeddings_path.exists():
+            self._embeddings = np.memmap(
+                self._embeddings_path,
+                dtype=np.float32,
+                mode="r",
+                shape=(rows, self.dim),
+            )
+        else:
+            self._embeddings = None
+
+    def _index_chunk(self, chunk: dict):
+        chunk_id = len(self.chunks)
+        self.chunks.append(chunk)
+        terms = Counter(tokenize(chunk["text"]))
+        length = sum(terms.values())
+        self.lengths.append(length)
+        self._length_array = None
+        if chunk_id in self.deleted:
+            return
+        self.total_length += length
+        for term, count in terms.items():
+            ids, frequencies = self.postings.setdefault(term, ([], []))
+            ids.append(chunk_id)
+            frequencies.append(count)
+
+    def remove_source(self, source: str) -> int:
+        """Mark the chunks of `source` deleted. Returns the number of chunks.
+
+        Their rows stay in the files (rebuild the index to reclaim the space),
+        but they are dropped from the inverted index and never returned.
+        """
+        removed = [
+            chunk_id
+            for chunk_id, chunk in enumerate(self.chunks)
+            if chunk["source"] == source and chunk_id not in self.deleted
+        ]
+        for chunk_id in removed:
+            for term in set(tokenize(self.chunks[chunk_id]["text"])):
+                ids, frequencies = self.postings[term]
+                position = bisect_left(ids, chunk_id)
+                del ids[position], frequencies[position]
+                if not ids:
+                    del self.postings[term]
+            self.total_length -= self.lengths[chunk_id]
+        if removed:
+            self.deleted.update(removed)
+            self._deleted_array = None
+            self._deleted_path.write_text(json.dumps(sorted(self.deleted)))
+        return len(removed)
+
+    def add(self, text: str, source: str, page: Optional[int] = None) -> int:
+        """Chunk, embed and index one text. Returns the number of chunks."""
+        chunks = [
+            {"source": source, "page": page, "text": chunk}
+            for chunk in chunk_text(text)
+        ]
+        if not chunks:
+            return 0
+        embeddings = np.asarray(self.embed([c["text"] for c in chunks]), np.float32)
+        if embeddings.shape[1] != self.dim:
+            raise ValueError(
+                f"Embeddings have {embeddings.shape[1]} dimensions, the index {self.dim}"
+            )
+        with self._embeddings_path.open("ab") as matrix:
+            matrix.write(embeddings.tobytes())
+        with self._chunks_path.open("a") as lines:
+            for chunk in chunks:
+                lines.write(json.dumps(chunk) + "\n")
+                self._index_chunk(chunk)
+        self._map_embeddings()
+        return len(chunks)
+
+    def add_file(self, path: Path) -> int:
+        """Index a text or PDF file, unless this content is already indexed.
+
+        The chunks of an earlier version of the file are deleted first.
+        """
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        if self.sources.get(str(path)) == digest:
+            return 0
+        if str(path) in self.sources:
+            self.remove_source(str(path))
+        if path.suffix == PDF_SUFFIX:
+            from pypdf import PdfReader
+
+            count = sum(
+                self.add(page.extract_text() or "", str(path), number)
+                for number, page in enumerate(PdfReader(path).pages, start=1)
+            )
+        else:
+            count = self.add(path.read_text(errors="ignore"), str(path))
+        self.sources[str(path)] = digest
+        self._sources_path.write_text(json.dumps(self.sources, indent=2))
+        return count
+
+    def add_directory(self, directory: str) -> int:
+        """Index the new or changed documents of `directory`.
+
+        A changed file is indexed again, replacing its previous chunks. PDFs
+        are skipped, with a warning, when pypdf is not installed.
+        """
+        paths = sorted(Path(directory).rglob("*"))
+        suffixes = TEXT_SUFFIXES
+        try:
+            import pypdf  # noqa: F401
+
+            suffixes += (PDF_SUFFIX,)
+        except ImportError:
+            pdfs = sum(path.suffix == PDF_SUFFIX for path in paths)
+            if pdfs:
+                logger.warning(
+                    "Skipping %d PDF files in %s: pypdf is not installed "
+                    "(pip install 'langgraph-gemini-snippet[pdf]')",
+                    pdfs,
+                    directory,
+                )
+        return sum(self.add_file(path) for path in paths if path.suffix in suffixes)
+
+    def _bm25(self, terms: list[str]) -> np.ndarray:
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        if self._length_array is None:
+            self._length_array = np.asarray(self.lengths, dtype=np.float32)
+        lengths = self._length_array
+        live = len(self.chunks) - len(self.deleted)
+        if not self.total_length:
+            # No live chunk has a term, so none matches the query
+            return scores
+        average = self.total_length / live
+        for term in set(terms):
+            if term not in self.postings:
+                continue
+            ids, frequencies = self.postings[term]
+            ids = np.asarray(ids)
+            tf = np.asarray(frequencies, dtype=np.float32)
+            idf = math.log(1 + (live - len(ids) + 0.5) / (len(ids) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * lengths[ids] / average)
+            scores[ids] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def search(self, query: str, k: int = 3) -> list[dict]:
+        """The `k` best chunks for `query`, with their `score`."""
+        if k <= 0 or len(self.chunks) == len(self.deleted):
+            return []
+        if self._deleted_array is None:
+            self._deleted_array = np.fromiter(self.deleted, np.intp, len(self.deleted))
+        if self.alpha < 1:
+            scores = self._bm25(tokenize(query))
+            if scores.max() > 0:
+                scores *= (1 - self.alpha) / scores.max()
+        else:
+            scores = np.zeros(len(self.chunks), dtype=np.float32)
+        if self._embeddings is not None and self.alpha:
+            query_embedding = np.asarray(self.embed([query]), np.float32)[0]
+            similarity = self._embeddings @ query_embedding
+            similarity[self._deleted_array] = 0
+            if similarity.max() > 0:
+                scores += self.alpha * np.clip(similarity / similarity.max(), 0, None)
+        k = min(k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [
+            {**self.chunks[i], "score": float(scores[i])} for i in best if scores[i] > 0
+        ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["add", "search"])
+    parser.add_argument("target", help="Directory to index, or query")
+    parser.add_argument("--index", default=".document_index")
+    parser.add_argument("-k", type=int, default=3)
+    args = parser.parse_args(argv)
+    index = DocumentIndex(args.index)
+    start = time.perf_counter()
+    if args.command == "add":
+        added = index.add_directory(args.target)
+        print(f"Indexed {added} chunks ({len(index.chunks)} in total)")
+    else:
+        for hit in index.search(args.target, args.k):
+            page = f", page {hit['page']}" if hit["page"] else ""
+            print(f"{hit['score']:.3f} {hit['source']}{page}: {hit['text'][:120]}")
+    print(f"{(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
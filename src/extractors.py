@@ -0,0 +1,61 @@
+import json
+import threading
+from typing import Any, Callable, Optional, Sequence
+
+from langchain_core.runnables import Runnable
+from trustcall import create_extractor
+
+# Extractors by (model, tools, tool_choice, enable_inserts, options). The model
+# is kept next to the extractor so its id cannot be reused by another object.
+_extractors: dict[tuple, tuple[Any, Runnable]] = {}
+_lock = threading.Lock()
+stats = {"hits": 0, "misses": 0}
+
+
+def _tool_key(tool) -> Any:
+    # Schemas given as classes or functions are hashable, dict schemas are not
+    if isinstance(tool, dict):
+        return json.dumps(tool, sort_keys=True)
+    return tool
+
+
+def get_extractor(
+    llm,
+    tools: Sequence,
+    tool_choice: Optional[str] = None,
+    enable_inserts: bool = False,
+    on_end: Optional[Callable] = None,
+    **kwargs,
+) -> Runnable:
+    """Return the Trustcall extractor for these arguments, creating it once.
+
+    `create_extractor` converts the tool schemas, binds them to the model and
+    compiles the extraction graph, so nodes should not call it on every turn.
+    `on_end` attaches a per-request listener (e.g. `Spy`) to the shared
+    extractor without rebuilding it.
+    """
+    key = (
+        id(llm),
+        tuple(_tool_key(tool) for tool in tools),
+        tool_choice,
+        enable_inserts,
+        tuple(sorted(kwargs.items())),
+    )
+    with _lock:
+        entry = _extractors.get(key)
+        if entry is None:
+            stats["misses"] += 1
+            extractor = create_extractor(
+                llm,
+                tools=list(tools),
+                tool_choice=tool_choice,
+                enable_inserts=enable_inserts,
+                **kwargs,
+            )
+            entry = _extractors[key] = (llm, extractor)
+        else:
+            stats["hits"] += 1
+    extractor = entry[1]
+    if on_end is not None:
+        extractor = extractor.with_listeners(on_end=on_end)
+    return extractor
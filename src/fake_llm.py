@@ -0,0 +1,267 @@
+import ast
+import asyncio
+import hashlib
+import random
+import re
+import time
+from typing import Any, Optional, Sequence
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+# Tools added by Trustcall next to the user schemas
+_TRUSTCALL_TOOLS = {"PatchDoc", "PatchFunctionErrors", "PatchFunctionName"}
+
+# Words used to build deterministic synthetic text
+_WORDS = (
+    "agent graph state node edge memory store thread checkpoint reducer message "
+    "tool schema analyst expert interview section report summary task profile "
+    "context retrieval query source insight latency quota token stream"
+).split()
+
+
+def parse_latency(spec: Optional[str]):
+    """Parse a latency distribution such as `fixed:0.2`, `uniform:0.1,0.5`,
+    `normal:0.3,0.05`, `lognormal:-1.5,0.4` or `exponential:0.3` (seconds).
+
+    Returns a function drawing one latency from a `random.Random`.
+    """
+    if not spec:
+        return lambda rng: 0.0
+    kind, _, args = spec.partition(":")
+    params = [float(p) for p in args.split(",") if p]
+    samplers = {
+        "fixed": lambda rng: params[0],
+        "uniform": lambda rng: rng.uniform(params[0], params[1]),
+        "normal": lambda rng: max(0.0, rng.gauss(params[0], params[1])),
+        "lognormal": lambda rng: rng.lognormvariate(params[0], params[1]),
+        "exponential": lambda rng: rng.expovariate(1 / params[0]),
+    }
+    if kind not in samplers:
+        raise ValueError(f"Unknown latency distribution: {spec}")
+    return samplers[kind]
+
+
+def _seed(messages: Sequence[BaseMessage]) -> int:
+    digest = hashlib.sha256()
+    for message in messages:
+        digest.update(message.type.encode())
+        digest.update(str(message.content).encode())
+    return int.from_bytes(digest.digest()[:8], "big")
+
+
+def fake_value(schema: dict, name: str, rng: random.Random, list_size: int) -> Any:
+    """Build a value conforming to a (dereferenced) JSON schema."""
+    for key in ("anyOf", "oneOf"):
+        if key in schema:
+            options = [s for s in schema[key] if s.get("type") != "null"]
+            return fake_value(options[0] if options else {}, name, rng, list_size)
+    if "allOf" in schema:
+        return fake_value(schema["allOf"][0], name, rng, list_size)
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+    kind = schema.get("type", "string")
+    if kind == "object":
+        properties = schema.get("properties", {})
+        return {
+            key: fake_value(value, key, rng, list_size)
+            for key, value in properties.items()
+        }
+    if kind == "array":
+        size = max(list_size, schema.get("minItems", 0))
+        items = schema.get("items", {"type": "string"})
+        return [fake_value(items, name, rng, list_size) for _ in range(size)]
+    if kind == "integer":
+        return schema.get("minimum", 0)
+    if kind == "number":
+        return float(schema.get("minimum", 1))
+    if kind == "boolean":
+        return True
+    if kind == "null":
+        return None
+    if schema.get("format") == "date-time":
+        return "2025-01-01T09:00:00"
+    return f"{name} {' '.join(rng.choices(_WORDS, k=4))}"
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic offline chat model for benchmarking the graphs.
+
+    `responses` are returned in order (cycling) when given. Otherwise the model
+    answers with synthetic text, or with a synthetic tool call conforming to
+    the schema of a bound tool when the call forces one (structured output,
+    Trustcall extractors) or when tools are bound and the last message comes
+    from the user. Trustcall `PatchDoc` calls target the first existing
+    document of the prompt. The output only depends on the input messages,
+    and every call sleeps for a latency drawn from `latency`.
+
+    With a `context_cache` (local backend), the static prefix of eligible
+    prompts is served from the emulated provider cache and reported as
+    `cache_read` input tokens; responses are the same as without the cache.
+    """
+
+    responses: Optional[list] = None
+    latency: Optional[str] = None
+    list_size: int = 3
+    response_words: int = 60
+    model_name: str = "fake-chat-model"
+    context_cache: Optional[Any] = None
+
+    _index: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    @property
+    def _identifying_params(self) -> dict[str, Any]:
+        return {"model_name": self.model_name, "list_size": self.list_size}
+
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs):
+        formatted = [convert_to_openai_tool(tool)["function"] for tool in tools]
+        return self.bind(tools=formatted, tool_choice=tool_choice, **kwargs)
+
+    def get_num_tokens(self, text: str) -> int:
+        return max(1, len(text) // 4)
+
+    def _pick_tool(self, messages, tools, tool_choice) -> Optional[dict]:
+        if not tools:
+            return None
+        if isinstance(tool_choice, dict):
+            tool_choice = tool_choice.get("function", {}).get("name")
+        by_name = {tool["name"]: tool for tool in tools}
+        if isinstance(tool_choice, str) and tool_choice in by_name:
+            return by_name[tool_choice]
+        forced = tool_choice in ("any", "required", True)
+        if not forced and isinstance(messages[-1], (AIMessage, ToolMessage)):
+            return None
+        # Prefer patching an existing Trustcall document when one is shown
+        if "PatchDoc" in by_name and self._existing_doc(messages):
+            return by_name["PatchDoc"]
+        candidates = [t for t in tools if t["name"] not in _TRUSTCALL_TOOLS]
+        return candidates[0] if candidates else tools[0]
+
+    @staticmethod
+    def _existing_doc(messages) -> Optional[tuple[str, dict]]:
+        """First existing Trustcall document of the prompt, as (id, value)."""
+        text = "\n".join(str(m.content) for m in messages)
+        match = re.search(
+            r'<instance id=(\S+?) schema_type="[^"]*">\n(.*?)\n</instance>', text, re.S
+        ) or re.search(
+            r"<schema id=(\S+?)>\n<instance>\n(.*?)\n</instance>", text, re.S
+        )
+        if not match:
+            return None
+        try:
+            value = ast.literal_eval(match.group(2))
+        except (ValueError, SyntaxError):
+            value = {}
+        return match.group(1), value if isinstance(value, dict) else {}
+
+    def _tool_args(self, tool, messages, rng) -> dict:
+        if tool["name"] != "PatchDoc":
+            return fake_value(tool["parameters"], tool["name"], rng, self.list_size)
+        # Rewrite the first text field of the existing document
+        doc_id, value = self._existing_doc(messages)
+        fields = [key for key, v in value.items() if isinstance(v, str)][:1]
+        return {
+            "json_doc_id": doc_id,
+            "planned_edits": f"Update {', '.join(fields) or 'nothing'}",
+            "patches": [
+                {
+                    "op": "replace",
+                    "path": f"/{field}",
+                    "value": fake_value({"type": "string"}, field, rng, 1),
+                }
+                for field in fields
+            ],
+        }
+
+    def _from_cache(self, messages, prepared) -> tuple[list, int]:
+        """Emulate the provider prepending the cached prefix to the request."""
+        if prepared is None:
+            return messages, 0
+        name, suffix = prepared
+        prefix = self.context_cache.backend.resolve(name)
+        return prefix + suffix, sum(self.get_num_tokens(str(m.content)) for m in prefix)
+
+    def _respond(
+        self, messages, tools=None, tool_choice=None, cached_tokens: int = 0
+    ) -> tuple[AIMessage, float]:
+        seed = _seed(messages)
+        rng = random.Random(seed)
+        delay = parse_latency(self.latency)(rng)
+        if self.responses:
+            response = self.responses[self._index % len(self.responses)]
+            self._index += 1
+            if isinstance(response, str):
+                response = AIMessage(content=response)
+            message = response.model_copy()
+        else:
+            tool = self._pick_tool(messages, tools, tool_choice)
+            if tool is not None:
+                args = self._tool_args(tool, messages, rng)
+                message = AIMessage(
+                    content="",
+                    tool_calls=[
+                        {"name": tool["name"], "args": args, "id": f"call_{seed:x}"}
+                    ],
+                )
+            else:
+                message = AIMessage(
+                    content=" ".join(rng.choices(_WORDS, k=self.response_words))
+                )
+        input_tokens = sum(self.get_num_tokens(str(m.content)) for m in messages)
+        output_tokens = self.get_num_tokens(
+            str(message.content) + str(message.tool_calls)
+        )
+        message.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        if cached_tokens:
+            message.usage_metadata["input_token_details"] = {
+                "cache_read": cached_tokens
+            }
+        return message, delay
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        tools: Optional[list[dict]] = None,
+        tool_choice: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        prepared = None
+        if self.context_cache is not None and not tools:
+            prepared = self.context_cache.prepare(self.model_name, messages)
+        messages, cached_tokens = self._from_cache(messages, prepared)
+        message, delay = self._respond(messages, tools, tool_choice, cached_tokens)
+        time.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        tools: Optional[list[dict]] = None,
+        tool_choice: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        prepared = None
+        if self.context_cache is not None and not tools:
+            prepared = await self.context_cache.aprepare(self.model_name, messages)
+        messages, cached_tokens = self._from_cache(messages, prepared)
+        message, delay = self._respond(messages, tools, tool_choice, cached_tokens)
+        await asyncio.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=message)])
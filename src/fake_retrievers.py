@@ -0,0 +1,76 @@
+import asyncio
+import os
+import random
+import time
+
+from langchain_core.documents import Document
+
+from src.fake_llm import _WORDS, parse_latency
+
+# Latency of the fake retrievers, same syntax as FAKE_LLM_LATENCY
+search_latency = parse_latency(os.environ.get("FAKE_SEARCH_LATENCY"))
+
+
+def _text(rng: random.Random, sentences: int) -> str:
+    return " ".join(
+        " ".join(rng.choices(_WORDS, k=20)).capitalize() + "." for _ in range(sentences)
+    )
+
+
+class FakeWebSearch:
+    """Offline stand-in for `TavilySearchResults` returning generated pages.
+
+    The same query always returns the same pages.
+    """
+
+    def __init__(self, max_results: int = 3, **kwargs):
+        self.max_results = max_results
+        self.calls = 0
+
+    def _results(self, rng: random.Random) -> list[dict]:
+        return [
+            {
+                "url": f"https://example.com/{rng.randrange(10_000)}",
+                "content": _text(rng, 10),
+            }
+            for _ in range(self.max_results)
+        ]
+
+    def invoke(self, query: str, config=None) -> list[dict]:
+        self.calls += 1
+        rng = random.Random(query)
+        time.sleep(search_latency(rng))
+        return self._results(rng)
+
+    async def ainvoke(self, query: str, config=None) -> list[dict]:
+        self.calls += 1
+        rng = random.Random(query)
+        await asyncio.sleep(search_latency(rng))
+        return self._results(rng)
+
+
+class FakeWikipediaLoader:
+    """Offline stand-in for `WikipediaLoader` returning generated articles."""
+
+    def __init__(self, query: str, load_max_docs: int = 2, **kwargs):
+        self.query = query
+        self.load_max_docs = load_max_docs
+
+    def _documents(self, rng: random.Random) -> list[Document]:
+        return [
+            Document(
+                page_content=_text(rng, 20),
+                metadata={"source": f"https://en.wikipedia.org/wiki/Synthetic_{i}"},
+            )
+            for i in range(self.load_max_docs)
+        ]
+
+    def load(self) -> list[Document]:
+        rng = random.Random(self.query)
+        time.sleep(search_latency(rng))
+        return self._documents(rng)
+
+    async def aload(self) -> list[Document]:
+        rng = random.Random(self.query)
+        await asyncio.sleep(search_latency(rng))
+        return self._documents(rng)
@@ -2,7 +2,7 @@ from langchain_core.messages import SystemMessage
 from langgraph.graph import START, StateGraph, MessagesState
 from langgraph.prebuilt import tools_condition, ToolNode
 
-from src.model import llm
+from src.model import llm, pool
 
 
 def add(a: int, b: int) -> int:
@@ -45,8 +45,10 @@ sys_msg = SystemMessage(
 
 
 # Node
-def assistant(state: MessagesState):
-    return {"messages": [llm_with_tools.invoke([sys_msg] + state["messages"])]}
+async def assistant(state: MessagesState):
+    return {
+        "messages": [await pool.ainvoke(llm_with_tools, [sys_msg] + state["messages"])]
+    }
 
 
 # Build graph
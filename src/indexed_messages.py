@@ -0,0 +1,110 @@
+import uuid
+from typing import Annotated, Optional
+
+from langchain_core.messages import (
+    AnyMessage,
+    BaseMessage,
+    BaseMessageChunk,
+    RemoveMessage,
+    convert_to_messages,
+    message_chunk_to_message,
+)
+from langgraph.graph.message import REMOVE_ALL_MESSAGES, Messages
+from typing_extensions import TypedDict
+
+# Index entries of other lists tolerated before the index is rebuilt
+INDEX_SLACK = 64
+
+
+class IndexedMessages(list):
+    """List of messages carrying an index from message id to position.
+
+    The index is shared by the lists derived from one another by appends,
+    and may hold entries of sibling lists (e.g. the copy LangGraph makes to
+    evaluate a conditional edge), so every lookup checks the message found at
+    the position. A stale index is rebuilt on the first failed check, and
+    after removals, which compact the list.
+    """
+
+    def __init__(self, messages=(), index: Optional[dict[str, int]] = None):
+        super().__init__(messages)
+        if index is None:
+            index = {message.id: i for i, message in enumerate(self)}
+        self.index = index
+
+    def position(self, message_id: str) -> Optional[int]:
+        position = self.index.get(message_id)
+        if position is None:
+            return None
+        if position < len(self) and self[position].id == message_id:
+            return position
+        # Entry of another list sharing the index
+        self.index = {message.id: i for i, message in enumerate(self)}
+        return self.index.get(message_id)
+
+
+def _coerce(messages: Messages) -> list[BaseMessage]:
+    if not isinstance(messages, list):
+        messages = [messages]
+    return [
+        message
+        if isinstance(message, BaseMessage)
+        and not isinstance(message, BaseMessageChunk)
+        else message_chunk_to_message(convert_to_messages([message])[0])
+        for message in messages
+    ]
+
+
+def add_messages_indexed(left: Messages, right: Messages) -> IndexedMessages:
+    """Reducer with the semantics of `add_messages`, in time proportional to
+    the update rather than to the history.
+
+    Messages with the id of an existing message replace it, `RemoveMessage`
+    deletes the message with its id (raising `ValueError` if there is none)
+    and `RemoveMessage(id=REMOVE_ALL_MESSAGES)` keeps only the messages after the
+    last one.
+    `add_messages` converts, copies and indexes the whole history on every
+    update; here the history is indexed once and the index reused, so an
+    append costs a list copy. A batch of removals compacts the list once.
+    """
+    if not isinstance(left, IndexedMessages):
+        left = _coerce(left)
+        for message in left:
+            if message.id is None:
+                message.id = str(uuid.uuid4())
+        left = IndexedMessages(left)
+    right = _coerce(right)
+    remove_all = None
+    for i, message in enumerate(right):
+        if message.id is None:
+            message.id = str(uuid.uuid4())
+        if isinstance(message, RemoveMessage) and message.id == REMOVE_ALL_MESSAGES:
+            remove_all = i
+    if remove_all is not None:
+        return IndexedMessages(right[remove_all + 1 :])
+
+    merged = IndexedMessages(left, left.index)
+    removed = set()
+    for message in right:
+        position = merged.position(message.id)
+        if position is not None:
+            if isinstance(message, RemoveMessage):
+                removed.add(message.id)
+            else:
+                removed.discard(message.id)
+                merged[position] = message
+        elif isinstance(message, RemoveMessage):
+            raise ValueError(
+                f"Attempting to delete a message with an ID that doesn't exist ('{message.id}')"
+            )
+        else:
+            merged.index[message.id] = len(merged)
+            merged.append(message)
+    if removed or len(merged.index) > 2 * len(merged) + INDEX_SLACK:
+        # Compact the list, and the index entries left by sibling lists
+        merged = IndexedMessages(m for m in merged if m.id not in removed)
+    return merged
+
+
+class IndexedMessagesState(TypedDict):
+    messages: Annotated[list[AnyMessage], add_messages_indexed]
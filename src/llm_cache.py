@@ -0,0 +1,176 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """Content-address a model call.
+
+    `llm_string` is built by LangChain from the model name, the invocation
+    parameters and anything bound to the model (tools, tool_choice and the
+    structured output schema), and `prompt` is the serialized message list.
+    """
+    digest = hashlib.sha256()
+    digest.update(llm_string.encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(prompt.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResponseCache(BaseCache):
+    """Two tier response cache: an in-memory LRU in front of an optional SQLite file.
+
+    Entries expire after `ttl` seconds (never if None). Each tier holds at most
+    `max_entries` / `max_db_entries` items and evicts the least recently used.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        ttl: Optional[float] = None,
+        max_entries: int = 1024,
+        max_db_entries: int = 100_000,
+    ):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_db_entries = max_db_entries
+        self.stats = {"hits": 0, "memory_hits": 0, "sqlite_hits": 0, "misses": 0}
+        self._memory: OrderedDict[str, tuple[float, Sequence[Generation]]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self._conn = None
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS llm_cache_accessed_at ON llm_cache (accessed_at)"
+            )
+            self._conn.commit()
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def _remember(self, key: str, created_at: float, value: Sequence[Generation]):
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        """Return the cached generations, promoting SQLite hits into memory."""
+        key = cache_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            # Memory tier
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self.stats["hits"] += 1
+                    self.stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+            # SQLite tier
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    if not self._expired(row[1], now):
+                        value = loads(row[0])
+                        self._conn.execute(
+                            "UPDATE llm_cache SET accessed_at = ? WHERE key = ?",
+                            (now, key),
+                        )
+                        self._conn.commit()
+                        self._remember(key, row[1], value)
+                        self.stats["hits"] += 1
+                        self.stats["sqlite_hits"] += 1
+                        return value
+                    self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+            self.stats["misses"] += 1
+            return None
+
+    def update(
+        self, prompt: str, llm_string: str, return_val: Sequence[Generation]
+    ) -> None:
+        """Store the generations in both tiers."""
+        key = cache_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, return_val)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?)",
+                    (key, dumps(list(return_val)), now, now),
+                )
+                # Size-based eviction of the least recently used rows
+                self._conn.execute(
+                    """DELETE FROM llm_cache WHERE key IN (
+                        SELECT key FROM llm_cache ORDER BY accessed_at DESC
+                        LIMIT -1 OFFSET ?
+                    )""",
+                    (self.max_db_entries,),
+                )
+                self._conn.commit()
+
+    def clear(self, **kwargs: Any) -> None:
+        """Drop every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM llm_cache")
+                self._conn.commit()
+
+    def purge_expired(self) -> None:
+        """Delete expired entries without waiting for them to be looked up."""
+        if self.ttl is None:
+            return
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            for key in [k for k, (c, _) in self._memory.items() if c < cutoff]:
+                del self._memory[key]
+            if self._conn is not None:
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE created_at < ?", (cutoff,)
+                )
+                self._conn.commit()
+
+
+def cache_from_env() -> Optional[ResponseCache]:
+    """Build the response cache selected by the LLM_CACHE environment variable.
+
+    LLM_CACHE=memory keeps responses in process, LLM_CACHE=sqlite also persists
+    them to LLM_CACHE_PATH. Anything else (the default) disables caching.
+    """
+    mode = os.environ.get("LLM_CACHE", "").lower()
+    if mode not in ("memory", "sqlite"):
+        return None
+    ttl = os.environ.get("LLM_CACHE_TTL")
+    return ResponseCache(
+        db_path=os.environ.get("LLM_CACHE_PATH", ".llm_cache.db")
+        if mode == "sqlite"
+        else None,
+        ttl=float(ttl) if ttl else None,
+        max_entries=int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "1024")),
+        max_db_entries=int(os.environ.get("LLM_CACHE_MAX_DB_ENTRIES", "100000")),
+    )
@@ -0,0 +1,137 @@
+import asyncio
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig
+from langgraph.config import get_config
+
+
+class _LoopState:
+    """asyncio primitives of a pool, which are bound to a single event loop."""
+
+    def __init__(self):
+        self.condition = asyncio.Condition()
+        self.in_flight = 0
+        self.per_key: dict[str, asyncio.Semaphore] = {}
+        # Calls holding or waiting for a slot of each key; a key is dropped
+        # when its last call leaves, so per_key does not grow with the threads
+        self.key_users: dict[str, int] = {}
+
+
+class ClientPool:
+    """Bound the number of in-flight model calls made by async graph nodes.
+
+    Every call waits for a slot for its key (`max_in_flight_per_key`, FIFO),
+    so one busy key cannot starve the others, and then for a global slot.
+    The key of `ainvoke` defaults to the thread of the graph run making the
+    call, so one conversation's fan-out cannot hold every slot.
+    The global cap is `max_in_flight`, lowered to the AIMD window of `limiter`
+    when one is given. The pool does not create clients: nodes share the
+    module level model from `src.model`, so its HTTP/gRPC connections are
+    reused across calls.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 8,
+        max_in_flight_per_key: Optional[int] = None,
+        limiter=None,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_in_flight_per_key = max_in_flight_per_key or max_in_flight
+        self.limiter = limiter
+        self.stats = {"in_flight": 0, "queued": 0, "completed": 0, "wait_time": 0.0}
+        self._loops: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        if limiter is not None:
+            limiter.add_listener(self._window_changed)
+
+    def _state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        state = self._loops.get(loop)
+        if state is None:
+            state = self._loops[loop] = _LoopState()
+        return state
+
+    def _window_changed(self):
+        """Wake the calls waiting for a global slot when the AIMD window moves.
+
+        The limiter may report from any thread, so the waiters of each event
+        loop are notified on that loop.
+        """
+        for loop, state in list(self._loops.items()):
+            if loop.is_running():
+                asyncio.run_coroutine_threadsafe(self._notify(state), loop)
+
+    @staticmethod
+    async def _notify(state: _LoopState):
+        async with state.condition:
+            state.condition.notify_all()
+
+    def _limit(self) -> int:
+        if self.limiter is None:
+            return self.max_in_flight
+        return max(1, min(self.max_in_flight, self.limiter.concurrency))
+
+    @asynccontextmanager
+    async def slot(self, key: str = "default"):
+        """Hold one in-flight slot for `key` for the duration of the block."""
+        state = self._state()
+        if key not in state.per_key:
+            state.per_key[key] = asyncio.Semaphore(self.max_in_flight_per_key)
+        key_semaphore = state.per_key[key]
+        state.key_users[key] = state.key_users.get(key, 0) + 1
+        try:
+            start = time.perf_counter()
+            self.stats["queued"] += 1
+            try:
+                await key_semaphore.acquire()
+                try:
+                    async with state.condition:
+                        await state.condition.wait_for(
+                            lambda: state.in_flight < self._limit()
+                        )
+                        state.in_flight += 1
+                except BaseException:
+                    key_semaphore.release()
+                    raise
+            finally:
+                self.stats["queued"] -= 1
+            self.stats["wait_time"] += time.perf_counter() - start
+            self.stats["in_flight"] += 1
+            try:
+                yield
+            finally:
+                self.stats["in_flight"] -= 1
+                self.stats["completed"] += 1
+                key_semaphore.release()
+                async with state.condition:
+                    state.in_flight -= 1
+                    state.condition.notify_all()
+        finally:
+            state.key_users[key] -= 1
+            if not state.key_users[key]:
+                del state.key_users[key], state.per_key[key]
+
+    @staticmethod
+    def _thread_key(config: Optional[RunnableConfig]) -> str:
+        """`thread_id` of `config`, or of the graph run making the call."""
+        if config is None:
+            try:
+                config = get_config()
+            except RuntimeError:
+                return "default"
+        return str(config.get("configurable", {}).get("thread_id", "default"))
+
+    async def ainvoke(
+        self,
+        runnable: Runnable,
+        input: Any,
+        config: Optional[RunnableConfig] = None,
+        key: Optional[str] = None,
+    ) -> Any:
+        """Run `runnable.ainvoke(input)` once a slot for `key` (by default the
+        current thread) is free."""
+        async with self.slot(key or self._thread_key(config)):
+            return await runnable.ainvoke(input, config)
@@ -1,3 +1,4 @@
+import functools
 import os
 from dataclasses import dataclass, fields
 from typing import Any, Optional
@@ -5,7 +6,7 @@ from typing import Any, Optional
 from langchain_core.runnables import RunnableConfig
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, frozen=True, slots=True)
 class Configuration:
     """The configurable fields for the chatbot."""
 
@@ -15,13 +16,31 @@ class Configuration:
     def from_runnable_config(
         cls, config: Optional[RunnableConfig] = None
     ) -> "Configuration":
-        """Create a Configuration instance from a RunnableConfig."""
+        """Create a Configuration instance from a RunnableConfig.
+
+        Instances are frozen and shared by every call resolving the same values.
+        """
         configurable = (
             config["configurable"] if config and "configurable" in config else {}
         )
-        values: dict[str, Any] = {
-            f.name: os.environ.get(f.name.upper(), configurable.get(f.name))
-            for f in fields(cls)
-            if f.init
-        }
-        return cls(**{k: v for k, v in values.items() if v})
+        values = tuple(configurable.get(name) for name in _FIELDS)
+        try:
+            return _resolve(cls, values)
+        except TypeError:
+            # Unhashable configurable values are resolved without the cache
+            return _resolve.__wrapped__(cls, values)
+
+
+# Configurable field names and their environment overrides, read once at import
+_FIELDS = tuple(f.name for f in fields(Configuration) if f.init)
+_ENV = {
+    name: os.environ[name.upper()] for name in _FIELDS if name.upper() in os.environ
+}
+
+
+@functools.lru_cache(maxsize=1024)
+def _resolve(cls, values: tuple) -> Configuration:
+    merged: dict[str, Any] = {
+        name: _ENV.get(name, value) for name, value in zip(_FIELDS, values)
+    }
+    return cls(**{k: v for k, v in merged.items() if v})
@@ -10,7 +10,8 @@ from langchain_core.messages import SystemMessage, HumanMessage
 from langgraph.graph import StateGraph, MessagesState, START, END
 from langgraph.store.base import BaseStore
 
-from src.model import llm
+from src.model import llm, pool
+from src.extractors import get_extractor
 from src.long_term_memory.configuration import Configuration
 
 
@@ -190,7 +191,7 @@ Your current instructions are:
 
 
 ## Node definitions
-def task_mAIstro(state: MessagesState, config: RunnableConfig, store: BaseStore):
+async def task_mAIstro(state: MessagesState, config: RunnableConfig, store: BaseStore):
     """Load memories from the store and use them to personalize the chatbot's response."""
 
     # Get the user ID from the config
@@ -199,7 +200,7 @@ def task_mAIstro(state: MessagesState, config: RunnableConfig, store: BaseStore)
 
     # Retrieve profile memory from the store
     namespace = ("profile", user_id)
-    memories = store.search(namespace)
+    memories = await store.asearch(namespace)
     if memories:
         user_profile = memories[0].value
     else:
@@ -207,12 +208,12 @@ def task_mAIstro(state: MessagesState, config: RunnableConfig, store: BaseStore)
 
     # Retrieve people memory from the store
     namespace = ("todo", user_id)
-    memories = store.search(namespace)
+    memories = await store.asearch(namespace)
     todo = "\n".join(f"{mem.value}" for mem in memories)
 
     # Retrieve custom instructions
     namespace = ("instructions", user_id)
-    memories = store.search(namespace)
+    memories = await store.asearch(namespace)
     if memories:
         instructions = memories[0].value
     else:
@@ -223,13 +224,16 @@ def task_mAIstro(state: MessagesState, config: RunnableConfig, store: BaseStore)
     )
 
     # Respond using memory as well as the chat history
-    response = llm.bind_tools([UpdateMemory]).invoke(
-        [SystemMessage(content=system_msg)] + state["messages"]
+    response = await pool.ainvoke(
+        llm.bind_tools([UpdateMemory]),
+        [SystemMessage(content=system_msg)] + state["messages"],
     )
     return {"messages": [response]}
 
 
-def update_profile(state: MessagesState, config: RunnableConfig, store: BaseStore):
+async def update_profile(
+    state: MessagesState, config: RunnableConfig, store: BaseStore
+):
     """Reflect on the chat history and update the memory collection."""
     # Get the user ID from the config
     configurable = Configuration.from_runnable_config(config)
@@ -237,7 +241,7 @@ def update_profile(state: MessagesState, config: RunnableConfig, store: BaseStor
     # Define the namespace for the memories
     namespace = ("profile", user_id)
     # Retrieve the most recent memories for context
-    existing_items = store.search(namespace)
+    existing_items = await store.asearch(namespace)
     # Format the existing memories for the Trustcall extractor
     tool_name = "Profile"
     existing_memories = (
@@ -259,12 +263,12 @@ def update_profile(state: MessagesState, config: RunnableConfig, store: BaseStor
         )
     )
     # Invoke the extractor
-    result = profile_extractor.invoke(
-        {"messages": updated_messages, "existing": existing_memories}
+    result = await pool.ainvoke(
+        profile_extractor, {"messages": updated_messages, "existing": existing_memories}
     )
     # Save save the memories from Trustcall to the store
     for r, rmeta in zip(result["responses"], result["response_metadata"]):
-        store.put(
+        await store.aput(
             namespace,
             rmeta.get("json_doc_id", str(uuid.uuid4())),
             r.model_dump(mode="json"),
@@ -282,7 +286,7 @@ def update_profile(state: MessagesState, config: RunnableConfig, store: BaseStor
     }
 
 
-def update_todos(state: MessagesState, config: RunnableConfig, store: BaseStore):
+async def update_todos(state: MessagesState, config: RunnableConfig, store: BaseStore):
     """Reflect on the chat history and update the memory collection."""
 
     # Get the user ID from the config
@@ -291,7 +295,7 @@ def update_todos(state: MessagesState, config: RunnableConfig, store: BaseStore)
     # Define the namespace for the memories
     namespace = ("todo", user_id)
     # Retrieve the most recent memories for context
-    existing_items = store.search(namespace)
+    existing_items = await store.asearch(namespace)
     # Format the existing memories for the Trustcall extractor
     tool_name = "ToDo"
     existing_memories = (
@@ -314,17 +318,17 @@ def update_todos(state: MessagesState, config: RunnableConfig, store: BaseStore)
     )
     # Initialize the spy for visibility into the tool calls made by Trustcall
     spy = Spy()
-    # Create the Trustcall extractor for updating the ToDo list
-    todo_extractor = create_extractor(
-        llm, tools=[ToDo], tool_choice=tool_name, enable_inserts=True
-    ).with_listeners(on_end=spy)
+    # Get the Trustcall extractor for updating the ToDo list, built on first use
+    todo_extractor = get_extractor(
+        llm, tools=[ToDo], tool_choice=tool_name, enable_inserts=True, on_end=spy
+    )
     # Invoke the extractor
-    result = todo_extractor.invoke(
-        {"messages": updated_messages, "existing": existing_memories}
+    result = await pool.ainvoke(
+        todo_extractor, {"messages": updated_messages, "existing": existing_memories}
     )
     # Save save the memories from Trustcall to the store
     for r, rmeta in zip(result["responses"], result["response_metadata"]):
-        store.put(
+        await store.aput(
             namespace,
             rmeta.get("json_doc_id", str(uuid.uuid4())),
             r.model_dump(mode="json"),
@@ -344,30 +348,33 @@ def update_todos(state: MessagesState, config: RunnableConfig, store: BaseStore)
     }
 
 
-def update_instructions(state: MessagesState, config: RunnableConfig, store: BaseStore):
+async def update_instructions(
+    state: MessagesState, config: RunnableConfig, store: BaseStore
+):
     """Reflect on the chat history and update the memory collection."""
     # Get the user ID from the config
     configurable = Configuration.from_runnable_config(config)
     user_id = configurable.user_id
     namespace = ("instructions", user_id)
-    existing_memory = store.get(namespace, "user_instructions")
+    existing_memory = await store.aget(namespace, "user_instructions")
     # Format the memory in the system prompt
     system_msg = CREATE_INSTRUCTIONS.format(
         current_instructions=existing_memory.value if existing_memory else None
     )
-    new_memory = llm.invoke(
+    new_memory = await pool.ainvoke(
+        llm,
         [SystemMessage(content=system_msg)]
         + state["messages"][:-1]
         + [
             HumanMessage(
                 content="Please update the instructions based on the conversation"
             )
-        ]
+        ],
     )
 
     # Overwrite the existing memory in the store
     key = "user_instructions"
-    store.put(namespace, key, {"memory": new_memory.content})
+    await store.aput(namespace, key, {"memory": new_memory.content})
     tool_calls = state["messages"][-1].tool_calls
     # Return tool message with update verification
     return {
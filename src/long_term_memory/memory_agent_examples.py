@@ -14,6 +14,7 @@ from langgraph.graph import StateGraph, MessagesState, END, START
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
 
 from src.model import llm
+from src.extractors import get_extractor
 
 
 # VISIBILITY INTO TRUSTCALL UPDATES
@@ -374,10 +375,10 @@ def update_todos(state: MessagesState, config: RunnableConfig, store: BaseStore)
     )
     # Initialize the spy for visibility into the tool calls made by Trustcall
     spy = Spy()
-    # Create the Trustcall extractor for updating the ToDo list
-    todo_extractor = create_extractor(
-        llm, tools=[ToDo], tool_choice=tool_name, enable_inserts=True
-    ).with_listeners(on_end=spy)
+    # Get the Trustcall extractor for updating the ToDo list, built on first use
+    todo_extractor = get_extractor(
+        llm, tools=[ToDo], tool_choice=tool_name, enable_inserts=True, on_end=spy
+    )
     # Invoke the extractor
     result = todo_extractor.invoke(
         {"messages": updated_messages, "existing": existing_memories}
@@ -3,7 +3,7 @@ from langchain_core.messages import SystemMessage
 from langchain_core.runnables.config import RunnableConfig
 from langgraph.graph import StateGraph, MessagesState, START, END
 
-from src.model import llm
+from src.model import llm, pool
 from src.long_term_memory.configuration import Configuration
 
 
@@ -35,7 +35,7 @@ Remember: Only include factual information directly stated by the user. Do not m
 Based on the chat history below, please update the user information:"""
 
 
-def call_model(state: MessagesState, config: RunnableConfig, store: BaseStore):
+async def call_model(state: MessagesState, config: RunnableConfig, store: BaseStore):
     """Load memory from the store and use it to personalize the chatbot's response."""
     # Get configuration
     configurable = Configuration.from_runnable_config(config)
@@ -44,7 +44,7 @@ def call_model(state: MessagesState, config: RunnableConfig, store: BaseStore):
     # Retrieve memory from the store
     namespace = ("memory", user_id)
     key = "user_memory"
-    existing_memory = store.get(namespace, key)
+    existing_memory = await store.aget(namespace, key)
     # Extract the memory
     if existing_memory:
         # Value is a dictionary with a memory key
@@ -54,11 +54,13 @@ def call_model(state: MessagesState, config: RunnableConfig, store: BaseStore):
     # Format the memory in the system prompt
     system_msg = MODEL_SYSTEM_MESSAGE.format(memory=existing_memory_content)
     # Respond using memory as well as the chat history
-    response = llm.invoke([SystemMessage(content=system_msg)] + state["messages"])
+    response = await pool.ainvoke(
+        llm, [SystemMessage(content=system_msg)] + state["messages"]
+    )
     return {"messages": response}
 
 
-def write_memory(state: MessagesState, config: RunnableConfig, store: BaseStore):
+async def write_memory(state: MessagesState, config: RunnableConfig, store: BaseStore):
     """Reflect on the chat history and save a memory to the store."""
     # Get configuration
     configurable = Configuration.from_runnable_config(config)
@@ -66,7 +68,7 @@ def write_memory(state: MessagesState, config: RunnableConfig, store: BaseStore)
     user_id = configurable.user_id
     # Retrieve existing memory from the store
     namespace = ("memory", user_id)
-    existing_memory = store.get(namespace, "user_memory")
+    existing_memory = await store.aget(namespace, "user_memory")
     # Extract the memory
     if existing_memory:
         # Value is a dictionary with a memory key
@@ -75,10 +77,12 @@ def write_memory(state: MessagesState, config: RunnableConfig, store: BaseStore)
         existing_memory_content = "No existing memory found."
     # Format the memory in the system prompt
     system_msg = CREATE_MEMORY_INSTRUCTION.format(memory=existing_memory_content)
-    new_memory = llm.invoke([SystemMessage(content=system_msg)] + state["messages"])
+    new_memory = await pool.ainvoke(
+        llm, [SystemMessage(content=system_msg)] + state["messages"]
+    )
     # Overwrite the existing memory in the store
     key = "user_memory"
-    store.put(namespace, key, {"memory": new_memory.content})
+    await store.aput(namespace, key, {"memory": new_memory.content})
 
 
 # Define the graph
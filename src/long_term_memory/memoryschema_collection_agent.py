@@ -8,7 +8,7 @@ from langchain_core.runnables.config import RunnableConfig
 from langgraph.graph import StateGraph, MessagesState, START, END
 from langgraph.store.base import BaseStore
 
-from src.model import llm
+from src.model import llm, pool
 from src.long_term_memory.configuration import Configuration
 
 
@@ -45,7 +45,7 @@ Use the provided tools to retain any necessary memories about the user.
 Use parallel tool calling to handle updates and insertions simultaneously:"""
 
 
-def call_model(state: MessagesState, config: RunnableConfig, store: BaseStore):
+async def call_model(state: MessagesState, config: RunnableConfig, store: BaseStore):
     """Load memory from the store and use it to personalize the chatbot's response."""
 
     # Get configuration
@@ -54,16 +54,18 @@ def call_model(state: MessagesState, config: RunnableConfig, store: BaseStore):
     user_id = configurable.user_id
     # Retrieve memory from the store
     namespace = ("memories", user_id)
-    memories = store.search(namespace)
+    memories = await store.asearch(namespace)
     # Format the memories for the system prompt
     info = "\n".join(f"- {mem.value['content']}" for mem in memories)
     system_msg = MODEL_SYSTEM_MESSAGE.format(memory=info)
     # Respond using memory as well as the chat history
-    response = llm.invoke([SystemMessage(content=system_msg)] + state["messages"])
+    response = await pool.ainvoke(
+        llm, [SystemMessage(content=system_msg)] + state["messages"]
+    )
     return {"messages": response}
 
 
-def write_memory(state: MessagesState, config: RunnableConfig, store: BaseStore):
+async def write_memory(state: MessagesState, config: RunnableConfig, store: BaseStore):
     """Reflect on the chat history and save a memory to the store."""
 
     # Get configuration
@@ -73,7 +75,7 @@ def write_memory(state: MessagesState, config: RunnableConfig, store: BaseStore)
     # Define the namespace for the memories
     namespace = ("memories", user_id)
     # Retrieve the most recent memories for context
-    existing_items = store.search(namespace)
+    existing_items = await store.asearch(namespace)
     # Format the existing memories for the Trustcall extractor
     tool_name = "Memory"
     existing_memories = (
@@ -93,12 +95,13 @@ def write_memory(state: MessagesState, config: RunnableConfig, store: BaseStore)
     )
 
     # Invoke the extractor
-    result = trustcall_extractor.invoke(
-        {"messages": updated_messages, "existing": existing_memories}
+    result = await pool.ainvoke(
+        trustcall_extractor,
+        {"messages": updated_messages, "existing": existing_memories},
     )
     # Save the memories from Trustcall to the store
     for r, rmeta in zip(result["responses"], result["response_metadata"]):
-        store.put(
+        await store.aput(
             namespace,
             rmeta.get("json_doc_id", str(uuid.uuid4())),
             r.model_dump(mode="json"),
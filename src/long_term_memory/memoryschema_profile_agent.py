@@ -6,7 +6,7 @@ from langchain_core.runnables.config import RunnableConfig
 from langgraph.graph import StateGraph, MessagesState, START, END
 from langgraph.store.base import BaseStore
 
-from src.model import llm
+from src.model import llm, pool
 from src.long_term_memory.configuration import Configuration
 
 
@@ -34,7 +34,7 @@ Here is the memory (it may be empty): {memory}"""
 TRUSTCALL_INSTRUCTION = """Create or update the memory (JSON doc) to incorporate information from the following conversation:"""
 
 
-def call_model(state: MessagesState, config: RunnableConfig, store: BaseStore):
+async def call_model(state: MessagesState, config: RunnableConfig, store: BaseStore):
     """Load memory from the store and use it to personalize the chatbot's response."""
     # Get configuration
     configurable = Configuration.from_runnable_config(config)
@@ -42,7 +42,7 @@ def call_model(state: MessagesState, config: RunnableConfig, store: BaseStore):
     user_id = configurable.user_id
     # Retrieve memory from the store
     namespace = ("memory", user_id)
-    existing_memory = store.get(namespace, "user_memory")
+    existing_memory = await store.aget(namespace, "user_memory")
     # Format the memories for the system prompt
     if existing_memory and existing_memory.value:
         memory_dict = existing_memory.value
@@ -56,11 +56,13 @@ def call_model(state: MessagesState, config: RunnableConfig, store: BaseStore):
     # Format the memory in the system prompt
     system_msg = MODEL_SYSTEM_MESSAGE.format(memory=formatted_memory)
     # Respond using memory as well as the chat history
-    response = llm.invoke([SystemMessage(content=system_msg)] + state["messages"])
+    response = await pool.ainvoke(
+        llm, [SystemMessage(content=system_msg)] + state["messages"]
+    )
     return {"messages": response}
 
 
-def write_memory(state: MessagesState, config: RunnableConfig, store: BaseStore):
+async def write_memory(state: MessagesState, config: RunnableConfig, store: BaseStore):
     """Reflect on the chat history and save a memory to the store."""
     # Get configuration
     configurable = Configuration.from_runnable_config(config)
@@ -68,24 +70,25 @@ def write_memory(state: MessagesState, config: RunnableConfig, store: BaseStore)
     user_id = configurable.user_id
     # Retrieve existing memory from the store
     namespace = ("memory", user_id)
-    existing_memory = store.get(namespace, "user_memory")
+    existing_memory = await store.aget(namespace, "user_memory")
     # Get the profile as the value from the list, and convert it to a JSON doc
     existing_profile = (
         {"UserProfile": existing_memory.value} if existing_memory else None
     )
     # Invoke the extractor
-    result = trustcall_extractor.invoke(
+    result = await pool.ainvoke(
+        trustcall_extractor,
         {
             "messages": [SystemMessage(content=TRUSTCALL_INSTRUCTION)]
             + state["messages"],
             "existing": existing_profile,
-        }
+        },
     )
     # Get the updated profile as a JSON object
     updated_profile = result["responses"][0].model_dump()
     # Save the updated profile
     key = "user_memory"
-    store.put(namespace, key, updated_profile)
+    await store.aput(namespace, key, updated_profile)
 
 
 # Define the graph
@@ -0,0 +1,97 @@
+from typing import Annotated, Callable, Optional
+
+from langchain_core.messages import BaseMessage
+from langgraph.graph import MessagesState
+
+
+def update_window(existing: Optional[dict], update: dict) -> dict:
+    """Reducer extending the running token counts of the message window.
+
+    The window holds the number of counted messages (`count`), the ids of the
+    first and last of them, the `budget`, and the token counts of the messages
+    within the budget (`tail`, totalling `tail_tokens`). An update carries the
+    `ids` and `counts` of the new messages only, or `reset` to count the whole
+    history again. The new counts are appended to the tail, whose oldest
+    counts are dropped while it is over budget; the last message is always
+    kept. The window starts at message `start` (`count - len(tail)`).
+
+    The state grows with the window rather than the history, so an update
+    costs time and checkpoint space proportional to the window.
+    """
+    if not existing or update.get("reset"):
+        existing = {
+            "count": 0,
+            "first_id": None,
+            "last_id": None,
+            "tail": [],
+            "tail_tokens": 0,
+            "budget": 0,
+            "start": 0,
+        }
+    ids = update.get("ids", [])
+    budget = update.get("budget", existing["budget"])
+    tail = existing["tail"] + list(update.get("counts", []))
+    tail_tokens = existing["tail_tokens"] + sum(update.get("counts", []))
+    drop = 0
+    while tail_tokens > budget and drop < len(tail) - 1:
+        tail_tokens -= tail[drop]
+        drop += 1
+    count = existing["count"] + len(ids)
+    return {
+        "count": count,
+        "first_id": existing["first_id"] or (ids[0] if ids else None),
+        "last_id": ids[-1] if ids else existing["last_id"],
+        "tail": tail[drop:],
+        "tail_tokens": tail_tokens,
+        "budget": budget,
+        "start": count - len(tail) + drop,
+    }
+
+
+class WindowState(MessagesState):
+    window: Annotated[dict, update_window]
+
+
+def window_node(
+    budget: int, token_counter: Callable[[BaseMessage], int]
+) -> Callable[[WindowState], dict]:
+    """Node keeping `window` up to date with the messages added since its
+    previous run, under a budget of `budget` tokens.
+
+    `token_counter` counts one message, e.g. `token_counter.count_message`.
+    When the counted messages are no longer a prefix of the history (messages
+    were removed) or the budget changed, the window is counted again from
+    scratch.
+    """
+
+    def node(state: WindowState):
+        messages = state["messages"]
+        window = state.get("window") or {"count": 0, "budget": budget}
+        counted = window["count"]
+        appended = (
+            counted <= len(messages)
+            and window["budget"] == budget
+            and (
+                not counted
+                or (
+                    messages[0].id == window["first_id"]
+                    and messages[counted - 1].id == window["last_id"]
+                )
+            )
+        )
+        new = messages[counted:] if appended else messages
+        return {
+            "window": {
+                "reset": not appended,
+                "ids": [message.id for message in new],
+                "counts": [token_counter(message) for message in new],
+                "budget": budget,
+            }
+        }
+
+    return node
+
+
+def window_messages(state: WindowState) -> list[BaseMessage]:
+    """The messages of the current window."""
+    return state["messages"][state["window"]["start"] :]
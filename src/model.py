@@ -1,9 +1,62 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
-
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash",
-    temperature=0,
-    max_tokens=None,
-    timeout=None,
-    max_retries=2,
+import os
+
+from src.branch_scheduler import BranchScheduler
+from src.context_cache import CachingChatGoogleGenerativeAI, context_cache_from_env
+from src.fake_llm import FakeChatModel
+from src.llm_cache import cache_from_env
+from src.llm_pool import ClientPool
+from src.rate_limiter import rate_limiter_from_env
+from src.retrieval_cache import retrieval_cache_from_env
+from src.token_counter import TokenCounter, model_name
+
+# Opt-in response cache (see LLM_CACHE in the README)
+llm_cache = cache_from_env()
+
+# Opt-in requests/tokens per minute limiter shared by every graph (see LLM_RPM)
+rate_limiter = rate_limiter_from_env()
+
+# Opt-in cache of the Tavily/Wikipedia results (see RETRIEVAL_CACHE)
+retrieval_cache = retrieval_cache_from_env()
+
+# LLM_BACKEND=fake swaps Gemini for a deterministic offline model (benchmarks)
+offline = os.environ.get("LLM_BACKEND", "gemini").lower() == "fake"
+
+# Opt-in provider-side caching of static prompt prefixes (see LLM_CONTEXT_CACHE)
+context_cache = context_cache_from_env(offline=offline)
+
+if offline:
+    llm = FakeChatModel(
+        latency=os.environ.get("FAKE_LLM_LATENCY"),
+        list_size=int(os.environ.get("FAKE_LLM_LIST_SIZE", "3")),
+        cache=llm_cache,
+        rate_limiter=rate_limiter,
+        callbacks=[rate_limiter.callback] if rate_limiter else None,
+        context_cache=context_cache,
+    )
+else:
+    llm = CachingChatGoogleGenerativeAI(
+        model="gemini-2.0-flash",
+        temperature=0,
+        max_tokens=None,
+        timeout=None,
+        max_retries=2,
+        cache=llm_cache,
+        rate_limiter=rate_limiter,
+        callbacks=[rate_limiter.callback] if rate_limiter else None,
+        context_cache=context_cache,
+    )
+
+# Shared pool bounding the model calls in flight from async graph nodes
+pool = ClientPool(
+    max_in_flight=int(os.environ.get("LLM_MAX_IN_FLIGHT", "8")),
+    max_in_flight_per_key=int(os.environ.get("LLM_MAX_IN_FLIGHT_PER_KEY", "0")),
+    limiter=rate_limiter,
 )
+
+# Shared cap on the Send() branches of map steps (interviews, jokes) running at once
+branch_scheduler = BranchScheduler(
+    max_in_flight=int(os.environ.get("BRANCH_MAX_IN_FLIGHT", "8"))
+)
+
+# Offline token counter for trim_messages and context budgets (see TOKEN_COUNTER_FACTOR)
+token_counter = TokenCounter(model_name(llm))
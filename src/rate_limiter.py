@@ -0,0 +1,235 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.rate_limiters import BaseRateLimiter
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `per_minute` tokens per minute.
+
+    The balance may go negative when usage is only known after the fact
+    (tokens per minute), in which case callers wait until the debt is repaid.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` tokens are available (0 if they are now)."""
+        self._refill(now)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self.tokens -= amount
+
+
+def is_throttle_error(error: BaseException) -> bool:
+    """Whether the provider rejected the call because of quota or rate limits."""
+    name = type(error).__name__
+    return (
+        name in ("ResourceExhausted", "TooManyRequests", "RateLimitError")
+        or "429" in str(error)
+        or "RESOURCE_EXHAUSTED" in str(error)
+    )
+
+
+class AdaptiveRateLimiter(BaseRateLimiter):
+    """Process-wide requests/tokens per minute limiter with AIMD concurrency.
+
+    Pass it as `rate_limiter` to the chat model so every request, sync or
+    async, waits for a request token and for the tokens-per-minute budget.
+    Its `callback` reports usage, latency and throttling back to it:
+
+    - tokens per minute are debited with the `usage_metadata` of each response
+    - the concurrency window grows by one per window of fast successful calls
+      (additive increase) and is halved on a throttled or slow call
+      (multiplicative decrease); `ClientPool` uses it as its in-flight cap
+      and is notified through `add_listener` when it changes
+    - a throttled call also pauses every caller for an exponential, jittered
+      backoff that is reset by the next success
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        min_concurrency: int = 1,
+        max_concurrency: int = 8,
+        target_latency: Optional[float] = None,
+        check_every_n_seconds: float = 0.05,
+        max_backoff: float = 60.0,
+    ):
+        self.requests = (
+            TokenBucket(requests_per_minute) if requests_per_minute else None
+        )
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self.check_every_n_seconds = check_every_n_seconds
+        self.max_backoff = max_backoff
+        self.window = float(max_concurrency)
+        self.stats = {
+            "requests": 0,
+            "throttled": 0,
+            "slow": 0,
+            "tokens": 0,
+            "queue_wait_total": 0.0,
+            "queue_wait_max": 0.0,
+        }
+        self.callback = _LimiterCallback(self)
+        self._consecutive_throttles = 0
+        self._paused_until = 0.0
+        self._listeners: list[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def concurrency(self) -> int:
+        """Current AIMD concurrency window."""
+        return int(self.window)
+
+    def add_listener(self, listener: Callable[[], None]):
+        """Call `listener()` whenever `concurrency` changes."""
+        self._listeners.append(listener)
+
+    def _notify(self, previous: int):
+        if self.concurrency != previous:
+            for listener in self._listeners:
+                listener()
+
+    def _try_acquire(self) -> float:
+        """Take a request token if allowed, else return the seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._paused_until - now)
+            if self.requests is not None:
+                wait = max(wait, self.requests.wait_time(1, now))
+            if self.tokens is not None:
+                # Only wait while the token budget is in debt
+                wait = max(wait, self.tokens.wait_time(0, now))
+            if wait > 0:
+                return wait
+            if self.requests is not None:
+                self.requests.take(1)
+            self.stats["requests"] += 1
+            return 0.0
+
+    def _record_wait(self, waited: float):
+        with self._lock:
+            self.stats["queue_wait_total"] += waited
+            self.stats["queue_wait_max"] = max(self.stats["queue_wait_max"], waited)
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        start = time.monotonic()
+        while (wait := self._try_acquire()) > 0:
+            if not blocking:
+                return False
+            time.sleep(min(wait, self.check_every_n_seconds))
+        self._record_wait(time.monotonic() - start)
+        return True
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        start = time.monotonic()
+        while (wait := self._try_acquire()) > 0:
+            if not blocking:
+                return False
+            await asyncio.sleep(min(wait, self.check_every_n_seconds))
+        self._record_wait(time.monotonic() - start)
+        return True
+
+    def on_success(self, latency: float, total_tokens: int = 0):
+        """Additive increase, or multiplicative decrease if the call was slow."""
+        previous = self.concurrency
+        with self._lock:
+            if self.tokens is not None and total_tokens:
+                self.tokens.take(total_tokens)
+            self.stats["tokens"] += total_tokens
+            self._consecutive_throttles = 0
+            if self.target_latency is not None and latency > self.target_latency:
+                self.stats["slow"] += 1
+                self.window = max(self.min_concurrency, self.window / 2)
+            else:
+                self.window = min(self.max_concurrency, self.window + 1 / self.window)
+        self._notify(previous)
+
+    def on_throttle(self):
+        """Multiplicative decrease and a shared, jittered backoff."""
+        previous = self.concurrency
+        with self._lock:
+            self.stats["throttled"] += 1
+            self._consecutive_throttles += 1
+            self.window = max(self.min_concurrency, self.window / 2)
+            backoff = min(self.max_backoff, 2 ** (self._consecutive_throttles - 1))
+            self._paused_until = max(
+                self._paused_until,
+                time.monotonic() + backoff * random.uniform(0.5, 1.0),
+            )
+        self._notify(previous)
+
+
+class _LimiterCallback(BaseCallbackHandler):
+    """Feed latency, token usage and throttling of each model call to the limiter."""
+
+    def __init__(self, limiter: AdaptiveRateLimiter):
+        self.limiter = limiter
+        self._started: dict[UUID, float] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        self._started[run_id] = time.monotonic()
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs):
+        self._started[run_id] = time.monotonic()
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        started = self._started.pop(run_id, None)
+        latency = time.monotonic() - started if started is not None else 0.0
+        total_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(
+                    getattr(generation, "message", None), "usage_metadata", None
+                )
+                if usage:
+                    total_tokens += usage.get("total_tokens", 0)
+        self.limiter.on_success(latency, total_tokens)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._started.pop(run_id, None)
+        if is_throttle_error(error):
+            self.limiter.on_throttle()
+
+
+def rate_limiter_from_env() -> Optional[AdaptiveRateLimiter]:
+    """Build the shared limiter from LLM_RPM / LLM_TPM (disabled if neither is set)."""
+    rpm = os.environ.get("LLM_RPM")
+    tpm = os.environ.get("LLM_TPM")
+    if not rpm and not tpm:
+        return None
+    target_latency = os.environ.get("LLM_TARGET_LATENCY")
+    return AdaptiveRateLimiter(
+        requests_per_minute=float(rpm) if rpm else None,
+        tokens_per_minute=float(tpm) if tpm else None,
+        min_concurrency=int(os.environ.get("LLM_MIN_IN_FLIGHT", "1")),
+        max_concurrency=int(
+            os.environ.get("LLM_MAX_WINDOW") or os.environ.get("LLM_MAX_IN_FLIGHT", "8")
+        ),
+        target_latency=float(target_latency) if target_latency else None,
+    )
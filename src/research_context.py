@@ -0,0 +1,77 @@
+import hashlib
+import os
+import re
+from typing import Optional
+
+from langchain_core.documents import Document
+
+from src.model import token_counter
+
+# Token budget of the documents put in a prompt (RESEARCH_CONTEXT_TOKENS)
+DEFAULT_BUDGET = int(os.environ.get("RESEARCH_CONTEXT_TOKENS", "6000"))
+
+
+def document_key(document: Document) -> str:
+    """Identity of a retrieved document: the URL of a web page, else a hash
+    of its content (the same article or chunk found by another query)."""
+    if "href" in document.metadata:
+        return document.metadata["href"]
+    return hashlib.sha256(document.page_content.encode()).hexdigest()
+
+
+def merge_documents(existing: Optional[list], new: Optional[list]) -> list:
+    """Reducer appending the retrieved documents not already in the context."""
+    existing = list(existing or [])
+    seen = {document_key(document) for document in existing}
+    for document in new or []:
+        key = document_key(document)
+        if key not in seen:
+            seen.add(key)
+            existing.append(document)
+    return existing
+
+
+def _terms(text: str) -> set[str]:
+    return set(re.findall(r"\w+", text.casefold()))
+
+
+def format_document(document: Document) -> str:
+    metadata = document.metadata
+    if "href" in metadata:
+        header = f'<Document href="{metadata["href"]}"/>'
+    else:
+        header = (
+            f'<Document source="{metadata.get("source", "")}" '
+            f'page="{metadata.get("page") or ""}"/>'
+        )
+    return f"{header}\n{document.page_content}\n</Document>"
+
+
+def pack_documents(
+    documents: list[Document], focus: str, budget: Optional[int] = None
+) -> str:
+    """Format the documents most relevant to `focus` that fit in `budget` tokens.
+
+    Documents are ranked by the share of the `focus` terms (the question, or
+    the analyst focus) they contain, most recently retrieved first on ties,
+    and added while they fit, as counted by the shared `token_counter`. The
+    packed documents keep their retrieval order in the prompt, so citations
+    stay stable across turns.
+    """
+    budget = DEFAULT_BUDGET if budget is None else budget
+    focus_terms = _terms(focus)
+    formatted = [format_document(document) for document in documents]
+    ranked = sorted(
+        range(len(documents)),
+        key=lambda i: (
+            -len(focus_terms & _terms(documents[i].page_content)),
+            -i,
+        ),
+    )
+    chosen, used = set(), 0
+    for i in ranked:
+        tokens = token_counter.count_text(formatted[i])
+        if used + tokens <= budget:
+            chosen.add(i)
+            used += tokens
+    return "\n\n---\n\n".join(formatted[i] for i in sorted(chosen))
@@ -0,0 +1,255 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from langchain_core.documents import Document
+
+
+def normalize_query(query: str) -> str:
+    """Case, punctuation and whitespace insensitive form of a search query."""
+    return " ".join(re.findall(r"\w+", query.casefold()))
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, Document):
+        return {"__document__": value.metadata, "page_content": value.page_content}
+    raise TypeError(f"Cannot cache {type(value).__name__} results")
+
+
+def _decode(value: dict) -> Any:
+    if "__document__" in value:
+        return Document(
+            page_content=value["page_content"], metadata=value["__document__"]
+        )
+    return value
+
+
+def _dumps(value: Any) -> str:
+    """Serialize search results: JSON data and `Document`s."""
+    return json.dumps(value, default=_encode)
+
+
+def _loads(text: str) -> Any:
+    return json.loads(text, object_hook=_decode)
+
+
+class RetrievalCache:
+    """SQLite cache of search results keyed on the normalized query.
+
+    Results of `source` are fresh for `ttls[source]` seconds (`default_ttl`
+    for other sources). Once expired they are still served for `stale_ttl`
+    seconds while a single background fetch replaces them
+    (stale-while-revalidate); older entries are fetched again before
+    answering. A source name must identify its parameters (e.g. the number of
+    results), since they are not part of the key.
+    """
+
+    def __init__(
+        self,
+        db_path: str = ":memory:",
+        ttls: Optional[dict[str, float]] = None,
+        default_ttl: float = 3600,
+        stale_ttl: float = 0,
+    ):
+        self.db_path = db_path
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self.stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "revalidations": 0,
+            "errors": 0,
+        }
+        self._lock = threading.Lock()
+        # Background refreshes and concurrent misses, by key
+        self._revalidating: dict[str, Any] = {}
+        self._pending: dict[str, asyncio.Future] = {}
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS retrieval_cache (
+                key TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                query TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _key(source: str, query: str) -> str:
+        digest = hashlib.sha256(source.encode())
+        digest.update(b"\x00" + normalize_query(query).encode())
+        return digest.hexdigest()
+
+    def _lookup(self, source: str, key: str) -> tuple[Any, str]:
+        """(cached value, "fresh" | "stale" | "miss")."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM retrieval_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None, "miss"
+        age = time.time() - row[1]
+        ttl = self.ttls.get(source, self.default_ttl)
+        if age <= ttl:
+            return _loads(row[0]), "fresh"
+        if age <= ttl + self.stale_ttl:
+            return _loads(row[0]), "stale"
+        return None, "miss"
+
+    def _store(self, source: str, query: str, key: str, value: Any):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO retrieval_cache VALUES (?, ?, ?, ?, ?)",
+                (key, source, normalize_query(query), _dumps(value), time.time()),
+            )
+            self._conn.commit()
+
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def get(self, source: str, query: str, fetch: Callable[[str], Any]) -> Any:
+        """Return the results of `fetch(query)`, cached for `source`."""
+        key = self._key(source, query)
+        value, state = self._lookup(source, key)
+        if state == "fresh":
+            self._count("hits")
+            return value
+        if state == "stale":
+            self._count("stale_hits")
+            with self._lock:
+                if key in self._revalidating:
+                    return value
+                thread = threading.Thread(
+                    target=self._revalidate, args=(source, query, key, fetch)
+                )
+                self._revalidating[key] = thread
+            thread.start()
+            return value
+        self._count("misses")
+        value = fetch(query)
+        self._store(source, query, key, value)
+        return value
+
+    def _revalidate(self, source: str, query: str, key: str, fetch):
+        try:
+            self._store(source, query, key, fetch(query))
+            self._count("revalidations")
+        except Exception:
+            # The stale results stay in place until they are too old
+            self._count("errors")
+        finally:
+            with self._lock:
+                self._revalidating.pop(key, None)
+
+    async def aget(
+        self, source: str, query: str, fetch: Callable[[str], Awaitable[Any]]
+    ) -> Any:
+        """Async `get`; concurrent misses on the same key share one fetch."""
+        key = self._key(source, query)
+        value, state = self._lookup(source, key)
+        if state == "fresh":
+            self._count("hits")
+            return value
+        if state == "stale":
+            self._count("stale_hits")
+            if key not in self._revalidating:
+                self._revalidating[key] = asyncio.ensure_future(
+                    self._arevalidate(source, query, key, fetch)
+                )
+            return value
+        self._count("misses")
+        pending = self._pending.get(key)
+        if pending is None or pending.get_loop() is not asyncio.get_running_loop():
+            pending = asyncio.ensure_future(self._afetch(source, query, key, fetch))
+            self._pending[key] = pending
+        # Every caller, the first included, waits through a shield, so a caller
+        # cancelled by its deadline does not cancel the fetch the others share
+        return await asyncio.shield(pending)
+
+    async def _afetch(self, source: str, query: str, key: str, fetch):
+        try:
+            value = await fetch(query)
+        finally:
+            self._pending.pop(key, None)
+        self._store(source, query, key, value)
+        return value
+
+    async def _arevalidate(self, source: str, query: str, key: str, fetch):
+        try:
+            self._store(source, query, key, await fetch(query))
+            self._count("revalidations")
+        except Exception:
+            self._count("errors")
+        finally:
+            self._revalidating.pop(key, None)
+
+    def purge_expired(self):
+        """Delete the entries too old to be served, even as stale results."""
+        now = time.time()
+        with self._lock:
+            for source, ttl in self.ttls.items():
+                self._conn.execute(
+                    "DELETE FROM retrieval_cache WHERE source = ? AND created_at < ?",
+                    (source, now - ttl - self.stale_ttl),
+                )
+            placeholders = ",".join("?" * len(self.ttls))
+            self._conn.execute(
+                f"DELETE FROM retrieval_cache WHERE source NOT IN ({placeholders})"
+                " AND created_at < ?",
+                (*self.ttls, now - self.default_ttl - self.stale_ttl),
+            )
+            self._conn.commit()
+
+
+def retrieve(
+    cache: Optional[RetrievalCache], source: str, query: str, fetch: Callable
+) -> Any:
+    """`fetch(query)` through `cache`, or directly when caching is disabled."""
+    if cache is None:
+        return fetch(query)
+    return cache.get(source, query, fetch)
+
+
+async def aretrieve(
+    cache: Optional[RetrievalCache], source: str, query: str, fetch: Callable
+) -> Any:
+    """Async `retrieve`."""
+    if cache is None:
+        return await fetch(query)
+    return await cache.aget(source, query, fetch)
+
+
+def retrieval_cache_from_env() -> Optional[RetrievalCache]:
+    """Build the cache selected by RETRIEVAL_CACHE (memory | sqlite).
+
+    Anything else (the default) disables it. RETRIEVAL_CACHE_TTL_<SOURCE>
+    (e.g. RETRIEVAL_CACHE_TTL_WIKIPEDIA) overrides RETRIEVAL_CACHE_TTL for
+    one source.
+    """
+    mode = os.environ.get("RETRIEVAL_CACHE", "").lower()
+    if mode not in ("memory", "sqlite"):
+        return None
+    prefix = "RETRIEVAL_CACHE_TTL_"
+    return RetrievalCache(
+        db_path=os.environ.get("RETRIEVAL_CACHE_PATH", ".retrieval_cache.db")
+        if mode == "sqlite"
+        else ":memory:",
+        ttls={
+            name[len(prefix) :].lower(): float(value)
+            for name, value in os.environ.items()
+            if name.startswith(prefix)
+        },
+        default_ttl=float(os.environ.get("RETRIEVAL_CACHE_TTL", "3600")),
+        stale_ttl=float(os.environ.get("RETRIEVAL_CACHE_STALE", "0")),
+    )
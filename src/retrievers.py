@@ -0,0 +1,161 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+from langchain_community.document_loaders import WikipediaLoader
+from langchain_community.tools.tavily_search import TavilySearchResults
+from langchain_core.documents import Document
+
+from src.document_index import DocumentIndex
+from src.model import retrieval_cache
+from src.retrieval_cache import aretrieve
+
+# Latencies kept per source for the percentiles
+LATENCY_WINDOW = 1000
+
+
+class Retriever:
+    """A search source: `search(query)` returns the documents found."""
+
+    def __init__(
+        self,
+        name: str,
+        search: Callable[[str], Awaitable[list[Document]]],
+        deadline: Optional[float] = None,
+    ):
+        self.name = name
+        self.search = search
+        self.deadline = deadline
+        self.stats = {"calls": 0, "ok": 0, "timeout": 0, "error": 0}
+        self.latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def latency(self, percent: float) -> float:
+        """Latency percentile (seconds) over the last LATENCY_WINDOW calls."""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+# Registered sources, queried in registration order
+registry: dict[str, Retriever] = {}
+
+
+def _deadline(name: str) -> float:
+    return float(
+        os.environ.get(
+            f"RETRIEVAL_DEADLINE_{name.upper()}",
+            os.environ.get("RETRIEVAL_DEADLINE", "10"),
+        )
+    )
+
+
+def register(
+    name: str,
+    search: Callable[[str], Awaitable[list[Document]]],
+    deadline: Optional[float] = None,
+) -> Retriever:
+    """Add (or replace) a source. `deadline` defaults to RETRIEVAL_DEADLINE_<NAME>,
+    then RETRIEVAL_DEADLINE (seconds)."""
+    retriever = registry[name] = Retriever(
+        name, search, _deadline(name) if deadline is None else deadline
+    )
+    return retriever
+
+
+async def _timed(retriever: Retriever, query: str) -> tuple[list[Document], dict]:
+    start = time.perf_counter()
+    retriever.stats["calls"] += 1
+    try:
+        documents = await asyncio.wait_for(retriever.search(query), retriever.deadline)
+        status = "ok"
+    except asyncio.TimeoutError:
+        documents, status = [], "timeout"
+    except Exception:
+        documents, status = [], "error"
+    latency = time.perf_counter() - start
+    retriever.stats[status] += 1
+    retriever.latencies.append(latency)
+    return documents, {
+        "latency": latency,
+        "status": status,
+        "documents": len(documents),
+    }
+
+
+async def fan_out(
+    query: str, names: Optional[list[str]] = None
+) -> tuple[dict[str, list[Document]], dict[str, dict]]:
+    """Query the sources concurrently, each within its own deadline.
+
+    Returns the documents of the sources that answered in time, by source,
+    and the latency, status and document count of every source. A source
+    that times out or fails is cancelled and contributes no documents.
+    """
+    retrievers = [registry[name] for name in names or registry]
+    results = await asyncio.gather(
+        *(_timed(retriever, query) for retriever in retrievers)
+    )
+    documents, metrics = {}, {}
+    for retriever, (docs, metric) in zip(retrievers, results):
+        metrics[retriever.name] = metric
+        if docs:
+            documents[retriever.name] = docs
+    return documents, metrics
+
+
+# Default sources
+async def search_web(query: str) -> list[Document]:
+    """Tavily web search"""
+    docs = await aretrieve(
+        retrieval_cache,
+        "web",
+        query,
+        lambda query: TavilySearchResults(max_results=3).ainvoke(query),
+    )
+    return [
+        Document(page_content=doc["content"], metadata={"href": doc["url"]})
+        for doc in docs
+    ]
+
+
+async def search_wikipedia(query: str) -> list[Document]:
+    """Wikipedia articles"""
+    return await aretrieve(
+        retrieval_cache,
+        "wikipedia",
+        query,
+        lambda query: WikipediaLoader(query=query, load_max_docs=2).aload(),
+    )
+
+
+def local_search(index: DocumentIndex, max_results: int = 3):
+    """Search source over a local document index"""
+
+    async def search(query: str) -> list[Document]:
+        # The lookup is CPU-bound; run it off the event loop
+        hits = await asyncio.to_thread(index.search, query, max_results)
+        return [
+            Document(
+                page_content=hit["text"],
+                metadata={"source": hit["source"], "page": hit["page"]},
+            )
+            for hit in hits
+        ]
+
+    return search
+
+
+register("web", search_web)
+register("wikipedia", search_wikipedia)
+# The local index is searched when RETRIEVAL_INDEX_DIR or RETRIEVAL_DOCS_DIR is
+# set; new or changed files of RETRIEVAL_DOCS_DIR are indexed at startup
+if os.environ.get("RETRIEVAL_INDEX_DIR") or os.environ.get("RETRIEVAL_DOCS_DIR"):
+    local_index = DocumentIndex(
+        os.environ.get("RETRIEVAL_INDEX_DIR", ".document_index")
+    )
+    if os.environ.get("RETRIEVAL_DOCS_DIR"):
+        local_index.add_directory(os.environ["RETRIEVAL_DOCS_DIR"])
+    register("local", local_search(local_index))
@@ -1,18 +1,20 @@
 from typing import Literal
 from langchain_core.messages import HumanMessage, SystemMessage, RemoveMessage
-from langgraph.graph import MessagesState
 from langgraph.graph import StateGraph, START, END
 
-from src.model import llm
+from src.indexed_messages import IndexedMessagesState
+from src.model import llm, pool
+from src.summary_tree import SUMMARY_STRATEGY, HierarchicalSummarizer
 
 
 # State class to store messages and summary
-class State(MessagesState):
+class State(IndexedMessagesState):
     summary: str
+    summary_tree: list[list[str]]
 
 
 # Define the logic to call the model
-def call_model(state: State):
+async def call_model(state: State):
     # Get summary if it exists
     summary = state.get("summary", "")
 
@@ -27,7 +29,7 @@ def call_model(state: State):
     else:
         messages = state["messages"]
 
-    response = llm.invoke(messages)
+    response = await pool.ainvoke(llm, messages)
     return {"messages": response}
 
 
@@ -37,7 +39,9 @@ def should_continue(state: State) -> Literal["summarize_conversation", "__end__"
 
     messages = state["messages"]
 
-    # If there are more than six messages, then we summarize the conversation
+    # If there are more than six messages, then we summarize the conversation.
+    # The deployed graph is run without a BackgroundSummarizer, so it ignores
+    # SUMMARY_MODE=background and always summarizes within the turn
     if len(messages) > 6:
         return "summarize_conversation"
 
@@ -45,7 +49,7 @@ def should_continue(state: State) -> Literal["summarize_conversation", "__end__"
     return END
 
 
-def summarize_conversation(state: State):
+async def summarize_conversation(state: State):
     # First get the summary if it exists
     summary = state.get("summary", "")
 
@@ -63,17 +67,25 @@ def summarize_conversation(state: State):
 
     # Add prompt to our history
     messages = state["messages"] + [HumanMessage(content=summary_message)]
-    response = llm.invoke(messages)
+    response = await pool.ainvoke(llm, messages)
 
     # Delete all but the 2 most recent messages and add our summary to the state
     delete_messages = [RemoveMessage(id=m.id) for m in state["messages"][:-2]]
     return {"summary": response.content, "messages": delete_messages}
 
 
+# Summarize fixed-size chunks of the new messages once and merge their summaries
+# into a capped tree (SUMMARY_STRATEGY=hierarchical)
+if SUMMARY_STRATEGY == "hierarchical":
+    summarize = HierarchicalSummarizer(llm, pool).asummarize
+else:
+    summarize = summarize_conversation
+
+
 # Define a new graph
 workflow = StateGraph(State)
 workflow.add_node("conversation", call_model)
-workflow.add_node(summarize_conversation)
+workflow.add_node("summarize_conversation", summarize)
 
 # Set the entrypoint as conversation
 workflow.add_edge(START, "conversation")
@@ -1,14 +1,17 @@
 from langgraph.graph import END
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import StateGraph, START
-from langgraph.graph import MessagesState
 from langchain_core.messages import SystemMessage, HumanMessage, RemoveMessage
 
+from src.background_summary import SUMMARY_MODE, BackgroundSummarizer
+from src.indexed_messages import IndexedMessagesState
 from src.model import llm
+from src.summary_tree import SUMMARY_STRATEGY, HierarchicalSummarizer
 
 
-class State(MessagesState):
+class State(IndexedMessagesState):
     summary: str
+    summary_tree: list[list[str]]
 
 
 # Define the logic to call the model
@@ -47,12 +50,21 @@ def summarize_conversation(state: State):
     return {"summary": response.content, "messages": delete_messages}
 
 
+# Summarize fixed-size chunks of the new messages once and merge their summaries
+# into a capped tree (SUMMARY_STRATEGY=hierarchical)
+if SUMMARY_STRATEGY == "hierarchical":
+    summarize = HierarchicalSummarizer(llm).summarize
+else:
+    summarize = summarize_conversation
+
+
 # Determine whether to end or summarize the conversation
 def should_continue(state: State):
     """Return the next node to execute."""
     messages = state["messages"]
-    # If there are more than six messages, then we summarize the conversation
-    if len(messages) > 6:
+    # If there are more than six messages, then we summarize the conversation,
+    # unless the summary is written in the background (SUMMARY_MODE=background)
+    if SUMMARY_MODE == "inline" and len(messages) > 6:
         return "summarize_conversation"
     # Otherwise we can just end
     return END
@@ -62,7 +74,7 @@ def should_continue(state: State):
 # Define a new graph
 workflow = StateGraph(State)
 workflow.add_node("conversation", call_model)
-workflow.add_node(summarize_conversation)
+workflow.add_node("summarize_conversation", summarize)
 # Set the entrypoint as conversation
 workflow.add_edge(START, "conversation")
 workflow.add_conditional_edges("conversation", should_continue)
@@ -70,28 +82,32 @@ workflow.add_edge("summarize_conversation", END)
 # Compile
 memory = MemorySaver()
 graph = workflow.compile(checkpointer=memory)
+# Runs the turns; with SUMMARY_MODE=background, it returns each reply before
+# the conversation is summarized
+summarizer = BackgroundSummarizer(graph, summarize)
 print(graph.get_graph())
 # THREADS
 # Create a thread
 config = {"configurable": {"thread_id": "1"}}
 # Start conversation
 input_message = HumanMessage(content="hi! I'm Florentino")
-output = graph.invoke({"messages": [input_message]}, config)
+output = summarizer.invoke({"messages": [input_message]}, config)
 for m in output["messages"][-1:]:
     m.pretty_print()
 input_message = HumanMessage(content="what's my name?")
-output = graph.invoke({"messages": [input_message]}, config)
+output = summarizer.invoke({"messages": [input_message]}, config)
 for m in output["messages"][-1:]:
     m.pretty_print()
 input_message = HumanMessage(content="i like the 49ers!")
-output = graph.invoke({"messages": [input_message]}, config)
+output = summarizer.invoke({"messages": [input_message]}, config)
 for m in output["messages"][-1:]:
     m.pretty_print()
 graph.get_state(config).values.get("summary", "")
 input_message = HumanMessage(
     content="i like Nick Bosa, isn't he the highest paid defensive player?"
 )
-output = graph.invoke({"messages": [input_message]}, config)
+output = summarizer.invoke({"messages": [input_message]}, config)
 for m in output["messages"][-1:]:
     m.pretty_print()
+summarizer.wait()
 print(graph.get_state(config).values.get("summary", ""))
@@ -10,6 +10,8 @@ from langgraph.graph.message import add_messages
 from langchain_core.messages import RemoveMessage
 from langchain_core.messages import AIMessage, HumanMessage
 
+from src.indexed_messages import add_messages_indexed
+
 
 # DEFAULT OVERWRITTEN STATE
 class State(TypedDict):
@@ -248,3 +250,6 @@ messages.append(
 delete_messages = [RemoveMessage(id=m.id) for m in messages[:-2]]
 print(delete_messages)
 print(add_messages(messages, delete_messages))
+
+# INDEXED REDUCER for long conversations: same result, keeps an id -> position index
+print(add_messages_indexed(messages, delete_messages))
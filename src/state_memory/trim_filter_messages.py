@@ -3,8 +3,10 @@ from langgraph.graph import StateGraph, START, END
 from langchain_core.messages import RemoveMessage
 from langchain_core.messages import trim_messages
 from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
 
-from src.model import llm
+from src.message_window import WindowState, window_messages, window_node
+from src.model import llm, token_counter
 
 # MESSAGE AS STATE
 messages = [AIMessage("So you said you were researching ocean mammals?", name="Bot")]
@@ -112,7 +114,7 @@ def chat_model_node(state: MessagesState):
         state["messages"],
         max_tokens=100,
         strategy="last",
-        token_counter=llm,
+        token_counter=token_counter,
         allow_partial=False,
     )
     return {"messages": [llm.invoke(messages)]}
@@ -135,7 +137,7 @@ trim_messages(
     messages,
     max_tokens=100,
     strategy="last",
-    token_counter=llm,
+    token_counter=token_counter,
     allow_partial=False,
 )
 # Invoke, using message trimming in the chat_model_node
@@ -143,3 +145,33 @@ messages_out_trim = graph.invoke({"messages": messages})
 print("------------------------------------------------------")
 for m in messages_out_trim["messages"]:
     m.pretty_print()
+
+
+# SLIDING WINDOW: token budget kept up to date incrementally in the state
+# Node
+def chat_model_node(state: WindowState):
+    return {"messages": [llm.invoke(window_messages(state))]}
+
+
+# Build graph
+builder = StateGraph(WindowState)
+builder.add_node("update_window", window_node(100, token_counter.count_message))
+builder.add_node("chat_model", chat_model_node)
+builder.add_edge(START, "update_window")
+builder.add_edge("update_window", "chat_model")
+builder.add_edge("chat_model", END)
+graph = builder.compile(checkpointer=MemorySaver())
+
+# View
+print(graph.get_graph())
+
+# Each turn only counts the messages added since the previous one
+config = {"configurable": {"thread_id": "1"}}
+output = graph.invoke({"messages": messages}, config)
+output = graph.invoke(
+    {"messages": [HumanMessage("And where do Narwhals live?", name="Florentino")]},
+    config,
+)
+print("------------------------------------------------------")
+for m in window_messages(output):
+    m.pretty_print()
@@ -0,0 +1,126 @@
+import asyncio
+import os
+from typing import Any, Optional
+
+from langchain_core.messages import BaseMessage, HumanMessage, RemoveMessage
+
+# "rolling" extends one summary with the whole window, "hierarchical" uses
+# HierarchicalSummarizer
+SUMMARY_STRATEGY = os.environ.get("SUMMARY_STRATEGY", "rolling").lower()
+
+chunk_prompt = """Summarize the conversation above in at most {words} words. Keep names, preferences and facts the user shared."""
+merge_prompt = """Below are summaries of consecutive parts of a conversation, oldest first. Merge them into one summary of at most {words} words, keeping names, preferences and facts the user shared.
+
+{summaries}"""
+
+
+def render_summary(tree: list[list[str]]) -> str:
+    """Summary text of a tree, from the oldest (highest level) summaries to
+    the most recent chunk summaries."""
+    return "\n\n".join(summary for level in reversed(tree) for summary in level)
+
+
+class HierarchicalSummarizer:
+    """Summarize a conversation in fixed-size chunks merged into a tree.
+
+    Each run summarizes the oldest `chunk_size` messages not summarized yet,
+    keeping the `keep` most recent ones, and removes them from the state, so
+    a model call never sees more than one chunk. Chunk summaries are level 0
+    of `summary_tree`; once a level holds `fanout` summaries they are merged
+    into one summary of the next level. The last of the `max_levels` levels
+    is merged into itself, which caps the summary at `max_levels * (fanout -
+    1)` summaries of about `words` words. `summary` holds the rendered tree.
+    """
+
+    def __init__(
+        self,
+        llm: Any,
+        pool: Optional[Any] = None,
+        chunk_size: int = 4,
+        keep: int = 2,
+        fanout: int = 4,
+        max_levels: int = 2,
+        words: int = 80,
+    ):
+        self.llm = llm
+        self.pool = pool
+        self.chunk_size = chunk_size
+        self.keep = keep
+        self.fanout = fanout
+        self.max_levels = max_levels
+        self.words = words
+
+    def _chunks(self, messages: list[BaseMessage]) -> list[list[BaseMessage]]:
+        """Full chunks of the messages before the `keep` most recent ones."""
+        pending = messages[: len(messages) - self.keep]
+        count = len(pending) // self.chunk_size * self.chunk_size
+        return [
+            pending[i : i + self.chunk_size] for i in range(0, count, self.chunk_size)
+        ]
+
+    def _chunk_prompt(self, chunk: list[BaseMessage]) -> list[BaseMessage]:
+        return chunk + [HumanMessage(chunk_prompt.format(words=self.words))]
+
+    def _merge_prompt(self, summaries: list[str]) -> str:
+        return merge_prompt.format(
+            words=self.words, summaries="\n\n---\n\n".join(summaries)
+        )
+
+    def _full_level(self, tree: list[list[str]]) -> Optional[int]:
+        for level, summaries in enumerate(tree):
+            if len(summaries) >= self.fanout:
+                return level
+        return None
+
+    def _merged(self, tree: list[list[str]], level: int, summary: str):
+        """Replace the summaries of `level` by their merge `summary`."""
+        tree[level] = []
+        if level + 1 < self.max_levels:
+            if level + 1 == len(tree):
+                tree.append([])
+            tree[level + 1].append(summary)
+        else:
+            tree[level] = [summary]
+
+    def _update(self, chunks: list, tree: list[list[str]]) -> dict:
+        return {
+            "summary": render_summary(tree),
+            "summary_tree": tree,
+            "messages": [
+                RemoveMessage(id=message.id) for chunk in chunks for message in chunk
+            ],
+        }
+
+    def summarize(self, state: dict) -> dict:
+        """Graph node (sync): summarize the new full chunks of the state."""
+        chunks = self._chunks(state["messages"])
+        if not chunks:
+            return {}
+        tree = [list(level) for level in state.get("summary_tree") or [[]]]
+        for chunk in chunks:
+            tree[0].append(self.llm.invoke(self._chunk_prompt(chunk)).content)
+            while (level := self._full_level(tree)) is not None:
+                merge = self.llm.invoke(self._merge_prompt(tree[level])).content
+                self._merged(tree, level, merge)
+        return self._update(chunks, tree)
+
+    async def _ainvoke(self, prompt: Any) -> str:
+        if self.pool is not None:
+            return (await self.pool.ainvoke(self.llm, prompt)).content
+        return (await self.llm.ainvoke(prompt)).content
+
+    async def asummarize(self, state: dict) -> dict:
+        """Graph node (async); the chunks are summarized concurrently."""
+        chunks = self._chunks(state["messages"])
+        if not chunks:
+            return {}
+        tree = [list(level) for level in state.get("summary_tree") or [[]]]
+        summaries = await asyncio.gather(
+            *(self._ainvoke(self._chunk_prompt(chunk)) for chunk in chunks)
+        )
+        for summary in summaries:
+            tree[0].append(summary)
+            while (level := self._full_level(tree)) is not None:
+                merge = await self._ainvoke(self._merge_prompt(tree[level]))
+                self._merged(tree, level, merge)
+        return self._update(chunks, tree)
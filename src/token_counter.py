@@ -0,0 +1,174 @@
+"""Offline token counting for `trim_messages` and context budgets.
+
+python -m src.token_counter calibrate README.md src/building_assistant/*.py
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+from collections import OrderedDict
+from typing import Optional, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+# Multiplier applied to the estimate, per model name prefix. The estimate is
+# shaped after SentencePiece vocabularies (Gemini); `calibrate` measures the
+# factor of another model against its own counter.
+MODEL_FACTORS = {
+    "gemini": 1.0,
+    "models/gemini": 1.0,
+    "fake-chat-model": 0.81,
+}
+# Role and separators of each message
+MESSAGE_OVERHEAD = 3
+# Tokens billed by Gemini per image or other non-text content block
+MEDIA_TOKENS = 258
+
+_PIECES = re.compile(r"[^\W\d_]+|\d|[^\w\s]|_", re.UNICODE)
+
+
+def estimate_text_tokens(text: str) -> float:
+    """Estimated tokens of a text, before the model correction factor.
+
+    Short words are one token, longer ones about one token per 4 characters,
+    every digit and punctuation mark one token, and non-ASCII letters (e.g.
+    CJK) about one token each.
+    """
+    tokens = 0.0
+    for piece in _PIECES.findall(text):
+        if len(piece) <= 6 or not piece.isascii():
+            tokens += 1 if piece.isascii() else len(piece)
+        else:
+            tokens += len(piece) / 4
+    return tokens
+
+
+def message_text(message: BaseMessage) -> tuple[str, int]:
+    """Text of a message as counted, and its number of media blocks."""
+    parts, media = [], 0
+    content = message.content
+    for block in [content] if isinstance(content, str) else content:
+        if isinstance(block, str):
+            parts.append(block)
+        elif block.get("type") == "text":
+            parts.append(block.get("text", ""))
+        else:
+            media += 1
+    if message.name:
+        parts.append(message.name)
+    if isinstance(message, AIMessage) and message.tool_calls:
+        parts.append(json.dumps([[c["name"], c["args"]] for c in message.tool_calls]))
+    return "\n".join(parts), media
+
+
+def model_factor(model: str) -> float:
+    """Correction factor of a model: TOKEN_COUNTER_FACTOR, else the longest
+    matching prefix in MODEL_FACTORS, else 1."""
+    if os.environ.get("TOKEN_COUNTER_FACTOR"):
+        return float(os.environ["TOKEN_COUNTER_FACTOR"])
+    prefixes = [prefix for prefix in MODEL_FACTORS if model.startswith(prefix)]
+    return MODEL_FACTORS[max(prefixes, key=len)] if prefixes else 1.0
+
+
+def model_name(llm) -> str:
+    """Name of a chat model (`models/gemini-2.0-flash`, `fake-chat-model`)."""
+    return getattr(llm, "model", None) or llm._llm_type
+
+
+class TokenCounter:
+    """Local token counter, usable as the `token_counter` of `trim_messages`.
+
+    The count of each message is kept in an LRU cache keyed on its id, type
+    and content (or a hash of its text), so counting a growing history again only counts
+    the new messages. `stats` reports cache hits and misses.
+    """
+
+    def __init__(
+        self,
+        model: str = "gemini-2.0-flash",
+        factor: Optional[float] = None,
+        max_size: int = 10_000,
+    ):
+        self.model = model
+        self.factor = model_factor(model) if factor is None else factor
+        self.max_size = max_size
+        self._counts: OrderedDict[tuple, int] = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _key(self, message: BaseMessage) -> tuple:
+        content = message.content
+        if isinstance(content, str) and not (
+            isinstance(message, AIMessage) and message.tool_calls
+        ):
+            # Strings cache their hash, so a hit does not rehash the content
+            return (message.id, message.type, message.name, content)
+        text, media = message_text(message)
+        return (message.id, message.type, hash(text), media)
+
+    def count_message(self, message: BaseMessage) -> int:
+        key = self._key(message)
+        count = self._counts.get(key)
+        if count is not None:
+            self.stats["hits"] += 1
+            self._counts.move_to_end(key)
+            return count
+        self.stats["misses"] += 1
+        text, media = message_text(message)
+        count = MESSAGE_OVERHEAD + media * MEDIA_TOKENS
+        count += math.ceil(estimate_text_tokens(text) * self.factor)
+        self._counts[key] = count
+        if len(self._counts) > self.max_size:
+            self._counts.popitem(last=False)
+        return count
+
+    def __call__(self, messages: Sequence[BaseMessage]) -> int:
+        return sum(self.count_message(message) for message in messages)
+
+    def count_text(self, text: str) -> int:
+        """Tokens of a text put in a message, e.g. a document of the context."""
+        return self.count_message(HumanMessage(content=text)) - MESSAGE_OVERHEAD
+
+    def calibrate(self, samples: Sequence[tuple[Sequence[BaseMessage], int]]):
+        """Fit the correction factor to `(messages, actual token count)` pairs,
+        e.g. counted once with the model's `get_num_tokens_from_messages`."""
+        overhead, estimated, actual = 0, 0.0, 0
+        for messages, tokens in samples:
+            for message in messages:
+                text, media = message_text(message)
+                overhead += MESSAGE_OVERHEAD + media * MEDIA_TOKENS
+                estimated += estimate_text_tokens(text)
+            actual += tokens
+        self.factor = max(actual - overhead, 0) / max(estimated, 1e-9)
+        self._counts.clear()
+        return self.factor
+
+
+def main(argv=None):
+    from src.model import llm
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["calibrate"])
+    parser.add_argument("files", nargs="+", help="Sample texts, one per paragraph")
+    args = parser.parse_args(argv)
+    model = model_name(llm)
+    counter = TokenCounter(model)
+    # One model count per paragraph of the sample files
+    samples = []
+    for path in args.files:
+        with open(path, errors="ignore") as file:
+            for paragraph in file.read().split("\n\n"):
+                if paragraph.strip():
+                    messages = [HumanMessage(paragraph)]
+                    samples.append(
+                        (messages, llm.get_num_tokens_from_messages(messages))
+                    )
+    previous = counter.factor
+    factor = counter.calibrate(samples)
+    print(f"{model}: factor {previous:.3f} -> {factor:.3f}")
+    print(f"export TOKEN_COUNTER_FACTOR={factor:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import asyncio
+import logging
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import START, MessagesState, StateGraph
+
+from src.background_summary import BackgroundSummarizer
+
+
+class State(MessagesState):
+    summary: str
+
+
+def reply(state: State):
+    return {"messages": [AIMessage("ok")]}
+
+
+def failing_summary(state: State):
+    raise RuntimeError("summarizer is down")
+
+
+async def afailing_summary(state: State):
+    raise RuntimeError("summarizer is down")
+
+
+def graph():
+    workflow = StateGraph(State)
+    workflow.add_node("conversation", reply)
+    workflow.add_node("summarize_conversation", failing_summary)
+    workflow.add_edge(START, "conversation")
+    return workflow.compile(checkpointer=MemorySaver())
+
+
+def test_failed_summary_is_logged(caplog):
+    summarizer = BackgroundSummarizer(graph(), failing_summary, max_messages=2)
+    config = {"configurable": {"thread_id": "sync"}}
+    with caplog.at_level(logging.ERROR, logger="src.background_summary"):
+        for turn in range(2):
+            summarizer.invoke({"messages": [HumanMessage(f"hi {turn}")]}, config)
+            summarizer.wait()
+    assert summarizer.stats["errors"] == 1
+    assert "Background summary of thread sync failed" in caplog.text
+    assert "summarizer is down" in caplog.text
+
+
+def test_failed_async_summary_is_logged(caplog):
+    summarizer = BackgroundSummarizer(graph(), afailing_summary, max_messages=2)
+    config = {"configurable": {"thread_id": "async"}}
+
+    async def main():
+        for turn in range(2):
+            await summarizer.ainvoke({"messages": [HumanMessage(f"hi {turn}")]}, config)
+            await summarizer.drain()
+
+    with caplog.at_level(logging.ERROR, logger="src.background_summary"):
+        asyncio.run(main())
+    assert summarizer.stats["errors"] == 1
+    assert "Background summary of thread async failed" in caplog.text
@@ -0,0 +1,16 @@
+from src.document_index import DocumentIndex
+
+
+def test_search_without_indexed_terms(tmp_path):
+    index = DocumentIndex(str(tmp_path), alpha=0)
+    index.add("!!! ???", "punctuation.txt")
+    assert index.total_length == 0
+    assert index.search("llama") == []
+
+
+def test_search_for_no_results(tmp_path):
+    index = DocumentIndex(str(tmp_path))
+    index.add("LangGraph builds stateful agents.", "langgraph.txt")
+    assert index.search("agents", k=0) == []
+    assert index.search("agents", k=-1) == []
+    assert len(index.search("agents", k=1)) == 1
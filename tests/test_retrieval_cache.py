@@ -0,0 +1,28 @@
+import asyncio
+
+from src.retrieval_cache import RetrievalCache
+
+
+def test_cancelled_caller_does_not_cancel_shared_fetch():
+    cache = RetrievalCache()
+    calls = []
+
+    async def fetch(query):
+        calls.append(query)
+        await asyncio.sleep(0.2)
+        return [query]
+
+    async def main():
+        first = asyncio.ensure_future(cache.aget("web", "llama", fetch))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(cache.aget("web", "llama", fetch))
+        with_deadline = asyncio.wait_for(first, 0.05)
+        try:
+            await with_deadline
+        except asyncio.TimeoutError:
+            pass
+        return await asyncio.wait_for(second, 1)
+
+    assert asyncio.run(main()) == ["llama"]
+    assert calls == ["llama"]
+    assert cache.get("web", "llama", lambda query: None) == ["llama"]